@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+"""
+商品檔快取: 比較冷啟動 (下載並建立商品檔) 與同交易日熱啟動 (讀取快取) 的連線耗時,
+以及熱啟動後第一次查詢合約 (由快取延遲建立 Shioaji 合約) 的耗時
+使用本機模擬與約 3 萬檔的合成商品檔, 不需網路; 冷啟動不含實際下載的網路時間
+
+python script/bench_contract_cache.py [股票檔數]
+"""
+import sys
+import tempfile
+import time
+
+from vnpy.event import EventEngine
+
+import vnpy_sinopac.gateway.simulator as simulator
+from vnpy_sinopac import SinopacGateway
+from vnpy_sinopac.gateway.simulator import SimContracts, SimShioaji, default_catalog
+
+LOOKUPS = 1000
+
+
+def connect(root: str, lookup: bool = False) -> float:
+    gateway = SinopacGateway(EventEngine(), "Sinopac")
+    setting = dict(gateway.default_setting)
+    setting["連接"] = "本機模擬"
+    setting["憑證檔案路徑"] = ""
+    setting["商品檔快取"] = "開啟"
+    setting["商品檔快取路徑"] = root
+    start = time.perf_counter()
+    gateway.connect(setting)
+    elapsed = time.perf_counter() - start
+    if lookup:
+        # 正式環境熱啟動時 api.Contracts 為空, 合約由快取建立
+        codes = list(gateway.contract_catalog.published)[:LOOKUPS]
+        gateway.api.Contracts = SimContracts([], [], [])
+        start = time.perf_counter()
+        for code in codes:
+            gateway.code2contract[code]
+        print(f"熱啟動後首次查詢 {len(codes)} 檔合約 {(time.perf_counter() - start) * 1000:.1f} 毫秒")
+    gateway.close()
+    return elapsed
+
+
+def main() -> None:
+    stocks = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    catalog = default_catalog(months=12, strikes=5000, stocks=stocks)
+    total = sum(len(category) for products in (catalog.Futures, catalog.Options, catalog.Stocks) for category in products)
+    simulator.SimShioaji = lambda: SimShioaji(contracts=catalog)
+
+    with tempfile.TemporaryDirectory() as root:
+        cold = connect(root)
+        warm = connect(root, lookup=True)
+    print(f"商品檔 {total} 檔")
+    print(f"冷啟動 {cold:.3f} 秒")
+    print(f"熱啟動 {warm:.3f} 秒 ({cold / warm:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: UTF-8 -*-
+"""
+商品發布篩選: 比較全部發布與只發布期貨時的連線耗時、事件數與保留的 ContractData 記憶體
+使用本機模擬與約 3 萬檔的合成商品檔, 不需網路
+
+python script/bench_contract_filter.py [發布商品類型] [發布商品分類]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from vnpy.event import EventEngine
+
+import vnpy_sinopac.gateway.simulator as simulator
+from vnpy_sinopac import SinopacGateway
+from vnpy_sinopac.gateway.simulator import SimShioaji, default_catalog
+
+
+def connect(trace: bool, **setting) -> tuple:
+    gateway = SinopacGateway(EventEngine(), "Sinopac")
+    values = dict(gateway.default_setting)
+    values["連接"] = "本機模擬"
+    values["憑證檔案路徑"] = ""
+    values.update(setting)
+
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    gateway.connect(values)
+    elapsed = time.perf_counter() - start
+    memory = 0
+    if trace:
+        # 事件引擎未啟動, 佇列中的 ContractData 相當於 OmsEngine 會保留的物件
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    events = gateway.event_engine._queue.qsize()
+    gateway.close()
+    return elapsed, events, memory
+
+
+def measure(**setting) -> tuple:
+    """耗時不開 tracemalloc 量測, 記憶體另外連線一次量測"""
+    elapsed, events, _ = connect(False, **setting)
+    _, _, memory = connect(True, **setting)
+    return elapsed, events, memory
+
+
+def main() -> None:
+    security_types = sys.argv[1] if len(sys.argv) > 1 else "FUT"
+    categories = sys.argv[2] if len(sys.argv) > 2 else ""
+    catalog = default_catalog(months=12, strikes=5000, stocks=20000)
+    simulator.SimShioaji = lambda: SimShioaji(contracts=catalog)
+
+    full = measure()
+    filtered = measure(**{"發布商品類型": security_types, "發布商品分類": categories})
+    print(f"{'':8}{'耗時(秒)':>10}{'事件數':>10}{'記憶體(MB)':>12}")
+    for name, (elapsed, events, memory) in (("全部", full), ("篩選", filtered)):
+        print(f"{name:8}{elapsed:>10.3f}{events:>10}{memory / 2**20:>12.1f}")
+    print(
+        f"節省: 耗時 {1 - filtered[0] / full[0]:.0%}, 事件 {full[1] - filtered[1]} 筆, "
+        f"記憶體 {(full[2] - filtered[2]) / 2**20:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: UTF-8 -*-
+"""
+一分 K 轉換基準測試: 比較舊版 (iter_rows 逐列 localize、round_to) 與 polars 欄位運算版本的 rows/s
+使用合成的奈秒 ts (與 Shioaji kbars 相同格式), 不需網路
+
+python script/bench_query_history.py [筆數]
+"""
+import sys
+import time
+from datetime import datetime
+
+import polars as pl
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import round_to
+
+from vnpy_sinopac.gateway.kbar import normalize_kbars, to_bars
+from vnpy_sinopac.gateway.utility import TW_TZ
+
+
+def make_kbars(n: int) -> dict:
+    start = int(datetime(2026, 1, 5, 8, 46).timestamp()) * 10**9
+    return {
+        "ts": [start + i * 60 * 10**9 for i in range(n)],
+        "Open": [22000.0 + i % 50 for i in range(n)],
+        "High": [22010.0 + i % 50 for i in range(n)],
+        "Low": [21990.0 + i % 50 for i in range(n)],
+        "Close": [22005.0 + i % 50 for i in range(n)],
+        "Volume": [i % 100 + 1 for i in range(n)],
+        "Amount": [22000.0 * (i % 100 + 1) for i in range(n)],
+    }
+
+
+def legacy_convert(kbars: dict) -> list:
+    df = pl.DataFrame({**kbars})
+    df = df.with_columns((pl.col("ts") // 10**6).cast(pl.Datetime("ms")))
+    data = []
+    for row in df.iter_rows(named=True):
+        try:
+            dt = row["ts"]
+            if hasattr(dt, "to_pydatetime"):
+                dt = dt.to_pydatetime()
+            if dt.tzinfo is None:
+                dt = TW_TZ.localize(dt)
+            else:
+                dt = dt.astimezone(TW_TZ)
+            data.append(
+                BarData(
+                    symbol="TXFJ6",
+                    exchange=Exchange.LOCAL,
+                    interval=Interval.MINUTE,
+                    datetime=dt,
+                    open_price=round_to(row["Open"], 0.000001),
+                    high_price=round_to(row["High"], 0.000001),
+                    low_price=round_to(row["Low"], 0.000001),
+                    close_price=round_to(row["Close"], 0.000001),
+                    volume=row["Volume"],
+                    turnover=row["Amount"],
+                    open_interest=0,
+                    gateway_name="Sinopac",
+                )
+            )
+        except Exception:
+            continue
+    return data
+
+
+def vectorized_convert(kbars: dict) -> list:
+    return to_bars(normalize_kbars(kbars), "TXFJ6", Exchange.LOCAL, Interval.MINUTE, "Sinopac")
+
+
+def measure(func, kbars: dict) -> tuple:
+    start = time.perf_counter()
+    bars = func(kbars)
+    return bars, time.perf_counter() - start
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    kbars = make_kbars(n)
+    legacy, legacy_time = measure(legacy_convert, kbars)
+    vectorized, vectorized_time = measure(vectorized_convert, kbars)
+    assert legacy == vectorized
+    print(f"一分 K {n} 筆")
+    print(f"舊版     {legacy_time:.3f} 秒, {n / legacy_time:,.0f} rows/s")
+    print(f"欄位運算 {vectorized_time:.3f} 秒, {n / vectorized_time:,.0f} rows/s ({legacy_time / vectorized_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# -*- coding: UTF-8 -*-
+"""
+行情 callback 微基準測試: 比較舊版 (每筆重組名稱、subscript 取值) 與 QuoteMeta 版本的 ns/tick
+兩者的推送 (publish_tick) 皆替換為空函式, 只量測 TickData 更新本身.
+code2contract 使用一般 dict (與舊版相同), QuoteMeta 如 query_contract 預先建立;
+新舊版本交錯執行多輪, 取中位數
+
+python script/bench_quote_callback.py [次數] [輪數]
+"""
+import statistics
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from shioaji.contracts import Future
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+from vnpy_sinopac import SinopacGateway
+from vnpy_sinopac.gateway.sinopac_gateway import QuoteMeta
+
+
+class NullEventEngine:
+    def put(self, event) -> None:
+        pass
+
+
+class FakeQuote:
+    """同時支援屬性與 subscript 取值的 Shioaji v1 行情物件"""
+
+    def __init__(self, **kwargs) -> None:
+        self.__dict__.update(kwargs)
+
+    def __getitem__(self, key):
+        return self.__dict__[key]
+
+
+def legacy_tick_v1_callback(gateway, _, tick) -> None:
+    one_tick = gateway.ticks.get(tick.code, None)
+    contract = gateway.code2contract.get(tick.code, None)
+    if one_tick is None:
+        one_tick = TickData(
+            symbol=tick.code,
+            exchange=Exchange.LOCAL,
+            name=f"{contract['name']}{contract['delivery_month']}",
+            datetime=tick.datetime,
+            gateway_name=gateway.gateway_name,
+        )
+        gateway.ticks[tick.code] = one_tick
+    if tick.simtrade == 1:
+        one_tick.name = f"{contract['name']}{contract['delivery_month']}(試搓)"
+    else:
+        one_tick.name = f"{contract['name']}{contract['delivery_month']}"
+
+    one_tick.datetime = tick.datetime
+    one_tick.volume = tick.volume
+    one_tick.last_price = float(tick.close)
+    one_tick.limit_up = contract.limit_up
+    one_tick.open_interest = 0
+    one_tick.limit_down = contract.limit_down
+    one_tick.open_price = float(tick.open)
+    one_tick.high_price = float(tick.high)
+    one_tick.low_price = float(tick.low)
+    one_tick.pre_close = float(tick.close - tick.price_chg)
+    one_tick.localtime = datetime.now()
+    gateway.publish_tick(one_tick)
+
+
+def legacy_bidask_v1_callback(gateway, _, tick) -> None:
+    one_tick = gateway.ticks.get(tick.code, None)
+    contract = gateway.code2contract[tick.code]
+    if one_tick is None:
+        one_tick = TickData(
+            symbol=tick.code,
+            exchange=Exchange.LOCAL,
+            name=f"{contract['name']}{contract['delivery_month']}",
+            datetime=tick.datetime,
+            gateway_name=gateway.gateway_name,
+        )
+        gateway.ticks[tick.code] = one_tick
+    one_tick.bid_price_1 = tick["bid_price"][0]
+    one_tick.bid_price_2 = tick["bid_price"][1]
+    one_tick.bid_price_3 = tick["bid_price"][2]
+    one_tick.bid_price_4 = tick["bid_price"][3]
+    one_tick.bid_price_5 = tick["bid_price"][4]
+    one_tick.ask_price_1 = tick["ask_price"][0]
+    one_tick.ask_price_2 = tick["ask_price"][1]
+    one_tick.ask_price_3 = tick["ask_price"][2]
+    one_tick.ask_price_4 = tick["ask_price"][3]
+    one_tick.ask_price_5 = tick["ask_price"][4]
+    one_tick.bid_volume_1 = tick["bid_volume"][0]
+    one_tick.bid_volume_2 = tick["bid_volume"][1]
+    one_tick.bid_volume_3 = tick["bid_volume"][2]
+    one_tick.bid_volume_4 = tick["bid_volume"][3]
+    one_tick.bid_volume_5 = tick["bid_volume"][4]
+    one_tick.ask_volume_1 = tick["ask_volume"][0]
+    one_tick.ask_volume_2 = tick["ask_volume"][1]
+    one_tick.ask_volume_3 = tick["ask_volume"][2]
+    one_tick.ask_volume_4 = tick["ask_volume"][3]
+    one_tick.ask_volume_5 = tick["ask_volume"][4]
+    gateway.publish_tick(one_tick)
+
+
+def update_tick_v1(gateway, _, tick) -> None:
+    gateway.update_tick_v1(tick)
+
+
+def update_bidask_v1(gateway, _, tick) -> None:
+    gateway.update_bidask_v1(tick)
+
+
+def make_gateway() -> SinopacGateway:
+    gateway = SinopacGateway(NullEventEngine(), "Sinopac")
+    gateway.publish_tick = lambda one_tick: None
+    contract = Future(
+        code="TXFJ6",
+        symbol="TXF202610",
+        name="臺股期貨",
+        category="TXF",
+        delivery_month="202610",
+        limit_up=25000.0,
+        limit_down=20000.0,
+        unit=1,
+    )
+    gateway.code2contract = {contract.code: contract}
+    gateway.code2meta[contract.code] = QuoteMeta.from_contract(contract, 1, 200)
+    return gateway
+
+
+def make_tick() -> FakeQuote:
+    return FakeQuote(
+        code="TXFJ6",
+        datetime=datetime(2026, 10, 16, 9, 0, 0),
+        open=Decimal("22500"),
+        close=Decimal("22510"),
+        high=Decimal("22520"),
+        low=Decimal("22490"),
+        volume=2,
+        total_volume=1000,
+        price_chg=Decimal("10"),
+        simtrade=0,
+    )
+
+
+def make_bidask() -> FakeQuote:
+    return FakeQuote(
+        code="TXFJ6",
+        datetime=datetime(2026, 10, 16, 9, 0, 0),
+        bid_price=[Decimal(22509 - i) for i in range(5)],
+        ask_price=[Decimal(22510 + i) for i in range(5)],
+        bid_volume=[1, 2, 3, 4, 5],
+        ask_volume=[5, 4, 3, 2, 1],
+        simtrade=0,
+    )
+
+
+def measure(func, gateway, quote, count: int) -> float:
+    func(gateway, None, quote)  # warm up, 建立 TickData
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        func(gateway, None, quote)
+    return (time.perf_counter_ns() - start) / count
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    gateway = make_gateway()
+    tick, bidask = make_tick(), make_bidask()
+    cases = [
+        ("tick_v1", legacy_tick_v1_callback, update_tick_v1, tick),
+        ("bidask_v1", legacy_bidask_v1_callback, update_bidask_v1, bidask),
+    ]
+    print(f"{'callback':<12}{'before ns':>12}{'after ns':>12}{'speedup':>10}")
+    for name, before_func, after_func, quote in cases:
+        befores, afters = [], []
+        for _ in range(rounds):
+            gateway.ticks.clear()
+            befores.append(measure(before_func, gateway, quote, count))
+            gateway.ticks.clear()
+            afters.append(measure(after_func, gateway, quote, count))
+        before, after = statistics.median(befores), statistics.median(afters)
+        print(f"{name:<12}{before:>12.0f}{after:>12.0f}{before / after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
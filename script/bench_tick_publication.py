@@ -0,0 +1,87 @@
+# -*- coding: UTF-8 -*-
+"""
+Tick 推送記憶體/GC 基準測試: 比較 copy(one_tick) 與 TickPool 循環池
+
+模擬 500 檔商品輪流更新, 事件引擎每累積 N 筆才消化一次: 4 筆為即時消化,
+5000 筆為開盤爆量時的佇列積壓. 消化時對每筆 TickData 呼叫兩次 release (EVENT_TICK 與
+EVENT_TICK + vt_symbol), 循環池只重用已處理完的槽位, 積壓時依需要增加槽位.
+量測每筆推送時間 (含消化)、GC 次數與 tracemalloc 記憶體峰值.
+
+python script/bench_tick_publication.py [次數]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from copy import copy
+from datetime import datetime
+
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+from vnpy_sinopac.gateway.tick_pool import TickPool
+
+
+def make_ticks(count: int) -> list:
+    return [
+        TickData(
+            symbol=f"{2000 + i}",
+            exchange=Exchange.LOCAL,
+            datetime=datetime.now(),
+            gateway_name="Sinopac",
+        )
+        for i in range(count)
+    ]
+
+
+def publish(snapshot, release, ticks: list, count: int, queue: list, backlog: int) -> None:
+    n = len(ticks)
+    for i in range(count):
+        tick = ticks[i % n]
+        tick.last_price = i
+        queue.append(snapshot(tick))
+        if len(queue) == backlog:
+            for one_tick in queue:
+                release(one_tick)
+                release(one_tick)
+            queue.clear()
+
+
+def run(snapshot, release, ticks: list, count: int, queue: list, backlog: int) -> dict:
+    publish(snapshot, release, ticks, backlog * 2, queue, backlog)  # 槽位增加到積壓所需數量
+    gc.collect()
+    collections = sum(stat["collections"] for stat in gc.get_stats())
+    start = time.perf_counter_ns()
+    publish(snapshot, release, ticks, count, queue, backlog)
+    elapsed = time.perf_counter_ns() - start
+    gc_runs = sum(stat["collections"] for stat in gc.get_stats()) - collections
+
+    tracemalloc.start()
+    publish(snapshot, release, ticks, min(count, 20_000), queue, backlog)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ns": elapsed / count, "gc": gc_runs, "peak_kb": peak / 1024}
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    ticks = make_ticks(500)
+    queue = []
+    pool = TickPool()
+
+    print(f"{'mode':<8}{'backlog':>8}{'ns/tick':>10}{'gc runs':>10}{'peak KB':>10}")
+    for backlog in (4, 5000):
+        for name, snapshot, release in [
+            ("copy", copy, lambda tick: None),
+            ("pool", pool.acquire, pool.release),
+        ]:
+            queue.clear()
+            result = run(snapshot, release, ticks, count, queue, backlog)
+            print(
+                f"{name:<8}{backlog:>8}{result['ns']:>10.0f}{result['gc']:>10}{result['peak_kb']:>10.0f}"
+            )
+    print(f"循環池槽位 {pool.get_slot_count()} 個, 改用 copy {pool.copied} 次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# -*- coding: UTF-8 -*-
+"""
+以行情紀錄回放驅動 SinopacGateway, 量測吞吐量與事件引擎延遲
+
+python script/replay.py <紀錄路徑> <交易日 YYYYMMDD> [倍速, 0 為全速] [行情合併|行情派送佇列 ...]
+"""
+import sys
+from datetime import datetime
+
+from vnpy.event import EventEngine
+
+from vnpy_sinopac.gateway.quote_dispatcher import QuoteDispatcher
+from vnpy_sinopac.gateway.replay import ReplayDriver
+from vnpy_sinopac.gateway.tick_conflator import TickConflator
+
+
+def main() -> None:
+    root = sys.argv[1]
+    trading_day = datetime.strptime(sys.argv[2], "%Y%m%d").date()
+    speed = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    options = sys.argv[4:]
+
+    gateway = ReplayDriver.create_gateway(EventEngine())
+    if "行情派送佇列" in options:
+        gateway.dispatcher = QuoteDispatcher(65536)
+        gateway.dispatcher.start()
+    if "行情合併" in options:
+        gateway.conflator = TickConflator(
+            0.1, gateway.on_tick, gateway.is_event_idle, gateway.tick_lock
+        )
+        gateway.conflator.start()
+
+    driver = ReplayDriver.from_journal(root, trading_day, gateway=gateway, speed=speed)
+    result = driver.run()
+    gateway.event_engine.stop()
+    if gateway.dispatcher:
+        gateway.dispatcher.stop()
+    if gateway.conflator:
+        gateway.conflator.stop()
+
+    for key, value in result.items():
+        print(f"{key:<16}{value:>16,.2f}")
+
+
+if __name__ == "__main__":
+    main()
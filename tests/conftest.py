@@ -0,0 +1,33 @@
+# -*- coding: UTF-8 -*-
+"""本機模擬 (SimShioaji) 測試共用 fixture"""
+from typing import Callable, List, Optional
+
+import pytest
+
+from vnpy_sinopac import SinopacGateway
+from vnpy_sinopac.gateway.simulator import SimContracts, default_catalog
+
+from .helpers import TODAY, connect_sim
+
+
+@pytest.fixture
+def connect_gateway() -> Callable[..., SinopacGateway]:
+    """
+    connect_gateway(setting=None, catalog=None, reload=True) 建立本機模擬 gateway,
+    reload 時重新載入 catalog (預設為 TODAY 的商品檔); 測試結束時全部 close (可重複 close),
+    避免背景執行緒殘留
+    """
+    gateways: List[SinopacGateway] = []
+
+    def connect(
+        setting: Optional[dict] = None,
+        catalog: Optional[SimContracts] = None,
+        reload: bool = True,
+    ) -> SinopacGateway:
+        gateway = connect_sim(setting, (catalog or default_catalog(TODAY)) if reload else None)
+        gateways.append(gateway)
+        return gateway
+
+    yield connect
+    for gateway in gateways:
+        gateway.close()
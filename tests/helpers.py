@@ -0,0 +1,36 @@
+# -*- coding: UTF-8 -*-
+"""本機模擬 (SimShioaji) 測試共用常數與工具"""
+from datetime import date
+from typing import Optional
+
+from vnpy.event import EventEngine
+
+from vnpy_sinopac import SinopacGateway
+from vnpy_sinopac.gateway.simulator import SimContracts
+
+TODAY = date(2026, 10, 16)
+FUTURE = "TXFJ6"
+STOCK = "2330"
+
+
+def connect_sim(setting: Optional[dict] = None, catalog: Optional[SimContracts] = None) -> SinopacGateway:
+    """以本機模擬連線, setting 覆寫預設設定; catalog 不為 None 時改用該商品檔並重新載入"""
+    gateway = SinopacGateway(EventEngine(), "Sinopac")
+    merged = dict(gateway.default_setting)
+    merged.update({"連接": "本機模擬", "憑證檔案路徑": ""})
+    merged.update(setting or {})
+    gateway.connect(merged)
+    if catalog is not None:
+        gateway.api.Contracts = catalog
+        gateway.query_contract()
+    return gateway
+
+
+def drain(gateway: SinopacGateway) -> dict:
+    """取出事件佇列, 依事件類型分組"""
+    queue = gateway.event_engine._queue
+    events = {}
+    while not queue.empty():
+        event = queue.get()
+        events.setdefault(event.type, []).append(event.data)
+    return events
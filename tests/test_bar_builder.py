@@ -0,0 +1,69 @@
+# -*- coding: UTF-8 -*-
+"""一分 K 合成測試"""
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from vnpy_sinopac.gateway.bar_builder import FUTURES_SESSIONS, STOCK_SESSIONS, BarBuilder
+
+
+def make_tick(dt: datetime, close: int, total_volume: int, volume: int = 1, code: str = "TXFJ6", simtrade: int = 0):
+    return SimpleNamespace(
+        code=code,
+        datetime=dt,
+        close=Decimal(close),
+        volume=volume,
+        total_volume=total_volume,
+        total_amount=Decimal(close * total_volume),
+        simtrade=simtrade,
+    )
+
+
+def make_builder(code: str = "TXFJ6", sessions=FUTURES_SESSIONS):
+    bars = []
+    builder = BarBuilder(bars.append, "Sinopac")
+    builder.add(code, sessions)
+    return builder, bars
+
+
+def test_bar_from_cumulative_volume():
+    builder, bars = make_builder()
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 9, 0, 1), 100, 10, volume=2))
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 9, 0, 20), 105, 13))
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 9, 0, 40), 98, 15))
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 9, 0, 50), 101, 16, simtrade=1))
+    assert bars == []
+
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 9, 1, 0), 99, 20, volume=5))
+    assert len(bars) == 1
+    bar = bars[0]
+    assert bar.datetime.replace(tzinfo=None) == datetime(2026, 10, 16, 9, 0)
+    assert (bar.open_price, bar.high_price, bar.low_price, bar.close_price) == (100, 105, 98, 98)
+    assert bar.volume == 7  # 15 - (10 - 2)
+    assert builder.bars["TXFJ6"].volume == 5
+
+
+def test_session_alignment_and_closing_auction():
+    builder, bars = make_builder()
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 8, 30), 100, 1))  # 盤前
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 13, 44, 30), 100, 10))
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 13, 45, 0), 102, 30, volume=20))
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 15, 0, 0), 103, 5, volume=5))
+    assert len(bars) == 1
+    assert bars[0].datetime.replace(tzinfo=None) == datetime(2026, 10, 16, 13, 44)
+    assert (bars[0].close_price, bars[0].volume) == (102, 21)
+    # 夜盤累計量歸零
+    assert builder.bars["TXFJ6"].volume == 5
+
+    builder.update_tick(make_tick(datetime(2026, 10, 17, 5, 0, 0), 104, 9, volume=4))
+    assert builder.bars["TXFJ6"].datetime == datetime(2026, 10, 17, 4, 59)
+
+
+def test_flush_emits_idle_bars():
+    builder, bars = make_builder("2330", STOCK_SESSIONS)
+    builder.update_tick(make_tick(datetime(2026, 10, 16, 13, 29, 10), 1000, 10, code="2330"))
+    builder.flush(datetime(2026, 10, 16, 13, 30, 1))
+    assert bars == []
+    builder.flush(datetime(2026, 10, 16, 13, 30, 5))
+    assert [bar.symbol for bar in bars] == ["2330"]
+    assert builder.emitted == 1
@@ -0,0 +1,185 @@
+# -*- coding: UTF-8 -*-
+"""
+Gateway 熱路徑基準測試 (pytest-benchmark)
+
+全部使用固定的合成資料與本機模擬 (SimShioaji), 不需網路.
+每個 round 批次處理 BATCH 筆, 以 extra_info["ns_per_item"] 記錄每筆耗時.
+
+儲存基準:  pytest tests/test_benchmark.py --benchmark-only --benchmark-autosave
+比較退步:  pytest tests/test_benchmark.py --benchmark-only --benchmark-compare --benchmark-compare-fail=median:15%
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import shioaji.constant as sj_constant
+from vnpy.trader.constant import Direction, Exchange, Interval, Offset, OrderType
+from vnpy.trader.object import HistoryRequest, OrderRequest
+
+from vnpy_sinopac import SinopacGateway
+from vnpy_sinopac.gateway.simulator import default_catalog
+
+from .helpers import FUTURE, TODAY, connect_sim
+
+BATCH = 1000
+ROUNDS = 20
+
+
+def new_gateway(catalog=None) -> SinopacGateway:
+    gateway = connect_sim(catalog=catalog or default_catalog(TODAY))
+    clear_events(gateway)
+    return gateway
+
+
+def clear_events(gateway: SinopacGateway) -> None:
+    gateway.event_engine._queue.queue.clear()
+    gateway.position_update_time = datetime.now()
+
+
+def run_batch(benchmark, gateway: SinopacGateway, func, items: list, rounds: int = ROUNDS) -> None:
+    def target():
+        for item in items:
+            func(*item)
+
+    benchmark.pedantic(target, setup=lambda: clear_events(gateway), rounds=rounds, iterations=1)
+    if benchmark.stats:  # --benchmark-disable 時只執行一次, 沒有統計
+        benchmark.extra_info["ns_per_item"] = benchmark.stats.stats.median / len(items) * 1e9
+
+
+@pytest.fixture(scope="module")
+def quote_gateway() -> SinopacGateway:
+    gateway = new_gateway()
+    yield gateway
+    gateway.close()
+
+
+@pytest.fixture(scope="module")
+def order_flow():
+    """下單後取得委託/成交回報, 由已知委託的 gateway 重播"""
+    gateway = new_gateway()
+    api = gateway.api
+    relays = []
+    api.set_order_callback(lambda topic, relay: relays.append((topic, relay)))
+    api.add_liquidity(FUTURE, sj_constant.Action.Sell, 22000, BATCH)
+    for i in range(BATCH):
+        gateway.send_order(
+            OrderRequest(
+                symbol=FUTURE,
+                exchange=Exchange.LOCAL,
+                direction=Direction.LONG,
+                type=OrderType.LIMIT,
+                volume=1,
+                price=22000,
+                offset=Offset.NONE,
+            )
+        )
+    api.set_order_callback(gateway.relay_callback)
+    orders = [(api.futopt_account, r) for t, r in relays if t == sj_constant.OrderState.FuturesOrder]
+    deals = [(api.futopt_account, r) for t, r in relays if t == sj_constant.OrderState.FuturesDeal]
+    yield gateway, orders, deals
+    gateway.close()
+
+
+def test_tick_v1_callback(benchmark, quote_gateway):
+    start = datetime(2026, 10, 16, 9, 0)
+    ticks = [
+        (
+            None,
+            SimpleNamespace(
+                code=FUTURE,
+                datetime=start + timedelta(milliseconds=i),
+                open=Decimal("22000"),
+                high=Decimal("22050"),
+                low=Decimal("21950"),
+                close=Decimal(22000 + i % 10),
+                price_chg=Decimal("10"),
+                volume=1,
+                total_volume=i,
+                simtrade=0,
+            ),
+        )
+        for i in range(BATCH)
+    ]
+    run_batch(benchmark, quote_gateway, quote_gateway.tick_v1_callback, ticks)
+    assert quote_gateway.ticks[FUTURE].last_price == 22009.0
+
+
+def test_bidask_v1_callback(benchmark, quote_gateway):
+    start = datetime(2026, 10, 16, 9, 0)
+    bidasks = [
+        (
+            None,
+            SimpleNamespace(
+                code=FUTURE,
+                datetime=start + timedelta(milliseconds=i),
+                bid_price=[Decimal(21999 - j) for j in range(5)],
+                ask_price=[Decimal(22000 + j) for j in range(5)],
+                bid_volume=[i % 7 + j for j in range(5)],
+                ask_volume=[i % 5 + j for j in range(5)],
+                simtrade=0,
+            ),
+        )
+        for i in range(BATCH)
+    ]
+    run_batch(benchmark, quote_gateway, quote_gateway.bidask_v1_callback, bidasks)
+    assert quote_gateway.ticks[FUTURE].ask_price_1 == 22000
+
+
+def test_impl_order(benchmark, order_flow):
+    gateway, orders, _ = order_flow
+    assert len(orders) == BATCH
+    run_batch(benchmark, gateway, gateway.impl_order, orders)
+
+
+def test_impl_deal(benchmark, order_flow):
+    gateway, _, deals = order_flow
+    assert len(deals) == BATCH
+    run_batch(benchmark, gateway, gateway.impl_deal, deals)
+
+
+def test_update_trades(benchmark, order_flow):
+    gateway, _, _ = order_flow
+    assert len(gateway.api.list_trades()) == BATCH
+    run_batch(benchmark, gateway, gateway.update_trades, [()], rounds=10)
+
+
+def test_query_contract(benchmark):
+    # 約 3 萬檔: 2 萬檔股票、1 萬檔選擇權與期貨
+    catalog = default_catalog(TODAY, months=12, strikes=5000, stocks=20000)
+    gateway = new_gateway(default_catalog(TODAY))
+    gateway.api.Contracts = catalog
+    run_batch(benchmark, gateway, gateway.query_contract, [()], rounds=3)
+    assert len(gateway.code2contract) >= 30000
+    gateway.close()
+
+
+def test_query_history(benchmark, quote_gateway):
+    # 100k 筆一分 K
+    n = 100_000
+    start = int(datetime(2026, 1, 5, 8, 46).timestamp()) * 10**9
+    kbars = {
+        "ts": [start + i * 60 * 10**9 for i in range(n)],
+        "Open": [22000.0 + i % 50 for i in range(n)],
+        "High": [22010.0 + i % 50 for i in range(n)],
+        "Low": [21990.0 + i % 50 for i in range(n)],
+        "Close": [22005.0 + i % 50 for i in range(n)],
+        "Volume": [i % 100 + 1 for i in range(n)],
+        "Amount": [22000.0 * (i % 100 + 1) for i in range(n)],
+    }
+    quote_gateway.api.kbars = lambda contract, start, end, timeout=30000: kbars
+    req = HistoryRequest(
+        symbol=FUTURE,
+        exchange=Exchange.LOCAL,
+        start=datetime(2026, 1, 5),
+        end=datetime(2026, 10, 16),
+        interval=Interval.MINUTE,
+    )
+    bars = []
+    run_batch(benchmark, quote_gateway, lambda: bars.append(quote_gateway.query_history(req)), [()], rounds=2)
+    assert len(bars[-1]) == n
+    if benchmark.stats:
+        benchmark.extra_info["rows_per_s"] = n / benchmark.stats.stats.median
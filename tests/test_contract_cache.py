@@ -0,0 +1,95 @@
+# -*- coding: UTF-8 -*-
+"""商品檔快取測試"""
+import pytest
+import shioaji.constant as sj_constant
+from vnpy.trader.event import EVENT_ACCOUNT, EVENT_CONTRACT, EVENT_LOG
+
+from vnpy_sinopac import SinopacGateway
+from vnpy_sinopac.gateway.contract_cache import ContractCache, build_contract_data
+from vnpy_sinopac.gateway.simulator import SimContracts, default_catalog
+
+from .helpers import TODAY, drain
+
+
+@pytest.fixture
+def connect(connect_gateway):
+    def connect(root) -> SinopacGateway:
+        return connect_gateway({"商品檔快取": "開啟", "商品檔快取路徑": str(root)}, reload=False)
+
+    return connect
+
+
+def published_contracts(gateway: SinopacGateway) -> dict:
+    queue = gateway.event_engine._queue
+    contracts = {}
+    while not queue.empty():
+        event = queue.get()
+        if event.type == EVENT_CONTRACT:
+            contracts[event.data.symbol] = event.data
+    return contracts
+
+
+def test_warm_start_rebuilds_same_catalog(tmp_path, connect):
+    cold = connect(tmp_path)
+    assert len(list(tmp_path.glob("contracts_local_*.parquet"))) == 1
+
+    warm = connect(tmp_path)
+    cold_contracts = published_contracts(cold)
+    assert published_contracts(warm) == cold_contracts
+    assert warm.contract_index.get_expiries("TXF") == cold.contract_index.get_expiries("TXF")
+
+    # 熱啟動時 api.Contracts 為空, 合約於查詢時由快取建立, 不再推送 ContractData
+    warm.api.Contracts = SimContracts([], [], [])
+    assert dict.__len__(warm.code2contract) == 0
+    for code, contract in cold.code2contract.items():
+        assert warm.code2contract[code] == contract
+    assert published_contracts(warm) == {}
+    option = next(c for c in warm.code2contract.values() if c.category == "TXO")
+    assert option.option_right == cold.code2contract[option.code].option_right
+    assert isinstance(option.strike_price, int)
+    chain = warm.get_option_chain("TXO", option.delivery_month)
+    assert chain == cold.get_option_chain("TXO", option.delivery_month)
+    for code, meta in cold.code2meta.items():
+        assert warm.get_quote_meta(code).pricetick == meta.pricetick
+
+
+def test_unreadable_cache_falls_back_to_download(tmp_path, connect):
+    cold = connect(tmp_path)
+    cold_contracts = published_contracts(cold)
+    path = next(tmp_path.glob("contracts_local_*.parquet"))
+    path.write_bytes(b"not a parquet file")
+
+    warm = connect(tmp_path)
+    events = drain(warm)
+    assert {data.symbol: data for data in events[EVENT_CONTRACT]} == cold_contracts
+    assert warm.contract_catalog is None
+    logs = [log.msg for log in events[EVENT_LOG]]
+    assert any(msg.startswith("商品檔快取讀取失敗, 改為下載") for msg in logs)
+    assert any(msg.startswith("股票帳號: [0]") for msg in logs)  # select_default_account
+    assert EVENT_ACCOUNT in events  # register_all_event
+    # 壞檔已刪除, 下載後重新寫入快取
+    assert ContractCache(tmp_path, "local").load(cold.get_contract_day()).height == len(cold_contracts)
+
+
+def test_columnar_conversion_matches_convert(tmp_path, connect):
+    """build_contract_data 與 convert_* 對模擬商品檔的結果一致"""
+    gateway = connect(tmp_path)
+    catalog = default_catalog(TODAY)
+    cache = ContractCache(tmp_path, "test")
+    contracts = [
+        contract
+        for products in (catalog.Futures, catalog.Options, catalog.Stocks)
+        for category in products
+        for contract in category
+    ]
+    cache.save(TODAY, contracts)
+
+    datas = build_contract_data(cache.load(TODAY), gateway.gateway_name)
+    assert len(datas) == len(contracts)
+    converts = {
+        sj_constant.SecurityType.Future: gateway.convert_future,
+        sj_constant.SecurityType.Option: gateway.convert_option,
+        sj_constant.SecurityType.Stock: gateway.convert_stock,
+    }
+    for data, contract in zip(datas, contracts):
+        assert data == converts[contract.security_type](contract)
@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+"""商品發布篩選測試"""
+import polars as pl
+import pytest
+from vnpy.trader.constant import Exchange, Product
+from vnpy.trader.event import EVENT_CONTRACT
+from vnpy.trader.object import SubscribeRequest
+
+from vnpy_sinopac import SinopacGateway
+from vnpy_sinopac.gateway.contract_cache import FIELDS, ENUM_FIELDS
+from vnpy_sinopac.gateway.contract_filter import ContractFilter
+from vnpy_sinopac.gateway.simulator import SimContracts, default_catalog
+
+from .helpers import TODAY
+
+@pytest.fixture
+def connect(connect_gateway):
+    def connect(**setting) -> SinopacGateway:
+        return connect_gateway(setting, reload=False)
+
+    return connect
+
+
+def published_contracts(gateway: SinopacGateway) -> dict:
+    queue = gateway.event_engine._queue
+    contracts = {}
+    while not queue.empty():
+        event = queue.get()
+        if event.type == EVENT_CONTRACT:
+            contracts[event.data.symbol] = event.data
+    return contracts
+
+
+def test_match_and_expr_agree():
+    catalog = default_catalog(TODAY, months=4)
+    contracts = [c for p in (catalog.Futures, catalog.Options, catalog.Stocks) for cat in p for c in cat]
+    df = pl.DataFrame(
+        [
+            {name: getattr(c, name).value if name in ENUM_FIELDS else getattr(c, name) for name in FIELDS}
+            for c in contracts
+        ]
+    )
+    contract_filter = ContractFilter({"FUT", "STK"}, set(), set(), months=2, today=TODAY)
+    matched = [c.code for c in contracts if contract_filter.match(c)]
+    assert matched == df.filter(contract_filter.expr())["code"].to_list()
+    assert "TXFJ6" in matched and "TXFL6" not in matched and "2330" in matched
+
+    assert ContractFilter.from_setting({"發布商品類型": "", "發布到期月數": ""}) is None
+
+
+def test_filtered_contract_resolved_on_subscribe(connect):
+    gateway = connect(**{"發布商品類型": "FUT", "發布商品分類": "TXF"})
+    contracts = published_contracts(gateway)
+    assert contracts and all(c.product == Product.FUTURES for c in contracts.values())
+    assert all(symbol.startswith("TXF") for symbol in contracts)
+    assert "2330" not in dict.keys(gateway.code2contract)
+
+    gateway.subscribe(SubscribeRequest("2330", Exchange.LOCAL))
+    assert "2330" in gateway.subscribed
+    assert published_contracts(gateway)["2330"].product == Product.EQUITY
+    assert gateway.code2contract.get("9999") is None
+
+    # 查無的代碼不再重複查詢, 重新載入商品檔後才再查
+    calls = []
+    resolver = gateway.code2contract.resolver
+    gateway.code2contract.resolver = lambda code: calls.append(code) or resolver(code)
+    assert gateway.code2contract.get("9999") is None
+    assert calls == []
+    gateway.query_contract()
+    assert gateway.code2contract.get("9999") is None
+    assert calls == ["9999"]
+
+
+def test_filter_with_contract_cache(tmp_path, connect):
+    setting = {"商品檔快取": "開啟", "商品檔快取路徑": str(tmp_path), "發布商品類型": "OPT"}
+    cold = connect(**setting)
+    cold_contracts = published_contracts(cold)
+
+    warm = connect(**setting)
+    assert published_contracts(warm) == cold_contracts
+    assert warm.filtered_count == cold.filtered_count > 0
+    # 熱啟動時 api.Contracts 為空, 由快取的未發布商品延遲建立
+    code = cold.api.Contracts.Futures.TXF[0].code
+    warm.api.Contracts = SimContracts([], [], [])
+    assert warm.code2contract[code] == cold.code2contract[code]
@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+"""商品索引測試"""
+from datetime import date
+
+from vnpy_sinopac.gateway.contract_index import ContractIndex
+from vnpy_sinopac.gateway.simulator import default_catalog
+
+TODAY = date(2026, 10, 16)
+
+
+def build_index() -> ContractIndex:
+    catalog = default_catalog(TODAY, months=3, strikes=10, stocks=5)
+    index = ContractIndex()
+    for products in (catalog.Futures, catalog.Options, catalog.Stocks):
+        for category in products:
+            index.add_many(category)
+    # 重複加入不會產生重複結果
+    index.add_many(catalog.Futures.TXF)
+    return index
+
+
+def test_option_chain_by_strike_range():
+    index = build_index()
+    chain = index.get_option_chain("TXO", "202610", 21700, 21900)
+    assert [c.strike_price for c in chain] == [21700, 21700, 21800, 21800, 21900, 21900]
+    assert {c.option_right.value for c in chain} == {"C", "P"}
+    assert len(index.get_option_chain("TXO", "202610")) == 20
+    assert index.get_option_chain("TXO", "202612") == []
+
+
+def test_secondary_lookups():
+    index = build_index()
+    assert [c.code for c in index.get_by_category("MXF")] == ["MXFJ6", "MXFK6", "MXFL6"]
+    assert index.get_expiries("TXF") == ["202610", "202611", "202612"]
+    assert [c.code for c in index.get_by_expiry("202611")] == ["TXFK6", "MXFK6"]
+    assert [c.code for c in index.get_by_expiry("202611", "TXF")] == ["TXFK6"]
+    assert len(index.get_by_underlying("TXFJ6")) == 20
+    assert [c.code for c in index.get_by_industry("24")] == ["2330", "2331", "2332", "2333", "2334"]
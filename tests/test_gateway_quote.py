@@ -0,0 +1,110 @@
+# -*- coding: UTF-8 -*-
+"""行情 callback 測試"""
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from shioaji.contracts import Future
+from vnpy.event import EventEngine
+from vnpy.trader.event import EVENT_TICK
+
+from vnpy_sinopac import SinopacGateway
+
+
+def make_gateway() -> SinopacGateway:
+    gateway = SinopacGateway(EventEngine(), "Sinopac")
+    contract = Future(
+        code="TXFJ6",
+        symbol="TXF202610",
+        name="臺股期貨",
+        category="TXF",
+        delivery_month="202610",
+        limit_up=25000.0,
+        limit_down=20000.0,
+        unit=1,
+    )
+    gateway.code2contract[contract.code] = contract
+    return gateway
+
+
+def make_tick(close: str = "22510", simtrade: int = 0, price_chg: str = "10") -> SimpleNamespace:
+    return SimpleNamespace(
+        code="TXFJ6",
+        datetime=datetime(2026, 10, 16, 9, 0, 0),
+        open=Decimal("22500"),
+        close=Decimal(close),
+        high=Decimal("22520"),
+        low=Decimal("22490"),
+        volume=2,
+        total_volume=1000,
+        price_chg=Decimal(price_chg),
+        simtrade=simtrade,
+    )
+
+
+def make_bidask() -> SimpleNamespace:
+    return SimpleNamespace(
+        code="TXFJ6",
+        datetime=datetime(2026, 10, 16, 9, 0, 1),
+        bid_price=[Decimal(22509 - i) for i in range(5)],
+        ask_price=[Decimal(22510 + i) for i in range(5)],
+        bid_volume=[1, 2, 3, 4, 5],
+        ask_volume=[5, 4, 3, 2, 1],
+        simtrade=0,
+    )
+
+
+def published_ticks(gateway: SinopacGateway) -> list:
+    queue = gateway.event_engine._queue
+    ticks = []
+    while not queue.empty():
+        event = queue.get()
+        if event.type == EVENT_TICK:
+            ticks.append(event.data)
+    return ticks
+
+
+def test_tick_v1_callback_uses_quote_meta():
+    gateway = make_gateway()
+    gateway.tick_v1_callback(None, make_tick(simtrade=1))
+    gateway.tick_v1_callback(None, make_tick(close="22515"))
+
+    first, second = published_ticks(gateway)
+    assert first.name == "臺股期貨202610(試搓)"
+    assert second.name == "臺股期貨202610"
+    assert second.last_price == 22515.0
+    assert second.pre_close == 22505.0
+    assert second.limit_up == 25000.0
+    assert second.limit_down == 20000.0
+    assert first is not second
+
+
+def test_pre_close_subtracts_decimals_exactly():
+    gateway = make_gateway()
+    gateway.tick_v1_callback(None, make_tick(close="12.35", price_chg="0.05"))
+    assert published_ticks(gateway)[0].pre_close == 12.3
+
+
+def test_bidask_v1_callback_merges_into_tick():
+    gateway = make_gateway()
+    gateway.tick_v1_callback(None, make_tick())
+    gateway.bidask_v1_callback(None, make_bidask())
+
+    tick = published_ticks(gateway)[-1]
+    assert tick.last_price == 22510.0
+    assert tick.bid_price_1 == 22509
+    assert tick.bid_price_5 == 22505
+    assert tick.ask_price_5 == 22514
+    assert tick.bid_volume_5 == 5
+    assert tick.ask_volume_1 == 5
+
+
+def test_bidask_v1_callback_updates_order_book():
+    from vnpy_sinopac.gateway.order_book import OrderBookStore
+
+    gateway = make_gateway()
+    gateway.order_book = OrderBookStore()
+    gateway.bidask_v1_callback(None, make_bidask())
+
+    assert gateway.order_book.symbols == ["TXFJ6"]
+    assert gateway.order_book.spreads()[0] == 1.0
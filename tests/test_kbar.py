@@ -0,0 +1,57 @@
+# -*- coding: UTF-8 -*-
+from datetime import datetime
+
+import polars as pl
+import pytest
+from vnpy.trader.constant import Exchange, Interval
+
+from vnpy_sinopac.gateway.kbar import normalize_kbars, to_bars
+from vnpy_sinopac.gateway.utility import TW_TZ
+
+# Shioaji 以台北時間當作 UTC 編碼
+EPOCH = int((datetime(2026, 10, 16, 8, 46) - datetime(1970, 1, 1)).total_seconds())
+EXPECTED = TW_TZ.localize(datetime(2026, 10, 16, 8, 46))
+
+
+def kbars(ts: list) -> dict:
+    n = len(ts)
+    return {
+        "ts": ts,
+        "Open": [100.1234567] * n,
+        "High": [101.0] * n,
+        "Low": [99.0] * n,
+        "Close": [100.5] * n,
+        "Volume": [3] * n,
+        "Amount": [301.5] * n,
+    }
+
+
+@pytest.mark.parametrize(
+    "ts",
+    [
+        [EPOCH * 10**9],
+        [EPOCH * 10**6],
+        [EPOCH * 10**3],
+        [EPOCH],
+        [float(EPOCH)],
+        ["2026-10-16 08:46:00"],
+        pl.Series([datetime(2026, 10, 16, 8, 46)]),
+        pl.Series([datetime(2026, 10, 16, 0, 46)]).dt.replace_time_zone("UTC"),
+    ],
+)
+def test_normalize_timestamps(ts):
+    df = normalize_kbars(kbars(ts))
+    assert df["ts"].dtype == pl.Datetime(df["ts"].dtype.time_unit, "Asia/Taipei")
+    assert df["ts"][0] == EXPECTED
+    assert df["Open"][0] == 100.123457
+
+
+def test_to_bars():
+    df = normalize_kbars(kbars([EPOCH * 10**9, (EPOCH + 60) * 10**9]))
+    bars = to_bars(df, "TXFJ6", Exchange.LOCAL, Interval.MINUTE, "Sinopac")
+    assert [bar.datetime for bar in bars] == [EXPECTED, EXPECTED.replace(minute=47)]
+    assert (bars[0].vt_symbol, bars[0].close_price, bars[0].volume, bars[0].turnover) == ("TXFJ6.LOCAL", 100.5, 3, 301.5)
+
+    assert to_bars(normalize_kbars(kbars([])), "TXFJ6", Exchange.LOCAL, Interval.MINUTE, "Sinopac") == []
+    with pytest.raises(ValueError):
+        normalize_kbars(kbars(["not a time"]))
@@ -0,0 +1,135 @@
+# -*- coding: UTF-8 -*-
+"""一分 K 快取測試"""
+from datetime import date, datetime, time, timedelta
+
+import polars as pl
+import pytest
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import HistoryRequest
+
+from vnpy_sinopac import SinopacGateway
+from vnpy_sinopac.gateway.kbar import normalize_kbars
+from vnpy_sinopac.gateway.kbar_cache import KbarCache
+from vnpy_sinopac.gateway.simulator import SimShioaji
+
+from .helpers import FUTURE
+
+
+@pytest.fixture
+def connect(connect_gateway):
+    def connect(root=None) -> SinopacGateway:
+        setting = {} if root is None else {"K線快取": "開啟", "K線快取路徑": str(root)}
+        return connect_gateway(setting, reload=False)
+
+    return connect
+
+
+def record_kbars(gateway: SinopacGateway) -> list:
+    calls = []
+    kbars = gateway.api.kbars
+
+    def wrapper(contract, start, end, timeout=30000):
+        calls.append((start, end))
+        return kbars(contract, start, end, timeout)
+
+    gateway.api.kbars = wrapper
+    return calls
+
+
+def history(gateway: SinopacGateway, start: date, end: date) -> list:
+    req = HistoryRequest(
+        symbol=FUTURE,
+        exchange=Exchange.LOCAL,
+        start=datetime(start.year, start.month, start.day),
+        end=datetime(end.year, end.month, end.day),
+        interval=Interval.MINUTE,
+    )
+    return gateway.query_history(req)
+
+
+def test_query_history_fetches_only_gaps(tmp_path, connect):
+    gateway = connect(tmp_path)
+    direct = connect()
+    calls = record_kbars(gateway)
+
+    history(gateway, date(2025, 3, 3), date(2025, 3, 5))
+    assert calls == [("2025-03-03", "2025-03-05")]
+
+    calls.clear()
+    bars = history(gateway, date(2025, 2, 27), date(2025, 3, 7))
+    assert calls == [("2025-02-27", "2025-03-02"), ("2025-03-06", "2025-03-07")]
+    assert bars == history(direct, date(2025, 2, 27), date(2025, 3, 7))
+    assert len(bars) == 7 * 300
+    assert {path.name for path in (tmp_path / "local" / FUTURE).iterdir()} == {
+        "202502.parquet",
+        "202503.parquet",
+        "coverage.json",
+    }
+
+    calls.clear()
+    assert history(gateway, date(2025, 3, 1), date(2025, 3, 4)) == bars[2 * 300:4 * 300]
+    assert calls == []
+
+    gateway.invalidate_history(FUTURE, date(2025, 3, 4), date(2025, 3, 4))
+    assert history(gateway, date(2025, 2, 27), date(2025, 3, 7)) == bars
+    assert calls == [("2025-03-04", "2025-03-04")]
+    assert gateway.kbar_cache.get_stats() == {
+        "requests": 4,
+        "hits": 1,
+        "fetches": 4,
+        "fetched_days": 10,
+        "cached_days": 15,
+    }
+
+    gateway.invalidate_history(FUTURE)
+    assert not (tmp_path / "local" / FUTURE).exists()
+
+
+def test_today_is_always_refetched(tmp_path):
+    api = SimShioaji()
+    contract = api.Contracts.get(FUTURE)
+    cache = KbarCache(tmp_path, "local")
+    calls = []
+
+    def fetch(start: str, end: str):
+        calls.append((start, end))
+        return normalize_kbars(api.kbars(contract, start, end))
+
+    today = date(2025, 3, 5)
+    first = cache.load(FUTURE, date(2025, 3, 3), today, fetch, today=today)
+    second = cache.load(FUTURE, date(2025, 3, 3), today, fetch, today=today)
+    assert calls == [("2025-03-03", "2025-03-05"), ("2025-03-05", "2025-03-05")]
+    assert second.equals(first) and len(first) == 900
+
+
+def test_night_session_belongs_to_next_trading_day(tmp_path):
+    """api.kbars 的交易日 D 含前一交易日 15:00 之後的夜盤"""
+    cache = KbarCache(tmp_path, "local")
+
+    def fetch(start: str, end: str):
+        ts = []
+        day = date.fromisoformat(start)
+        while day <= date.fromisoformat(end):
+            if day.weekday() < 5:
+                night = day - timedelta(days=3 if day.weekday() == 0 else 1)
+                ts += [datetime.combine(night, time(15)), datetime.combine(day, time(9))]
+            day += timedelta(days=1)
+        n = len(ts)
+        return normalize_kbars(
+            {"ts": pl.Series(ts), "Open": [1.0] * n, "High": [1.0] * n, "Low": [1.0] * n,
+             "Close": [1.0] * n, "Volume": [1] * n, "Amount": [1.0] * n}
+        )
+
+    expected = fetch("2026-10-15", "2026-10-16")
+    for _ in range(3):  # 今日每次重新下載, 不可重複累積
+        df = cache.load(FUTURE, date(2026, 10, 15), date(2026, 10, 16), fetch, today=date(2026, 10, 16))
+        assert df.equals(expected)
+    assert len(pl.read_parquet(tmp_path / "local" / FUTURE / "202610.parquet")) == 4
+
+    # 週一的夜盤來自上週五, 跨月的夜盤歸屬交易日所屬月份
+    monday = cache.load(FUTURE, date(2026, 10, 19), date(2026, 10, 19), fetch, today=date(2026, 10, 20))
+    assert monday["ts"].dt.replace_time_zone(None).to_list() == [datetime(2026, 10, 16, 15), datetime(2026, 10, 19, 9)]
+    november = cache.load(FUTURE, date(2026, 11, 2), date(2026, 11, 2), fetch, today=date(2026, 12, 1))
+    assert len(november) == 2
+    assert len(pl.read_parquet(tmp_path / "local" / FUTURE / "202611.parquet")) == 2
+    assert cache.load(FUTURE, date(2026, 10, 15), date(2026, 10, 19), fetch, today=date(2026, 10, 20)).height == 6
@@ -0,0 +1,58 @@
+# -*- coding: UTF-8 -*-
+"""委託歸檔測試"""
+import pytest
+from vnpy.trader.constant import Direction, Exchange, OrderType, Status
+from vnpy.trader.event import EVENT_LOG
+from vnpy.trader.object import CancelRequest, OrderRequest
+
+from vnpy_sinopac import SinopacGateway
+
+from .helpers import FUTURE
+
+
+@pytest.fixture
+def gateway(connect_gateway) -> SinopacGateway:
+    gateway = connect_gateway({"委託歸檔": "開啟", "歸檔保留筆數": "300"})
+    gateway.order_archive.chunk_size = 64
+    return gateway
+
+
+def place_and_cancel(gateway: SinopacGateway, count: int) -> list:
+    reqs = [OrderRequest(FUTURE, Exchange.LOCAL, Direction.LONG, OrderType.LIMIT, 1, 21000 + i) for i in range(count)]
+    orderids = [vt_orderid.split(".", 1)[1] for vt_orderid in map(gateway.send_order, reqs)]
+    for orderid in orderids:
+        gateway.cancel_order(CancelRequest(orderid, FUTURE, Exchange.LOCAL))
+    return orderids
+
+
+def test_terminal_orders_archived_after_grace_period(gateway):
+    orderids = place_and_cancel(gateway, 20)
+    active = gateway.send_order(OrderRequest(FUTURE, Exchange.LOCAL, Direction.LONG, OrderType.LIMIT, 1, 20000))
+
+    assert gateway.archive_orders(now=0) == 0  # 記錄結束時間, 尚未超過保留期
+    assert gateway.archive_orders(now=gateway.archive_delay) == 20
+    assert list(gateway.orders) == [active.split(".", 1)[1]]
+    assert len(gateway.trades) == 1 and len(gateway.order_ids.sj2local) == 1
+
+    order = gateway.get_order(orderids[3])
+    assert (order.status, order.price, order.volume, order.direction) == (Status.CANCELLED, 21003, 1, Direction.LONG)
+    gateway.event_engine._queue.queue.clear()
+    gateway.cancel_order(CancelRequest(orderids[3], FUTURE, Exchange.LOCAL))
+    log = gateway.event_engine._queue.get().data
+    assert log.msg.endswith("can't cancel.") and Status.CANCELLED.value in log.msg
+
+
+def test_hot_state_flat_over_many_rounds(gateway):
+    gateway.archive_delay = 0
+    for _ in range(5):
+        place_and_cancel(gateway, 100)
+        gateway.archive_orders()
+        assert not gateway.orders and not gateway.trades and not gateway.terminal_since
+        assert not gateway.order_ids.local2sj and not gateway.order_ids.seqno2local
+    archive = gateway.order_archive
+    assert archive.archived == 500 and len(archive) <= 300 + archive.chunk_size
+    assert archive.dropped > 0
+    assert archive.to_frame()["status"].unique().to_list() == [Status.CANCELLED.value]
+    gateway.close()
+    logs = [e.data.msg for e in list(gateway.event_engine._queue.queue) if e.type == EVENT_LOG]
+    assert "委託歸檔: 共 500 筆, 保留 300 筆." in logs
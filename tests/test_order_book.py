@@ -0,0 +1,50 @@
+# -*- coding: UTF-8 -*-
+"""五檔報價陣列測試"""
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from vnpy_sinopac.gateway.order_book import OrderBookStore
+
+
+def fill(store: OrderBookStore, symbol: str, bid: float, ask: float, bid_vol, ask_vol):
+    store.update(
+        symbol,
+        datetime(2026, 10, 16, 9, 0, 0),
+        [Decimal(str(bid - i)) for i in range(5)],
+        bid_vol,
+        [Decimal(str(ask + i)) for i in range(5)],
+        ask_vol,
+    )
+
+
+def test_vectorized_views():
+    store = OrderBookStore(capacity=1)
+    fill(store, "2330", 1000, 1005, [10, 1, 1, 1, 1], [30, 1, 1, 1, 1])
+    fill(store, "2317", 200, 200.5, [5, 5, 5, 5, 5], [5, 5, 5, 5, 5])
+
+    assert store.symbols == ["2330", "2317"]
+    np.testing.assert_allclose(store.spreads(), [5.0, 0.5])
+    np.testing.assert_allclose(store.mid_prices(), [1002.5, 200.25])
+    np.testing.assert_allclose(store.imbalance(), [-0.5, 0.0])
+    np.testing.assert_allclose(store.imbalance(levels=5), [-20 / 48, 0.0])
+    np.testing.assert_allclose(
+        store.top_of_book(), [[1000, 10, 1005, 30], [200, 5, 200.5, 5]]
+    )
+
+
+def test_views_are_read_only():
+    store = OrderBookStore()
+    fill(store, "2330", 1000, 1005, [1] * 5, [1] * 5)
+    with pytest.raises(ValueError):
+        store.best_bid()[0] = 0
+
+
+def test_empty_rows_have_zero_imbalance():
+    store = OrderBookStore()
+    store.add("2330")
+    np.testing.assert_array_equal(store.imbalance(), [0.0])
+    assert store.row("2330") == 0
+    assert store.row("2317") is None
@@ -0,0 +1,64 @@
+# -*- coding: UTF-8 -*-
+"""成交增量部位與核對測試"""
+import shioaji.constant as sj_constant
+from vnpy.trader.constant import Direction, Exchange, Offset, OrderType
+from vnpy.trader.event import EVENT_LOG, EVENT_POSITION
+from vnpy.trader.object import OrderRequest
+
+from vnpy_sinopac.gateway.position_book import PositionBook
+
+from .helpers import FUTURE, STOCK
+
+
+def test_deals_update_volume_yd_and_average_price():
+    positions = {}
+    book = PositionBook(positions, "Sinopac")
+    book.on_deal(FUTURE, Direction.LONG, Offset.OPEN, 100, 2)
+    pos = book.on_deal(FUTURE, Direction.LONG, Offset.OPEN, 103, 1)
+    assert (pos.volume, pos.price) == (3, 101)
+
+    pos.yd_volume = 2  # 昨日部位
+    book.on_deal(FUTURE, Direction.SHORT, Offset.CLOSETODAY, 104, 1)
+    assert (pos.volume, pos.yd_volume, pos.frozen) == (2, 2, 0)
+    book.on_deal(FUTURE, Direction.SHORT, Offset.CLOSE, 104, 3)
+    assert (pos.direction, pos.volume, pos.yd_volume, pos.price) == (Direction.SHORT, 1, 0, 104)
+    assert positions[FUTURE] is pos
+
+
+def test_reconcile_corrects_drift(connect_gateway):
+    gateway = connect_gateway()
+    gateway.api.add_liquidity(FUTURE, sj_constant.Action.Sell, 22000, 3)
+    gateway.send_order(OrderRequest(FUTURE, Exchange.LOCAL, Direction.LONG, OrderType.LIMIT, 3, 22000))
+    gateway.event_engine._queue.queue.clear()
+
+    gateway.positions[FUTURE].volume = 5
+    gateway.positions[STOCK] = gateway.position_book.on_deal(STOCK, Direction.LONG, Offset.NONE, 500, 1)
+    gateway.position_book.last_deal.clear()
+    gateway.query_position()
+    logs = [e.data.msg for e in list(gateway.event_engine._queue.queue) if e.type == EVENT_LOG]
+    drift = [msg for msg in logs if msg.startswith("部位核對")]
+    # 股票與期貨帳號分別核對
+    assert len(drift) == 2 and "2330 本地 多1 券商 0" in drift[0] and "TXFJ6 本地 多5 券商 多3" in drift[1]
+    assert gateway.positions[FUTURE].volume == 3 and gateway.positions[STOCK].volume == 0
+
+
+def test_refresh_emits_only_changed_positions(connect_gateway):
+    gateway = connect_gateway()
+    queue = gateway.event_engine._queue
+
+    def refresh() -> list:
+        queue.queue.clear()
+        gateway.query_position()
+        return [(e.data.direction, e.data.volume) for e in list(queue.queue) if e.type == EVENT_POSITION]
+
+    gateway.api.add_liquidity(FUTURE, sj_constant.Action.Sell, 22000, 2)
+    gateway.send_order(OrderRequest(FUTURE, Exchange.LOCAL, Direction.LONG, OrderType.LIMIT, 2, 22000))
+    assert refresh() == [(Direction.LONG, 2)]
+    assert refresh() == []
+    assert gateway.position_stats["suppressed"] == 1
+
+    # 反手後推送新方向部位, 並以零部位移除原方向
+    gateway.api.add_liquidity(FUTURE, sj_constant.Action.Buy, 22000, 3)
+    gateway.send_order(OrderRequest(FUTURE, Exchange.LOCAL, Direction.SHORT, OrderType.LIMIT, 3, 22000))
+    assert refresh() == [(Direction.SHORT, 1), (Direction.LONG, 0)]
+    assert refresh() == []
@@ -0,0 +1,83 @@
+# -*- coding: UTF-8 -*-
+"""Tick 驅動部位損益測試"""
+import time
+
+import pytest
+import shioaji.constant as sj_constant
+from vnpy.trader.constant import Direction, Exchange, OrderType
+from vnpy.trader.event import EVENT_POSITION
+from vnpy.trader.object import OrderRequest, PositionData, SubscribeRequest
+
+from vnpy_sinopac import SinopacGateway
+
+from .helpers import FUTURE, STOCK
+
+MINI_FUTURE = "MXFJ6"
+
+
+@pytest.fixture
+def gateway(connect_gateway) -> SinopacGateway:
+    return connect_gateway({"即時損益": "開啟", "損益推送間隔(毫秒)": "60000"})
+
+
+def positions(gateway: SinopacGateway) -> list:
+    queue = gateway.event_engine._queue
+    events = []
+    while not queue.empty():
+        event = queue.get()
+        if event.type == EVENT_POSITION:
+            events.append((event.data.symbol, event.data.pnl))
+    return events
+
+
+def buy(gateway: SinopacGateway, symbol: str, price: float, volume: int) -> None:
+    gateway.subscribe(SubscribeRequest(symbol, Exchange.LOCAL))
+    gateway.api.add_liquidity(symbol, sj_constant.Action.Sell, price, volume)
+    gateway.send_order(OrderRequest(symbol, Exchange.LOCAL, Direction.LONG, OrderType.LIMIT, volume, price))
+
+
+def test_tick_revalues_position_with_throttle(gateway):
+    buy(gateway, FUTURE, 22000, 2)
+    assert positions(gateway) == [(FUTURE, 0)]
+
+    contract = gateway.code2contract[FUTURE]
+    gateway.api.publish_trade(contract, 22010, 1)
+    assert positions(gateway) == [(FUTURE, 10 * 2 * 200)]
+    # 間隔內的變動只更新 pnl, 由計時器補送最新狀態
+    gateway.api.publish_trade(contract, 22020, 1)
+    gateway.api.publish_trade(contract, 21990, 1)
+    assert positions(gateway) == []
+    assert gateway.positions[FUTURE].pnl == -10 * 2 * 200
+    gateway.marker.flush(now=time.monotonic() + 60)
+    assert positions(gateway) == [(FUTURE, -4000)]
+
+    # 部位核對替換物件後, 補送的是目前的部位而非舊物件
+    gateway.api.publish_trade(contract, 22030, 1)
+    assert positions(gateway) == []
+    corrected = PositionData(
+        symbol=FUTURE, exchange=Exchange.LOCAL, direction=Direction.LONG, volume=3, price=22000, pnl=1, gateway_name="Sinopac"
+    )
+    gateway.positions[FUTURE] = corrected
+    gateway.marker.flush(now=time.monotonic() + 120)
+    assert positions(gateway) == [(FUTURE, 1)]
+
+
+def test_future_pnl_uses_contract_multiplier(gateway):
+    """ContractData.size 一律為 200, 小台須以合約的 multiplier (50) 計算損益"""
+    contract = gateway.code2contract[MINI_FUTURE]
+    assert contract.multiplier == 50
+    buy(gateway, MINI_FUTURE, 22000, 2)
+    positions(gateway)
+    gateway.api.publish_trade(contract, 22010, 1)
+    assert positions(gateway) == [(MINI_FUTURE, 10 * 2 * 50)]
+
+
+def test_stock_pnl_uses_shares_per_lot(gateway):
+    buy(gateway, STOCK, 100, 1)
+    positions(gateway)
+    gateway.api.publish_trade(gateway.code2contract[STOCK], 105, 1)
+    assert positions(gateway) == [(STOCK, 5 * 1000)]
+    gateway.api.publish_trade(gateway.code2contract[FUTURE], 22010, 1)  # 無部位的商品不重估
+    assert positions(gateway) == []
+    gateway.close()
+    assert gateway.marker is None
@@ -0,0 +1,78 @@
+# -*- coding: UTF-8 -*-
+"""行情派送佇列測試"""
+import threading
+import time
+
+from vnpy_sinopac.gateway.quote_dispatcher import OverflowPolicy, QuoteDispatcher
+
+
+def test_drop_oldest_keeps_latest_items():
+    received = []
+    dispatcher = QuoteDispatcher(4, OverflowPolicy.DROP_OLDEST)
+    for i in range(10):
+        assert dispatcher.put(received.append, i)
+
+    stats = dispatcher.get_stats()
+    assert stats["depth"] == 4
+    assert stats["high_water"] == 4
+    assert stats["dropped"] == 6
+
+    dispatcher.start()
+    dispatcher.stop()
+    assert received == [6, 7, 8, 9]
+    assert dispatcher.get_stats()["processed"] == 4
+
+
+def test_drop_newest_rejects_when_full():
+    received = []
+    dispatcher = QuoteDispatcher(4, OverflowPolicy.DROP_NEWEST)
+    results = [dispatcher.put(received.append, i) for i in range(6)]
+
+    assert results == [True] * 4 + [False] * 2
+    dispatcher.start()
+    dispatcher.stop()
+    assert received == [0, 1, 2, 3]
+    assert dispatcher.get_stats()["dropped"] == 2
+
+
+def test_block_waits_for_dispatcher():
+    received = []
+    release = threading.Event()
+
+    def slow_handler(item):
+        release.wait()
+        received.append(item)
+
+    dispatcher = QuoteDispatcher(2, OverflowPolicy.BLOCK, batch=1)
+    dispatcher.start()
+    producer = threading.Thread(
+        target=lambda: [dispatcher.put(slow_handler, i) for i in range(5)]
+    )
+    producer.start()
+    time.sleep(0.05)
+    assert producer.is_alive()
+
+    release.set()
+    producer.join(timeout=1)
+    dispatcher.stop()
+    assert received == [0, 1, 2, 3, 4]
+    assert dispatcher.get_stats()["dropped"] == 0
+
+
+def test_handler_error_does_not_stop_dispatcher():
+    errors = []
+    received = []
+
+    def handler(item):
+        if item == 1:
+            raise ValueError("bad tick")
+        received.append(item)
+
+    dispatcher = QuoteDispatcher(8, on_error=errors.append)
+    dispatcher.start()
+    for i in range(3):
+        dispatcher.put(handler, i)
+    dispatcher.stop()
+
+    assert received == [0, 2]
+    assert len(errors) == 1
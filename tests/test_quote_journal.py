@@ -0,0 +1,116 @@
+# -*- coding: UTF-8 -*-
+"""行情紀錄測試"""
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from vnpy_sinopac.gateway.quote_journal import JournalKind, QuoteJournal, read_journal
+from vnpy_sinopac.gateway.utility import get_trading_day
+
+
+def make_tick(code: str, dt: datetime, close: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        code=code,
+        datetime=dt,
+        open=Decimal("100"),
+        high=Decimal("101"),
+        low=Decimal("99"),
+        close=Decimal(close),
+        price_chg=Decimal("1"),
+        total_amount=Decimal("1000"),
+        volume=1,
+        total_volume=10,
+        simtrade=0,
+    )
+
+
+def make_bidask(code: str, dt: datetime) -> SimpleNamespace:
+    return SimpleNamespace(
+        code=code,
+        datetime=dt,
+        bid_price=[Decimal(100 - i) for i in range(5)],
+        ask_price=[Decimal(101 + i) for i in range(5)],
+        bid_volume=[1, 2, 3, 4, 5],
+        ask_volume=[5, 4, 3, 2, 1],
+        underlying_price=Decimal("22000"),
+        simtrade=0,
+    )
+
+
+def test_trading_day_rolls_night_session():
+    assert get_trading_day(datetime(2026, 10, 15, 9, 0)) == date(2026, 10, 15)
+    assert get_trading_day(datetime(2026, 10, 15, 15, 0)) == date(2026, 10, 16)
+    # 週五夜盤與週六凌晨歸屬下週一
+    assert get_trading_day(datetime(2026, 10, 16, 20, 0)) == date(2026, 10, 19)
+    assert get_trading_day(datetime(2026, 10, 17, 4, 0)) == date(2026, 10, 19)
+
+
+def test_journal_round_trip_with_rolling_segments(tmp_path):
+    journal = QuoteJournal(tmp_path, capacity=3)
+    dt = datetime(2026, 10, 15, 9, 0, 0)
+    for i in range(4):
+        journal.record_tick(make_tick("2330", dt, 100 + i))
+    journal.record_bidask(make_bidask("TXFJ6", dt))
+    assert journal.flush() == 5
+
+    assert len(list((tmp_path / "20261015").glob("quotes_*.bin"))) == 2
+    df = read_journal(tmp_path, date(2026, 10, 15))
+    assert len(df) == 5
+    assert df["code"].to_list() == ["2330"] * 4 + ["TXFJ6"]
+    assert df["close"].to_list()[:4] == [100.0, 101.0, 102.0, 103.0]
+    assert df["kind"].to_list() == [JournalKind.TICK_STK] * 4 + [JournalKind.BIDASK_FOP]
+    assert df["datetime"][0] == dt
+    assert df["bid_price_5"][4] == 96.0
+    assert df["ask_volume_1"][4] == 5
+
+
+def test_journal_appends_after_restart(tmp_path):
+    dt = datetime(2026, 10, 15, 9, 0, 0)
+    for close in (100, 101):
+        journal = QuoteJournal(tmp_path, capacity=10)
+        journal.record_tick(make_tick("2330", dt, close))
+        journal.flush()
+
+    df = read_journal(tmp_path, date(2026, 10, 15))
+    assert df["close"].to_list() == [100.0, 101.0]
+
+
+def test_read_journal_is_zero_copy(tmp_path):
+    journal = QuoteJournal(tmp_path, capacity=10)
+    journal.record_tick(make_tick("2330", datetime(2026, 10, 15, 9, 0), 100))
+    journal.flush()
+
+    df = read_journal(tmp_path, date(2026, 10, 15))
+    close = df["close"].to_numpy()
+    assert not close.flags.owndata
+    assert read_journal(tmp_path, date(2026, 10, 16)).is_empty()
+
+
+def test_long_code_rejected_instead_of_truncated(tmp_path):
+    errors = []
+    journal = QuoteJournal(tmp_path, capacity=10, on_error=errors.append)
+    dt = datetime(2026, 10, 15, 9, 0)
+    long_code = "X" * 17
+    journal.record_tick(make_tick(long_code, dt, 100))
+    journal.record_tick(make_tick("2330", dt, 101))
+    journal.record_tick(make_tick(long_code, dt, 102))
+    assert journal.flush() == 1
+
+    assert read_journal(tmp_path, date(2026, 10, 15))["code"].to_list() == ["2330"]
+    assert (journal.recorded, journal.rejected) == (1, 2)
+    assert len(errors) == 1 and long_code in str(errors[0])
+
+
+def test_queue_bounded_when_writer_stalls(tmp_path):
+    journal = QuoteJournal(tmp_path, capacity=10, queue_size=3)
+    dt = datetime(2026, 10, 15, 9, 0)
+    for close in range(5):
+        journal.record_tick(make_tick("2330", dt, 100 + close))
+    journal.record_bidask(make_bidask("TXFJ6", dt))
+    assert (len(journal.queue), journal.dropped) == (3, 3)
+
+    assert journal.flush() == 3
+    assert journal.high_water == 3
+    journal.record_tick(make_tick("2330", dt, 200))
+    journal.flush()
+    assert read_journal(tmp_path, date(2026, 10, 15))["close"].to_list() == [100.0, 101.0, 102.0, 200.0]
@@ -0,0 +1,64 @@
+# -*- coding: UTF-8 -*-
+"""下單/查詢流量控制測試"""
+import threading
+import time
+
+from vnpy.trader.constant import Direction, Exchange, OrderType, Status
+from vnpy.trader.object import OrderRequest
+
+from vnpy_sinopac.gateway.rate_limiter import (
+    PRIORITY_CANCEL,
+    PRIORITY_ORDER,
+    RequestScheduler,
+    TokenBucket,
+)
+
+from .helpers import FUTURE
+
+
+def wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while not predicate() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+
+def test_burst_smoothed_with_cancel_priority():
+    sent = []
+    scheduler = RequestScheduler({"order": TokenBucket(5, 0.5)})
+    gate = threading.Event()
+    scheduler.submit("order", PRIORITY_ORDER, "place_order", gate.wait)
+    scheduler.start()
+    for i in range(9):
+        scheduler.submit("order", PRIORITY_ORDER, "place_order", sent.append, f"order{i}")
+    scheduler.submit("order", PRIORITY_CANCEL, "cancel_order", sent.append, "cancel")
+    start = time.perf_counter()
+    gate.set()
+
+    wait_until(lambda: len(sent) == 10)
+    elapsed = time.perf_counter() - start
+    assert scheduler.stop() == 0
+    # 第一個請求送出時其餘已排隊, 刪單排在所有新單之前
+    assert sent[0] == "cancel"
+    assert sent[1:] == [f"order{i}" for i in range(9)]
+    # 額度 5 次/0.5 秒: 前 5 筆立即送出, 其餘 5 筆以每 0.1 秒一筆送出
+    assert elapsed >= 0.4
+    stats = scheduler.get_stats()
+    assert stats["place_order"]["sent"] == 10 and stats["cancel_order"]["sent"] == 1
+    assert stats["place_order"]["wait_max_ms"] >= 300
+
+
+def test_gateway_orders_queued_instead_of_rejected(connect_gateway):
+    gateway = connect_gateway({"流量控制": "開啟", "下單流量(次/10秒)": "30"})
+
+    vt_orderids = [
+        gateway.send_order(
+            OrderRequest(FUTURE, Exchange.LOCAL, Direction.LONG, OrderType.LIMIT, 1, 21000 + i)
+        )
+        for i in range(32)
+    ]
+    orders = [gateway.orders[vt_orderid.split(".", 1)[1]] for vt_orderid in vt_orderids]
+    wait_until(lambda: all(order.status == Status.NOTTRADED for order in orders))
+    assert all(order.status == Status.NOTTRADED for order in orders)
+    stats = gateway.scheduler.get_stats()["place_order"]
+    assert stats["sent"] == 32 and stats["wait_max_ms"] >= 300
+    gateway.close()
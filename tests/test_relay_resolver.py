@@ -0,0 +1,64 @@
+# -*- coding: UTF-8 -*-
+"""未知委託回報補齊測試"""
+import time
+
+import pytest
+import shioaji.constant as sj_constant
+from vnpy.trader.constant import Status
+from vnpy.trader.event import EVENT_ORDER, EVENT_TRADE
+
+from vnpy_sinopac import SinopacGateway
+
+from .helpers import FUTURE, drain
+
+
+@pytest.fixture
+def gateway(connect_gateway) -> SinopacGateway:
+    gateway = connect_gateway()
+    drain(gateway)
+    return gateway
+
+
+def place_without_callback(gateway: SinopacGateway, price: float):
+    """模擬回報先於下單回呼到達: 不經 send_order 直接下單"""
+    api = gateway.api
+    order = api.Order(
+        price,
+        1,
+        action=sj_constant.Action.Buy,
+        price_type=sj_constant.FuturesPriceType.LMT,
+        order_type=sj_constant.OrderType.ROD,
+        octype=sj_constant.FuturesOCType.Auto,
+    )
+    return api.place_order(gateway.code2contract[FUTURE], order)
+
+
+def test_parked_relays_completed_by_place_order_callback(gateway):
+    gateway.resolver.delay = 60  # 不觸發背景查詢
+    gateway.api.add_liquidity(FUTURE, sj_constant.Action.Sell, 22000, 1)
+
+    trade = place_without_callback(gateway, 22000)
+    assert list(gateway.resolver.pending) == [trade.order.seqno]
+    assert len(gateway.resolver.pending[trade.order.seqno].relays) == 2
+    assert EVENT_ORDER not in drain(gateway)
+
+    gateway.place_order_callback(trade)
+    events = drain(gateway)
+    assert [t.volume for t in events[EVENT_TRADE]] == [1]
+    assert events[EVENT_ORDER][-1].status == Status.ALLTRADED
+    stats = gateway.resolver.get_stats()
+    assert (stats["pending"], stats["resolved"], stats["fetched"]) == (0, 1, 0)
+    gateway.close()
+
+
+def test_background_resolver_fetches_unknown_trade(gateway):
+    trade = place_without_callback(gateway, 21900)
+
+    deadline = time.perf_counter() + 5
+    while gateway.resolver.pending and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert gateway.trades[trade.order.id] is trade
+    assert drain(gateway)[EVENT_ORDER][-1].status == Status.NOTTRADED
+    stats = gateway.resolver.get_stats()
+    assert stats["fetched"] == 1 and stats["latency_max_ms"] >= 0
+    gateway.close()
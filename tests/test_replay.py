@@ -0,0 +1,98 @@
+# -*- coding: UTF-8 -*-
+"""行情回放測試"""
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from vnpy.event import EventEngine
+from vnpy.trader.event import EVENT_TICK
+
+from vnpy_sinopac.gateway.quote_dispatcher import QuoteDispatcher
+from vnpy_sinopac.gateway.quote_journal import QuoteJournal
+from vnpy_sinopac.gateway.replay import ReplayDriver
+from vnpy_sinopac.gateway.tick_conflator import TickConflator
+
+
+def record_session(root) -> None:
+    journal = QuoteJournal(root, capacity=100)
+    start = datetime(2026, 10, 15, 9, 0, 0)
+    for i in range(20):
+        dt = start + timedelta(milliseconds=i)
+        journal.record_tick(
+            SimpleNamespace(
+                code="TXFJ6",
+                datetime=dt,
+                open=Decimal("22500"),
+                high=Decimal("22520"),
+                low=Decimal("22490"),
+                close=Decimal(22500 + i),
+                price_chg=Decimal(i),
+                total_amount=Decimal("0"),
+                volume=1,
+                total_volume=i + 1,
+                underlying_price=Decimal("22400"),
+                simtrade=0,
+            )
+        )
+        journal.record_bidask(
+            SimpleNamespace(
+                code="2330",
+                datetime=dt,
+                bid_price=[Decimal(1000 - j) for j in range(5)],
+                ask_price=[Decimal(1005 + j) for j in range(5)],
+                bid_volume=[i] * 5,
+                ask_volume=[1] * 5,
+                simtrade=0,
+            )
+        )
+    journal.flush()
+
+
+def test_replay_drives_gateway_callbacks(tmp_path):
+    record_session(tmp_path)
+    driver = ReplayDriver.from_journal(tmp_path, date(2026, 10, 15))
+    result = driver.run()
+
+    assert result["events"] == 40
+    assert result["published"] == 40
+    assert result["throughput"] > 0
+    assert result["latency_max_us"] >= result["latency_p50_us"]
+
+    ticks = driver.gateway.ticks
+    assert ticks["TXFJ6"].last_price == 22519.0
+    assert ticks["2330"].bid_price_1 == 1000.0
+    assert ticks["2330"].bid_volume_1 == 19
+
+
+def test_replay_paces_at_requested_speed(tmp_path):
+    record_session(tmp_path)
+    # 紀錄跨 19 毫秒, 0.5 倍速約需 38 毫秒
+    driver = ReplayDriver.from_journal(tmp_path, date(2026, 10, 15), speed=0.5)
+    result = driver.run()
+    assert result["events"] / result["feed_rate"] >= 0.035
+
+
+def test_replay_waits_for_slow_handlers(tmp_path):
+    record_session(tmp_path)
+    gateway = ReplayDriver.create_gateway(EventEngine())
+    gateway.dispatcher = QuoteDispatcher(64)
+    gateway.dispatcher.start()
+    gateway.conflator = TickConflator(60, gateway.on_tick, lambda: False, gateway.tick_lock)
+    handled = []
+
+    def slow_handler(event) -> None:
+        time.sleep(0.02)
+        handled.append(event.data.symbol)
+
+    gateway.event_engine.register(EVENT_TICK, slow_handler)
+    driver = ReplayDriver.from_journal(tmp_path, date(2026, 10, 15), gateway=gateway)
+    try:
+        result = driver.run()
+        # 合併間隔 60 秒: 每檔商品只推送第一筆, 其餘在回放結束時強制送出
+        assert result["published"] == 4
+        assert handled == ["TXFJ6", "2330", "TXFJ6", "2330"]
+        assert driver.gateway.ticks["TXFJ6"].last_price == 22519.0
+    finally:
+        gateway.event_engine.stop()
+        gateway.dispatcher.stop()
@@ -0,0 +1,220 @@
+# -*- coding: UTF-8 -*-
+"""本機模擬測試"""
+import threading
+import time
+from datetime import datetime
+
+import shioaji.constant as sj_constant
+from vnpy.trader.constant import Direction, Exchange, Interval, Offset, OrderType, Status
+from vnpy.trader.event import EVENT_ACCOUNT, EVENT_CONTRACT, EVENT_LOG, EVENT_ORDER, EVENT_POSITION, EVENT_TRADE
+from vnpy.trader.object import CancelRequest, HistoryRequest, OrderRequest
+
+from vnpy_sinopac.gateway.simulator import MatchingEngine
+
+from .helpers import FUTURE, STOCK, drain
+
+
+def order_request(symbol: str, direction: Direction, price: float, volume: int, **kwargs) -> OrderRequest:
+    return OrderRequest(
+        symbol=symbol,
+        exchange=Exchange.LOCAL,
+        direction=direction,
+        type=kwargs.pop("type", OrderType.LIMIT),
+        volume=volume,
+        price=price,
+        offset=kwargs.pop("offset", Offset.NONE),
+    )
+
+
+def test_matching_engine_price_time_priority():
+    engine = MatchingEngine()
+    first, _ = engine.submit(None, FUTURE, False, 100.0, 2)
+    second, _ = engine.submit(None, FUTURE, False, 100.0, 2)
+    engine.submit(None, FUTURE, False, 99.0, 1)
+
+    taker, fills = engine.submit(None, FUTURE, True, 100.0, 4)
+    assert [(price, qty) for _, price, qty in fills] == [(99.0, 1), (100.0, 2), (100.0, 1)]
+    assert fills[1][0] is first and fills[2][0] is second
+    assert second.leaves == 1 and not taker.active
+
+    _, fills = engine.submit(None, FUTURE, True, 100.0, 5, sj_constant.OrderType.FOK)
+    assert fills == []
+    _, fills = engine.submit(None, FUTURE, True, 101.0, 5, sj_constant.OrderType.IOC)
+    assert [qty for _, _, qty in fills] == [1]
+    assert engine.depth(FUTURE) == ([], [])
+
+
+def test_send_order_fills_against_liquidity(connect_gateway):
+    gateway = connect_gateway()
+    drain(gateway)
+    gateway.api.add_liquidity(FUTURE, sj_constant.Action.Sell, 22000, 3)
+
+    gateway.send_order(order_request(FUTURE, Direction.LONG, 22000, 2))
+    events = drain(gateway)
+    trades = events[EVENT_TRADE]
+    assert [(t.symbol, t.price, t.volume) for t in trades] == [(FUTURE, 22000, 2)]
+    assert events[EVENT_ORDER][-1].status == Status.ALLTRADED
+    # 部位由成交回報直接更新
+    assert [(p.symbol, p.direction, p.volume, p.price) for p in events[EVENT_POSITION]] == [
+        (FUTURE, Direction.LONG, 2, 22000)
+    ]
+
+    gateway.query_position()
+    events = drain(gateway)
+    assert {(p.symbol, p.direction, p.volume) for p in events[EVENT_POSITION]} == {(FUTURE, Direction.LONG, 2)}
+    assert not [log for log in events[EVENT_LOG] if log.msg.startswith("部位核對")]
+
+
+def test_query_account_caches_and_emits_on_change(connect_gateway):
+    gateway = connect_gateway()
+    stock_id, futures_id = "9A95-0000001", "F002000-1000001"
+    # 登入時已查詢一次
+    assert gateway.get_account(stock_id).balance == 1_000_000
+    assert gateway.get_account(futures_id).frozen == 0
+    drain(gateway)
+
+    gateway.query_account()
+    assert EVENT_ACCOUNT not in drain(gateway)
+
+    gateway.api.add_liquidity(FUTURE, sj_constant.Action.Sell, 22000, 1)
+    gateway.send_order(order_request(FUTURE, Direction.LONG, 22000, 1))
+    drain(gateway)
+    gateway.query_account()
+    accounts = drain(gateway)[EVENT_ACCOUNT]
+    assert [(a.accountid, a.balance, a.frozen) for a in accounts] == [(futures_id, 1_000_000, 440_000)]
+    assert gateway.get_account(futures_id) is accounts[0]
+
+    # 計時器查詢失敗只記錄, 不傳出事件引擎執行緒
+    def fail(**kwargs):
+        raise ConnectionError("token expired")
+
+    gateway.api.account_balance = fail
+    gateway.account_interval = 1
+    gateway.process_account_timer(None)
+    assert [log.msg for log in drain(gateway)[EVENT_LOG]] == ["帳務查詢失敗: token expired"]
+
+
+def test_cancel_resting_stock_order(connect_gateway):
+    gateway = connect_gateway()
+    drain(gateway)
+    gateway.send_order(
+        order_request(STOCK, Direction.SHORT, 105, 1, offset=Offset.CLOSETODAY)
+    )
+    order = drain(gateway)[EVENT_ORDER][-1]
+    assert order.status == Status.NOTTRADED
+    assert order.offset == Offset.CLOSETODAY
+    assert gateway.trades[gateway.order_ids.get_sj(order.orderid)].order.daytrade_short
+    assert gateway.api.engine.depth(STOCK)[1] == [(105.0, 1)]
+
+    gateway.cancel_order(CancelRequest(orderid=order.orderid, symbol=STOCK, exchange=Exchange.LOCAL))
+    assert drain(gateway)[EVENT_ORDER][-1].status == Status.CANCELLED
+    assert gateway.api.engine.depth(STOCK)[1] == []
+
+
+def test_send_order_returns_local_orderid_before_ack(connect_gateway):
+    gateway = connect_gateway()
+    api = gateway.api
+    api.asynchronous, api.latency = True, 0.05
+    api.worker = threading.Thread(target=api.run_worker, daemon=True)
+    api.worker.start()
+    drain(gateway)
+
+    vt_orderid = gateway.send_order(order_request(FUTURE, Direction.LONG, 21900, 1))
+    orderid = vt_orderid.split(".", 1)[1]
+    order = drain(gateway)[EVENT_ORDER][0]
+    assert (order.vt_orderid, order.status) == (vt_orderid, Status.SUBMITTING)
+
+    # 委託確認前即可用本地編號刪單
+    gateway.cancel_order(CancelRequest(orderid=orderid, symbol=FUTURE, exchange=Exchange.LOCAL))
+    deadline = time.perf_counter() + 5
+    while gateway.orders[orderid].status != Status.CANCELLED and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    api.logout()
+    sj_id = gateway.order_ids.get_sj(orderid)
+    assert gateway.order_ids.get_local(sj_id) == orderid
+    orders = drain(gateway)[EVENT_ORDER]
+    assert {o.vt_orderid for o in orders} == {vt_orderid}
+    assert orders[-1].status == Status.CANCELLED
+
+
+def test_batch_send_and_cancel_orders(connect_gateway):
+    gateway = connect_gateway()
+    drain(gateway)
+    reqs = [order_request(FUTURE, Direction.LONG, 21000 + i, 1) for i in range(20)]
+    reqs.append(order_request("9999", Direction.LONG, 100, 1))
+
+    vt_orderids = gateway.send_orders(reqs)
+    assert vt_orderids[-1] == "" and all(vt_orderids[:-1])
+    assert gateway.batch.done.wait(5)
+    assert len(gateway.batch.results) == 20 and gateway.batch.failed == 0
+    orderids = [vt_orderid.split(".", 1)[1] for vt_orderid in vt_orderids[:-1]]
+    assert all(gateway.orders[orderid].status == Status.NOTTRADED for orderid in orderids)
+
+    gateway.cancel_orders(
+        [CancelRequest(orderid=orderid, symbol=FUTURE, exchange=Exchange.LOCAL) for orderid in orderids]
+    )
+    assert gateway.batch.done.wait(5)
+    assert all(gateway.orders[orderid].status == Status.CANCELLED for orderid in orderids)
+    assert gateway.api.engine.depth(FUTURE) == ([], [])
+    assert gateway.batch.failed == 0
+
+    # 已撤銷與查無的委託逐筆回報失敗
+    gateway.cancel_orders(
+        [CancelRequest(orderid=orderid, symbol=FUTURE, exchange=Exchange.LOCAL) for orderid in (orderids[0], "nope")]
+    )
+    assert gateway.batch.done.wait(5)
+    assert gateway.batch.results == ["送出失敗", "送出失敗"]
+    logs = [log.msg for log in drain(gateway)[EVENT_LOG] if log.msg.startswith("批次")]
+    assert [msg.split(":")[0] for msg in logs] == ["批次下單", "批次刪單", "批次刪單"]
+    gateway.close()
+
+
+def test_order_latency_stages(connect_gateway):
+    gateway = connect_gateway()
+    gateway.api.add_liquidity(FUTURE, sj_constant.Action.Sell, 22000, 1)
+    gateway.send_order(order_request(FUTURE, Direction.LONG, 22000, 1))
+    gateway.send_order(order_request(STOCK, Direction.LONG, 100, 1))
+
+    stats = gateway.get_order_latency()
+    assert set(stats["期貨"]) == {"place", "callback", "ack", "fill", "exchange_ack", "exchange_fill"}
+    assert set(stats["股票"]) == {"place", "callback", "ack", "exchange_ack"}
+    futures = stats["期貨"]
+    assert futures["callback"]["p50_ms"] <= futures["ack"]["p50_ms"] <= futures["fill"]["p50_ms"]
+    assert all(s["count"] == 1 for s in futures.values())
+    # 已成交的委託移除, 未成交的股票委託保留待後續階段
+    assert len(gateway.latency.entries) == 1
+    # 未收到結束回報的委託超過 max_age 後清除
+    assert gateway.latency.purge(time.perf_counter()) == 0
+    assert gateway.latency.purge(time.perf_counter() + gateway.latency.max_age + 1) == 1
+    assert gateway.latency.entries == {}
+    gateway.close()
+    logs = [log.msg for log in drain(gateway)[EVENT_LOG] if log.msg.startswith("委託延遲")]
+    assert len(logs) == 2
+
+
+def test_rejected_order_and_history(connect_gateway):
+    gateway = connect_gateway()
+    drain(gateway)
+    gateway.send_order(order_request(FUTURE, Direction.LONG, 99999, 1))
+    assert drain(gateway)[EVENT_ORDER][-1].status == Status.REJECTED
+
+    req = HistoryRequest(
+        symbol=FUTURE,
+        exchange=Exchange.LOCAL,
+        start=datetime(2026, 10, 15),
+        end=datetime(2026, 10, 16),
+        interval=Interval.MINUTE,
+    )
+    bars = gateway.query_history(req)
+    assert len(bars) == 600
+    assert bars == gateway.query_history(req)
+
+
+def test_contracts_ingested_once_per_type(connect_gateway):
+    gateway = connect_gateway(reload=False)
+    events = drain(gateway)
+
+    symbols = [contract.symbol for contract in events[EVENT_CONTRACT]]
+    assert len(symbols) == len(set(symbols)) == len(gateway.code2contract)
+    logs = [log.msg for log in events[EVENT_LOG] if log.msg.startswith("商品檔 ") and "檔," in log.msg]
+    assert [msg.split(":")[0] for msg in logs] == ["商品檔 STK", "商品檔 FUT", "商品檔 OPT"]
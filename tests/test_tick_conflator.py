@@ -0,0 +1,65 @@
+# -*- coding: UTF-8 -*-
+"""行情合併測試"""
+import threading
+import time
+from datetime import datetime
+
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+from vnpy_sinopac.gateway.tick_conflator import TickConflator
+
+
+def make_tick(symbol: str = "TXFJ6") -> TickData:
+    return TickData(
+        symbol=symbol,
+        exchange=Exchange.LOCAL,
+        datetime=datetime.now(),
+        gateway_name="Sinopac",
+    )
+
+
+def test_burst_is_conflated_to_latest_state():
+    """間隔內的連續更新只推送第一筆, 其餘合併成最後狀態"""
+    published = []
+    conflator = TickConflator(10, published.append, lambda: False, threading.Lock())
+    tick = make_tick()
+    for price in range(1, 101):
+        tick.last_price = price
+        with conflator.lock:
+            conflator.push(tick)
+
+    assert [t.last_price for t in published] == [1]
+    assert conflator.get_coalesced() == {"TXFJ6": 98}
+
+    conflator.flush(force=True)
+    assert [t.last_price for t in published] == [1, 100]
+    assert published[-1] is not tick
+
+
+def test_idle_consumer_gets_every_update():
+    """事件引擎閒置時不合併"""
+    published = []
+    conflator = TickConflator(10, published.append, lambda: True, threading.Lock())
+    tick = make_tick()
+    for price in range(5):
+        tick.last_price = price
+        conflator.push(tick)
+
+    assert len(published) == 5
+    assert conflator.get_coalesced() == {}
+
+
+def test_pending_tick_is_flushed_after_interval():
+    published = []
+    conflator = TickConflator(0.02, published.append, lambda: False, threading.Lock())
+    conflator.start()
+    tick = make_tick()
+    with conflator.lock:
+        conflator.push(tick)
+        tick.last_price = 2.0
+        conflator.push(tick)
+    time.sleep(0.1)
+    conflator.stop()
+
+    assert [t.last_price for t in published] == [0, 2.0]
@@ -0,0 +1,103 @@
+# -*- coding: UTF-8 -*-
+"""TickData 循環池測試"""
+import time
+from datetime import datetime
+
+import pytest
+from vnpy.event import Event, EventEngine
+from vnpy.trader.constant import Exchange
+from vnpy.trader.event import EVENT_TICK
+from vnpy.trader.object import TickData
+
+from vnpy_sinopac.gateway.tick_pool import TickPool
+
+
+def make_tick(symbol: str) -> TickData:
+    return TickData(
+        symbol=symbol,
+        exchange=Exchange.LOCAL,
+        datetime=datetime.now(),
+        gateway_name="Sinopac",
+    )
+
+
+def release(pool: TickPool, tick: TickData) -> None:
+    """模擬事件引擎處理完 EVENT_TICK 與 EVENT_TICK + vt_symbol"""
+    pool.release(tick)
+    pool.release(tick)
+
+
+def test_slots_are_recycled_after_release():
+    pool = TickPool(3)
+    tick = make_tick("2330")
+    tick.last_price = 1.0
+    first = pool.acquire(tick)
+    assert first is not tick and first.last_price == 1.0
+
+    pool.release(first)  # 只處理完一個事件, 仍不可重用
+    tick.last_price = 2.0
+    second = pool.acquire(tick)
+    assert second is not first
+
+    release(pool, first)
+    tick.last_price = 3.0
+    assert pool.acquire(tick) is first
+    assert first.last_price == 3.0 and second.last_price == 2.0
+    assert first.vt_symbol == "2330.LOCAL"
+    assert pool.get_slot_count() == 2
+
+
+def test_unreleased_slots_never_overwritten():
+    pool = TickPool(3)
+    tick = make_tick("2330")
+    queue = []
+    for price in range(6):
+        tick.last_price = price
+        queue.append(pool.acquire(tick))
+
+    # 佇列中的 TickData 不被覆寫, 槽位用盡後改用 copy
+    assert [t.last_price for t in queue] == list(range(6))
+    assert len({id(t) for t in queue}) == 6
+    assert pool.get_slot_count() == 3 and pool.copied == 3
+
+    # 積壓消化後重用槽位, copy 出去的 TickData 不回收
+    for t in queue:
+        release(pool, t)
+    assert {id(pool.acquire(tick)) for _ in range(3)} == {id(t) for t in queue[:3]}
+    assert pool.copied == 3
+
+
+def test_symbols_do_not_share_slots():
+    pool = TickPool(1)
+    a, b = make_tick("2330"), make_tick("2317")
+    a.last_price, b.last_price = 1.0, 2.0
+    slot_a = pool.acquire(a)
+    assert pool.acquire(b).last_price == 2.0
+    release(pool, slot_a)
+    assert pool.acquire(a) is slot_a and slot_a.symbol == "2330"
+
+
+def test_released_by_event_engine():
+    pool = TickPool(2)
+    engine = EventEngine()
+    engine.register_general(pool.process_event)
+    seen = []
+    engine.register(EVENT_TICK, lambda event: seen.append(event.data.last_price))
+    engine.start()
+    try:
+        tick = make_tick("2330")
+        slot = pool.acquire(tick)
+        engine.put(Event(EVENT_TICK, slot))
+        engine.put(Event(EVENT_TICK + slot.vt_symbol, slot))
+        deadline = time.monotonic() + 5
+        while pool.pending and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert pool.acquire(tick) is slot
+    finally:
+        engine.stop()
+    assert seen == [0]
+
+
+def test_pool_size_must_be_positive():
+    with pytest.raises(ValueError):
+        TickPool(0)
@@ -1,5 +1,5 @@
 import importlib_metadata
-from .gateway import SinopacGateway
+from .gateway import EVENT_BAR, SinopacGateway
 
 try:
     __version__ = importlib_metadata.version("vnpy_sinopac")
@@ -1 +1 @@
-from .sinopac_gateway import SinopacGateway
+from .sinopac_gateway import EVENT_BAR, SinopacGateway
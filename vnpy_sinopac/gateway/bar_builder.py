@@ -0,0 +1,134 @@
+# -*- coding: UTF-8 -*-
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+
+from .utility import TW_TZ
+
+Session = Tuple[time, time]
+
+# 期貨/選擇權: 日盤 08:45 ~ 13:45, 夜盤 15:00 ~ 次日 05:00
+FUTURES_SESSIONS: List[Session] = [(time(8, 45), time(13, 45)), (time(15, 0), time(5, 0))]
+# 上市櫃股票: 09:00 ~ 13:30
+STOCK_SESSIONS: List[Session] = [(time(9, 0), time(13, 30))]
+
+ONE_MINUTE = timedelta(minutes=1)
+
+
+def in_session(t: time, sessions: List[Session]) -> Optional[bool]:
+    """
+    回傳 True 表示在盤中, False 表示為收盤那一分鐘 (收盤集合競價, 併入前一根),
+    None 表示不在交易時段
+    """
+    for start, end in sessions:
+        if start <= end:
+            if start <= t < end:
+                return True
+        elif t >= start or t < end:  # 跨日夜盤
+            return True
+        if t.hour == end.hour and t.minute == end.minute:
+            return False
+    return None
+
+
+class BarBuilder:
+    """
+    一分 K 合成
+
+    由行情 callback 的原始 Tick 直接合成, 成交量與成交金額取自累計的
+    total_volume / total_amount 差額. K 棒以分鐘起點標示時間, 依期交所/證交所
+    交易時段對齊 (含夜盤), 收盤集合競價併入最後一分鐘; 試撮與時段外的 Tick 忽略.
+    收到下一分鐘的 Tick 即推送完成的 K 棒, 沒有後續成交的商品由 flush 依時間推送.
+    """
+
+    def __init__(
+        self,
+        on_bar: Callable[[BarData], None],
+        gateway_name: str,
+        delay: float = 3.0,
+    ) -> None:
+        """delay 為分鐘結束後等待收盤集合競價等延遲 Tick 的秒數"""
+        self.on_bar = on_bar
+        self.gateway_name: str = gateway_name
+        self.delay: timedelta = timedelta(seconds=delay)
+
+        self.sessions: Dict[str, List[Session]] = {}
+        self.bars: Dict[str, BarData] = {}  # 尚未完成的 K 棒
+        self.bar_ends: Dict[str, datetime] = {}  # 尚未完成 K 棒的結束時間 (無時區)
+        self.last_volume: Dict[str, int] = {}  # 上一根 K 棒結束時的累計量
+        self.last_amount: Dict[str, float] = {}
+        self.emitted: int = 0
+
+    def add(self, code: str, sessions: List[Session]) -> None:
+        self.sessions[code] = sessions
+
+    def update_tick(self, tick) -> None:
+        code = tick.code
+        sessions = self.sessions.get(code, None)
+        if sessions is None or tick.simtrade == 1:
+            return
+
+        dt = tick.datetime
+        state = in_session(dt.time(), sessions)
+        if state is None:
+            return
+        minute = dt.replace(second=0, microsecond=0)
+        if state is False:
+            minute -= ONE_MINUTE
+
+        price = float(tick.close)
+        bar = self.bars.get(code, None)
+        if bar is not None and self.bar_ends[code] <= minute:
+            self.finish(code)
+            bar = None
+
+        total_volume = tick.total_volume
+        total_amount = float(tick.total_amount)
+        last_volume = self.last_volume.get(code, None)
+        if last_volume is None or total_volume < last_volume:
+            # 第一筆或新交易日累計量歸零
+            self.last_volume[code] = total_volume - tick.volume
+            self.last_amount[code] = total_amount - price * tick.volume
+
+        if bar is None:
+            bar = BarData(
+                symbol=code,
+                exchange=Exchange.LOCAL,
+                datetime=minute,
+                interval=Interval.MINUTE,
+                open_price=price,
+                high_price=price,
+                low_price=price,
+                gateway_name=self.gateway_name,
+            )
+            self.bars[code] = bar
+            self.bar_ends[code] = minute + ONE_MINUTE
+        elif minute < bar.datetime:
+            return  # 亂序的舊 Tick
+        else:
+            if price > bar.high_price:
+                bar.high_price = price
+            if price < bar.low_price:
+                bar.low_price = price
+        bar.close_price = price
+        bar.volume = total_volume - self.last_volume[code]
+        bar.turnover = total_amount - self.last_amount[code]
+
+    def finish(self, code: str) -> None:
+        bar = self.bars.pop(code)
+        del self.bar_ends[code]
+        self.last_volume[code] += int(bar.volume)
+        self.last_amount[code] += bar.turnover
+        bar.datetime = TW_TZ.localize(bar.datetime)
+        self.emitted += 1
+        self.on_bar(bar)
+
+    def flush(self, now: Optional[datetime] = None) -> None:
+        """推送結束時間加上 delay 已過的 K 棒, now 為台北時間 (無時區)"""
+        if now is None:
+            now = datetime.now(TW_TZ).replace(tzinfo=None)
+        for code, end in list(self.bar_ends.items()):
+            if end + self.delay <= now:
+                self.finish(code)
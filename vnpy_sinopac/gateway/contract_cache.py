@@ -0,0 +1,208 @@
+# -*- coding: UTF-8 -*-
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+import polars as pl
+import shioaji.constant as sj_constant
+from shioaji.contracts import Contract, Future, Option, Stock
+from vnpy.trader.constant import Exchange, OptionType, Product
+from vnpy.trader.object import ContractData
+
+FIELDS: List[str] = list(Future.model_fields)
+ENUM_FIELDS: Dict[str, type] = {
+    "security_type": sj_constant.SecurityType,
+    "exchange": sj_constant.Exchange,
+    "currency": sj_constant.Currency,
+    "option_right": sj_constant.OptionRight,
+    "day_trade": sj_constant.DayTrade,
+}
+NUMBER_FIELDS: List[str] = ["strike_price", "unit"]
+CONTRACT_CLASSES: Dict[str, type] = {
+    sj_constant.SecurityType.Future.value: Future,
+    sj_constant.SecurityType.Option.value: Option,
+    sj_constant.SecurityType.Stock.value: Stock,
+}
+
+
+def field_dtype(name: str) -> pl.DataType:
+    if name in NUMBER_FIELDS:
+        return pl.Float64
+    annotation = Future.model_fields[name].annotation
+    if annotation is int:
+        return pl.Int64
+    if annotation is float:
+        return pl.Float64
+    return pl.Utf8
+
+
+SCHEMA: Dict[str, pl.DataType] = {name: field_dtype(name) for name in FIELDS}
+
+# 商品檔轉換規則, SinopacGateway.convert_* 與 build_contract_data 共用
+CONTRACT_SIZES: Dict[str, int] = {
+    sj_constant.SecurityType.Future: 200,
+    sj_constant.SecurityType.Option: 50,
+    sj_constant.SecurityType.Stock: 1,
+}
+DEFAULT_PRICETICK: float = 0.01  # 選擇權與股票; 期貨以合約的 unit 為跳動單位
+
+CONNECTION_KEYS: Dict[str, str] = {
+    "模擬環境": "sim",
+    "正式環境": "prod",
+    "本機模擬": "local",
+}
+
+
+class ContractCache:
+    """
+    商品檔快取
+
+    以 Parquet 保存 Shioaji 商品檔欄位, 依連線環境與交易日分檔.
+    同一交易日重新連線時不必重新下載, 直接以欄式運算重建 ContractData,
+    Shioaji 合約則由 ContractCatalog 延遲建立.
+    """
+
+    def __init__(self, root: Path, environment: str) -> None:
+        self.root: Path = Path(root)
+        self.environment: str = environment
+
+    def get_path(self, trading_day: date) -> Path:
+        return self.root / f"contracts_{self.environment}_{trading_day:%Y%m%d}.parquet"
+
+    def exists(self, trading_day: date) -> bool:
+        return self.get_path(trading_day).exists()
+
+    def save(self, trading_day: date, contracts: Iterable[Contract]) -> int:
+        """寫入快取, 先寫暫存檔再改名避免讀到寫一半的檔案; 回傳筆數"""
+        columns: Dict[str, list] = {name: [] for name in FIELDS}
+        for contract in contracts:
+            for name in FIELDS:
+                value = getattr(contract, name)
+                columns[name].append(value.value if name in ENUM_FIELDS else value)
+        df = pl.DataFrame(columns, schema=SCHEMA)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.get_path(trading_day)
+        temp = path.with_suffix(".tmp")
+        df.write_parquet(temp)
+        temp.replace(path)
+        for old in self.root.glob(f"contracts_{self.environment}_*.parquet"):
+            if old != path:
+                old.unlink()
+        return len(df)
+
+    def load(self, trading_day: date) -> pl.DataFrame:
+        return pl.read_parquet(self.get_path(trading_day))
+
+    def remove(self, trading_day: date) -> None:
+        self.get_path(trading_day).unlink(missing_ok=True)
+
+
+def build_contract_data(df: pl.DataFrame, gateway_name: str) -> List[ContractData]:
+    """以欄式運算算出 ContractData 欄位, 與 SinopacGateway.convert_* 結果一致"""
+    security_type = pl.col("security_type")
+    is_future = security_type == sj_constant.SecurityType.Future.value
+    is_option = security_type == sj_constant.SecurityType.Option.value
+    size = pl.lit(CONTRACT_SIZES[sj_constant.SecurityType.Stock])
+    for key in (sj_constant.SecurityType.Option, sj_constant.SecurityType.Future):
+        size = pl.when(security_type == key.value).then(CONTRACT_SIZES[key]).otherwise(size)
+    df = df.select(
+        "code",
+        pl.when(is_future)
+        .then(pl.col("name") + pl.col("delivery_month"))
+        .when(is_option)
+        .then(pl.col("name").str.replace_all(" ", "", literal=True))
+        .otherwise(pl.col("name"))
+        .alias("name"),
+        pl.when(is_future)
+        .then(pl.lit(Product.FUTURES.value))
+        .when(is_option)
+        .then(pl.lit(Product.OPTION.value))
+        .otherwise(pl.lit(Product.EQUITY.value))
+        .alias("product"),
+        size.alias("size"),
+        pl.when(is_future).then(pl.col("unit")).otherwise(DEFAULT_PRICETICK).alias("pricetick"),
+        pl.when(is_option).then(pl.col("strike_price")).alias("option_strike"),
+        pl.when(is_option).then(pl.col("underlying_code")).alias("option_underlying"),
+        pl.when(is_option)
+        .then(
+            pl.when(pl.col("option_right") == sj_constant.OptionRight.Call.value)
+            .then(pl.lit(OptionType.CALL.value))
+            .otherwise(pl.lit(OptionType.PUT.value))
+        )
+        .alias("option_type"),
+        pl.when(is_option)
+        .then(pl.col("delivery_date").str.strptime(pl.Datetime("us"), "%Y/%m/%d", strict=False))
+        .alias("option_expiry"),
+    )
+
+    products = {product.value: product for product in Product}
+    option_types = {option_type.value: option_type for option_type in OptionType}
+    option_types[None] = None
+    stock = Product.EQUITY
+    return [
+        ContractData(
+            symbol=code,
+            exchange=Exchange.LOCAL,
+            name=name,
+            product=products[product],
+            size=size,
+            pricetick=pricetick,
+            min_volume=1,
+            net_position=product != stock.value,
+            history_data=True,
+            option_strike=strike,
+            option_underlying=underlying,
+            option_type=option_types[option_type],
+            option_expiry=expiry,
+            gateway_name=gateway_name,
+        )
+        for code, name, product, size, pricetick, strike, underlying, option_type, expiry in df.iter_rows()
+    ]
+
+
+ENUM_MAPPINGS: Dict[str, Dict[str, object]] = {
+    name: {member.value: member for member in enum} for name, enum in ENUM_FIELDS.items()
+}
+FIELDS_SET = set(FIELDS)
+
+
+def build_contract(row: tuple) -> Contract:
+    """以 FIELDS 順序的一列欄位重建 Shioaji 合約, model_construct 並指定 fields_set 略過驗證"""
+    values = dict(zip(FIELDS, row))
+    for name, mapping in ENUM_MAPPINGS.items():
+        values[name] = mapping[values[name]]
+    for name in NUMBER_FIELDS:
+        number = values[name]
+        if number == int(number):
+            values[name] = int(number)
+    cls = CONTRACT_CLASSES[values["security_type"].value]
+    return cls.model_construct(FIELDS_SET, **values)
+
+
+class ContractCatalog:
+    """
+    快取中的完整商品檔
+
+    熱啟動只由欄位推送 ContractData 並建立索引, Shioaji 合約在 code2contract
+    第一次查詢該代碼時才以 build 建立, 不必一次重建數萬個 pydantic 物件.
+    """
+
+    def __init__(self, df: pl.DataFrame, published: Optional[pl.DataFrame] = None) -> None:
+        self.df: pl.DataFrame = df.select(FIELDS)
+        self.rows: Dict[str, int] = {code: i for i, code in enumerate(df["code"].to_list())}
+        self.published: Set[str] = set(
+            self.rows if published is None else published["code"].to_list()
+        )  # 已推送 ContractData 的代碼
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.rows
+
+    def build(self, code: str) -> Optional[Contract]:
+        i = self.rows.get(code, None)
+        if i is None:
+            return None
+        return build_contract(self.df.row(i))
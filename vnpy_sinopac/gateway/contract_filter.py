@@ -0,0 +1,113 @@
+# -*- coding: UTF-8 -*-
+from datetime import date
+from typing import Callable, Optional, Set
+
+import polars as pl
+from shioaji.contracts import Contract
+
+
+def parse_list(value: str) -> Set[str]:
+    return {item.strip() for item in str(value).replace("，", ",").split(",") if item.strip()}
+
+
+class ContractFilter:
+    """
+    商品發布篩選
+
+    只有符合全部已設定條件的商品才轉成 ContractData 並推送:
+    商品類型 (FUT/OPT/STK)、分類 (TXF、TXO 或股票產業代碼)、標的 (underlying_code,
+    無標的者不受限) 與到期月數 (交割月份在本月起 N 個月內, 無交割月份者不受限).
+    """
+
+    def __init__(
+        self,
+        security_types: Set[str],
+        categories: Set[str],
+        underlyings: Set[str],
+        months: int = 0,
+        today: Optional[date] = None,
+    ) -> None:
+        self.security_types: Set[str] = security_types
+        self.categories: Set[str] = categories
+        self.underlyings: Set[str] = underlyings
+        self.last_month: str = ""
+        if months > 0:
+            today = today or date.today()
+            index = today.year * 12 + today.month - 1 + months - 1
+            self.last_month = f"{index // 12}{index % 12 + 1:02d}"
+
+    @classmethod
+    def from_setting(cls, setting: dict) -> Optional["ContractFilter"]:
+        """設定皆為空白時回傳 None (全部發布)"""
+        months = str(setting.get("發布到期月數", "")).strip()
+        contract_filter = cls(
+            {t.upper() for t in parse_list(setting.get("發布商品類型", ""))},
+            parse_list(setting.get("發布商品分類", "")),
+            parse_list(setting.get("發布標的", "")),
+            int(months) if months else 0,
+        )
+        return contract_filter if contract_filter.active else None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.security_types or self.categories or self.underlyings or self.last_month)
+
+    def match(self, contract: Contract) -> bool:
+        if self.security_types and contract.security_type.value not in self.security_types:
+            return False
+        if self.categories and contract.category not in self.categories:
+            return False
+        if (
+            self.underlyings
+            and contract.underlying_code
+            and contract.underlying_code not in self.underlyings
+        ):
+            return False
+        if self.last_month and contract.delivery_month and contract.delivery_month > self.last_month:
+            return False
+        return True
+
+    def expr(self) -> pl.Expr:
+        """與 match 相同條件的 polars 運算式, 供商品檔快取使用"""
+        mask = pl.lit(True)
+        if self.security_types:
+            mask &= pl.col("security_type").is_in(list(self.security_types))
+        if self.categories:
+            mask &= pl.col("category").is_in(list(self.categories))
+        if self.underlyings:
+            mask &= (pl.col("underlying_code") == "") | pl.col("underlying_code").is_in(
+                list(self.underlyings)
+            )
+        if self.last_month:
+            mask &= (pl.col("delivery_month") == "") | (pl.col("delivery_month") <= self.last_month)
+        return mask
+
+
+class ContractMap(dict):
+    """
+    code2contract: 查無商品時以 resolver 延遲建立 (被篩選未發布的商品)
+    resolver 也查無的代碼記錄在 missing, 重新載入商品檔 (clear_missing) 前不再查詢
+    """
+
+    def __init__(self, resolver: Callable[[str], Optional[Contract]]) -> None:
+        super().__init__()
+        self.resolver = resolver
+        self.missing: Set[str] = set()
+
+    def __missing__(self, code: str) -> Contract:
+        if code in self.missing:
+            raise KeyError(code)
+        contract = self.resolver(code)
+        if contract is None:
+            self.missing.add(code)
+            raise KeyError(code)
+        return contract
+
+    def clear_missing(self) -> None:
+        self.missing.clear()
+
+    def get(self, code: str, default=None):
+        try:
+            return self[code]
+        except KeyError:
+            return default
@@ -0,0 +1,154 @@
+# -*- coding: UTF-8 -*-
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, MutableMapping, Optional, Set, Tuple
+
+import shioaji.constant as sj_constant
+from shioaji.contracts import Contract
+
+INDEX_FIELDS: List[str] = [
+    "code", "security_type", "category", "underlying_code", "delivery_month", "strike_price"
+]
+
+
+class OptionChain:
+    """同一分類、同一到期的選擇權, 依履約價排序 (新增後延遲排序)"""
+
+    __slots__ = ("strikes", "codes", "dirty")
+
+    def __init__(self) -> None:
+        self.strikes: List[float] = []
+        self.codes: List[str] = []
+        self.dirty: bool = False
+
+    def add(self, strike: float, code: str) -> None:
+        self.strikes.append(strike)
+        self.codes.append(code)
+        self.dirty = True
+
+    def sort(self) -> None:
+        pairs = sorted(zip(self.strikes, self.codes))
+        self.strikes = [strike for strike, _ in pairs]
+        self.codes = [code for _, code in pairs]
+        self.dirty = False
+
+    def select(self, low: Optional[float], high: Optional[float]) -> List[str]:
+        if self.dirty:
+            self.sort()
+        start = 0 if low is None else bisect_left(self.strikes, low)
+        end = len(self.strikes) if high is None else bisect_right(self.strikes, high)
+        return self.codes[start:end]
+
+
+class ContractIndex:
+    """
+    商品次要索引
+
+    依標的、到期月份、分類 (TXF、TXO...)、股票產業與選擇權履約價建立索引,
+    查詢為 O(1) 字典查找或 O(log n) 二分搜尋, 再加上結果數 k.
+    """
+
+    def __init__(self, contracts: Optional[MutableMapping[str, Contract]] = None) -> None:
+        # 查詢結果由 contracts 取得; 傳入 code2contract 時可只以欄位建立索引, 合約於查詢時才建立
+        self.contracts: MutableMapping[str, Contract] = {} if contracts is None else contracts
+        self.codes: Set[str] = set()
+        self.by_underlying: Dict[str, List[str]] = {}
+        self.by_expiry: Dict[str, List[str]] = {}
+        self.by_category: Dict[str, List[str]] = {}
+        self.by_industry: Dict[str, List[str]] = {}
+        self.chains: Dict[Tuple[str, str], OptionChain] = {}
+        self.expiries: Dict[str, List[str]] = {}  # 分類 -> 排序後的到期月份
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def add(self, contract: Contract) -> None:
+        self.contracts[contract.code] = contract
+        self.add_fields(
+            contract.code,
+            contract.security_type,
+            contract.category,
+            contract.underlying_code,
+            contract.delivery_month,
+            contract.strike_price,
+        )
+
+    def add_fields(
+        self,
+        code: str,
+        security_type: str,
+        category: str,
+        underlying_code: str,
+        delivery_month: str,
+        strike_price: float,
+    ) -> None:
+        if code in self.codes:
+            return
+        self.codes.add(code)
+
+        if security_type == sj_constant.SecurityType.Stock:
+            self.by_industry.setdefault(category, []).append(code)
+            return
+
+        self.by_category.setdefault(category, []).append(code)
+        if underlying_code:
+            self.by_underlying.setdefault(underlying_code, []).append(code)
+        if delivery_month:
+            self.by_expiry.setdefault(delivery_month, []).append(code)
+            months = self.expiries.setdefault(category, [])
+            i = bisect_left(months, delivery_month)
+            if i == len(months) or months[i] != delivery_month:
+                months.insert(i, delivery_month)
+        if security_type == sj_constant.SecurityType.Option:
+            chain = self.chains.get((category, delivery_month), None)
+            if chain is None:
+                chain = OptionChain()
+                self.chains[(category, delivery_month)] = chain
+            chain.add(strike_price, code)
+
+    def add_many(self, contracts: Iterable[Contract]) -> None:
+        for contract in contracts:
+            self.add(contract)
+
+    def add_rows(self, rows: Iterable[tuple]) -> None:
+        """以 INDEX_FIELDS 順序的欄位值建立索引 (商品檔快取), 不需 Shioaji 合約"""
+        for row in rows:
+            self.add_fields(*row)
+
+    def resolve(self, codes: List[str]) -> List[Contract]:
+        contracts = self.contracts
+        return [contracts[code] for code in codes]
+
+    def get_by_underlying(self, underlying: str) -> List[Contract]:
+        return self.resolve(self.by_underlying.get(underlying, []))
+
+    def get_by_expiry(self, delivery_month: str, category: str = "") -> List[Contract]:
+        if category:
+            chain = self.chains.get((category, delivery_month), None)
+            if chain is not None:
+                return self.resolve(chain.select(None, None))
+            return [
+                c for c in self.get_by_category(category) if c.delivery_month == delivery_month
+            ]
+        return self.resolve(self.by_expiry.get(delivery_month, []))
+
+    def get_by_category(self, category: str) -> List[Contract]:
+        return self.resolve(self.by_category.get(category, []))
+
+    def get_by_industry(self, industry: str) -> List[Contract]:
+        return self.resolve(self.by_industry.get(industry, []))
+
+    def get_expiries(self, category: str) -> List[str]:
+        return list(self.expiries.get(category, []))
+
+    def get_option_chain(
+        self,
+        category: str,
+        delivery_month: str,
+        low: Optional[float] = None,
+        high: Optional[float] = None,
+    ) -> List[Contract]:
+        """履約價在 [low, high] 間的買權與賣權, 依履約價排序"""
+        chain = self.chains.get((category, delivery_month), None)
+        if chain is None:
+            return []
+        return self.resolve(chain.select(low, high))
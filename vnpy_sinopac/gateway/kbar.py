@@ -0,0 +1,91 @@
+# -*- coding: UTF-8 -*-
+from typing import List
+
+import polars as pl
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+
+TW_TZ_NAME = "Asia/Taipei"
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+PRICE_DIGITS = 6  # 與原本 round_to(price, 0.000001) 相同
+
+
+def epoch_unit(sample: float) -> str:
+    """
+    依數值大小判斷時間戳單位
+    Unix 時間戳: 秒級約 10 位數，毫秒級約 13 位數，微秒級約 16 位數，奈秒級約 19 位數
+    """
+    if sample > 10**18:
+        return "ns"
+    if sample > 10**15:
+        return "us"
+    if sample > 10**12:
+        return "ms"
+    return "s"
+
+
+def normalize_kbars(kbars) -> pl.DataFrame:
+    """
+    api.kbars 結果轉成欄位已正規化的 DataFrame
+
+    ts 轉為台北時區的 Datetime (無時區的時間視為台北時間, Shioaji 以台北時間當作 UTC 編碼),
+    價格四捨五入到小數 6 位, 全部以 polars 欄位運算完成. 無法解析的 ts 會 raise ValueError.
+    """
+    df = pl.DataFrame({**kbars})
+    if not len(df) or "ts" not in df.columns:
+        return df
+
+    ts = pl.col("ts")
+    dtype = df.schema["ts"]
+    if dtype.is_numeric():
+        ts = pl.from_epoch(ts.cast(pl.Int64), time_unit=epoch_unit(df["ts"][0]))
+    elif dtype == pl.Utf8:
+        try:
+            df = df.with_columns(ts.str.to_datetime())
+        except pl.exceptions.PolarsError:
+            try:
+                df = df.with_columns(ts.str.to_datetime("%Y-%m-%d %H:%M:%S"))
+            except pl.exceptions.PolarsError:
+                raise ValueError(f"無法解析時間格式: {df['ts'][0]}")
+        dtype = df.schema["ts"]
+    elif not isinstance(dtype, pl.Datetime):
+        raise ValueError(f"不支援的時間戳型別: {dtype}")
+
+    if isinstance(dtype, pl.Datetime) and dtype.time_zone:
+        ts = ts.dt.convert_time_zone(TW_TZ_NAME)
+    else:
+        ts = ts.dt.replace_time_zone(TW_TZ_NAME)
+    return df.with_columns(
+        ts.alias("ts"),
+        *[pl.col(name).cast(pl.Float64).round(PRICE_DIGITS) for name in PRICE_COLUMNS],
+    )
+
+
+def to_bars(
+    df: pl.DataFrame,
+    symbol: str,
+    exchange: Exchange,
+    interval: Interval,
+    gateway_name: str,
+) -> List[BarData]:
+    """normalize_kbars 的結果逐列建立 BarData, 欄位先整欄轉成 list 再 zip"""
+    if not len(df):
+        return []
+    columns = [df[name].to_list() for name in ("ts", *PRICE_COLUMNS, "Volume", "Amount")]
+    return [
+        BarData(
+            symbol=symbol,
+            exchange=exchange,
+            interval=interval,
+            datetime=dt,
+            open_price=open_price,
+            high_price=high_price,
+            low_price=low_price,
+            close_price=close_price,
+            volume=volume,
+            turnover=turnover,
+            open_interest=0,
+            gateway_name=gateway_name,
+        )
+        for dt, open_price, high_price, low_price, close_price, volume, turnover in zip(*columns)
+    ]
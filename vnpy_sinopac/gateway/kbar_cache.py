@@ -0,0 +1,172 @@
+# -*- coding: UTF-8 -*-
+import json
+import shutil
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import polars as pl
+
+from .kbar import TW_TZ_NAME
+from .utility import NIGHT_SESSION_START, TW_TZ
+
+KBAR_SCHEMA: Dict[str, pl.DataType] = {
+    "ts": pl.Datetime("ms", TW_TZ_NAME),
+    "Open": pl.Float64,
+    "High": pl.Float64,
+    "Low": pl.Float64,
+    "Close": pl.Float64,
+    "Volume": pl.Int64,
+    "Amount": pl.Float64,
+}
+
+
+def trading_day() -> pl.Expr:
+    """ts 所屬交易日, 與 get_trading_day 相同: 15:00 之後 (夜盤) 歸屬下一個交易日, 週末順延至週一"""
+    ts = pl.col("ts")
+    day = ts.dt.date() + pl.duration(days=(ts.dt.hour() >= NIGHT_SESSION_START).cast(pl.Int64))
+    weekday = day.dt.weekday()  # 週一為 1
+    return (day + pl.duration(days=pl.when(weekday >= 6).then(8 - weekday).otherwise(0))).alias("trading_day")
+
+
+def day_ranges(days: List[date]) -> List[Tuple[date, date]]:
+    """排序後的日期合併成連續區間 [(起, 迄)]"""
+    ranges: List[Tuple[date, date]] = []
+    for day in days:
+        if ranges and day - ranges[-1][1] == timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class KbarCache:
+    """
+    一分 K 本機快取
+
+    依連線環境、商品、交易日所屬月份存成 Parquet (root/環境/商品/YYYYMM.parquet), 已下載的
+    交易日記錄在商品目錄的 coverage.json (含沒有資料的假日). 日期一律以交易日計, 前一日 15:00
+    之後的夜盤屬於當日, 與 api.kbars 的查詢區間相同. 查詢時只下載缺少的日期區間, 取代該區間
+    的既有資料後整段由磁碟讀取. 今日 (含) 之後的資料可能不完整, 每次都重新下載且不標記為已下載.
+    """
+
+    def __init__(self, root: Path, environment: str) -> None:
+        self.root: Path = Path(root) / environment
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "requests": 0,  # load 次數
+            "hits": 0,  # 完全由快取提供的次數
+            "fetches": 0,  # 呼叫 api.kbars 的次數
+            "fetched_days": 0,  # 下載的日數
+            "cached_days": 0,  # 由快取提供的日數
+        }
+
+    def get_dir(self, symbol: str) -> Path:
+        return self.root / symbol
+
+    def get_path(self, symbol: str, month: str) -> Path:
+        return self.get_dir(symbol) / f"{month}.parquet"
+
+    def read_coverage(self, symbol: str) -> Set[date]:
+        path = self.get_dir(symbol) / "coverage.json"
+        if not path.exists():
+            return set()
+        return {date.fromisoformat(day) for day in json.loads(path.read_text())}
+
+    def write_coverage(self, symbol: str, days: Set[date]) -> None:
+        path = self.get_dir(symbol) / "coverage.json"
+        temp = path.with_suffix(".tmp")
+        temp.write_text(json.dumps(sorted(day.isoformat() for day in days)))
+        temp.replace(path)
+
+    def read_month(self, symbol: str, month: str) -> pl.DataFrame:
+        path = self.get_path(symbol, month)
+        if not path.exists():
+            return pl.DataFrame(schema=KBAR_SCHEMA)
+        return pl.read_parquet(path)
+
+    def load(
+        self,
+        symbol: str,
+        start: date,
+        end: date,
+        fetch: Callable[[str, str], pl.DataFrame],
+        today: Optional[date] = None,
+    ) -> pl.DataFrame:
+        """
+        回傳 [start, end] 的一分 K (欄位同 KBAR_SCHEMA)
+        fetch(起, 迄) 以 "%Y-%m-%d" 字串下載並回傳 normalize_kbars 的結果
+        """
+        today = today or datetime.now(TW_TZ).date()
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        with self.lock:
+            self.stats["requests"] += 1
+            covered = self.read_coverage(symbol)
+            missing = [day for day in days if day not in covered]
+            self.stats["cached_days"] += len(days) - len(missing)
+            if not missing:
+                self.stats["hits"] += 1
+
+            for first, last in day_ranges(missing):
+                df = fetch(first.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d"))
+                self.stats["fetches"] += 1
+                self.stats["fetched_days"] += (last - first).days + 1
+                self.store(symbol, first, last, df)
+                covered.update(day for day in missing if first <= day <= last and day < today)
+            if missing:
+                self.write_coverage(symbol, covered)
+
+            months = sorted({day.strftime("%Y%m") for day in days})  # 交易日所屬月份
+            frames = [self.read_month(symbol, month) for month in months]
+        return pl.concat(frames).filter(trading_day().is_between(start, end)).sort("ts")
+
+    def store(self, symbol: str, first: date, last: date, df: pl.DataFrame) -> None:
+        """以下載結果取代交易日在 [first, last] 內的既有資料, 依交易日月份寫回"""
+        if len(df) and "ts" in df.columns:
+            df = df.select([pl.col(name).cast(dtype) for name, dtype in KBAR_SCHEMA.items()])
+        else:
+            df = pl.DataFrame(schema=KBAR_SCHEMA)
+        df = df.with_columns(trading_day().dt.strftime("%Y%m").alias("month"))
+        months = set(df["month"].unique()) | {
+            (first + timedelta(days=i)).strftime("%Y%m") for i in range((last - first).days + 1)
+        }
+        self.get_dir(symbol).mkdir(parents=True, exist_ok=True)
+        for key in sorted(months):
+            old = self.read_month(symbol, key)
+            merged = (
+                pl.concat(
+                    [
+                        old.filter(~trading_day().is_between(first, last)),
+                        df.filter(pl.col("month") == key).drop("month"),
+                    ]
+                )
+                .unique("ts", keep="last")
+                .sort("ts")
+            )
+            path = self.get_path(symbol, key)
+            temp = path.with_suffix(".tmp")
+            merged.write_parquet(temp)
+            temp.replace(path)
+
+    def invalidate(self, symbol: str = "", start: Optional[date] = None, end: Optional[date] = None) -> None:
+        """
+        清除快取: 未指定 symbol 時清除全部; 指定 start/end 時只把該區間標記為未下載,
+        下次查詢時重新下載並取代
+        """
+        with self.lock:
+            if not symbol:
+                shutil.rmtree(self.root, ignore_errors=True)
+            elif start is None and end is None:
+                shutil.rmtree(self.get_dir(symbol), ignore_errors=True)
+            else:
+                covered = self.read_coverage(symbol)
+                if not covered:
+                    return
+                start = start or date.min
+                end = end or date.max
+                self.write_coverage(symbol, {day for day in covered if not start <= day <= end})
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.stats)
@@ -0,0 +1,119 @@
+# -*- coding: UTF-8 -*-
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import polars as pl
+from vnpy.trader.constant import Direction, Exchange, Offset, OrderType, Status
+from vnpy.trader.object import OrderData
+
+from .utility import TW_TZ
+
+ARCHIVE_SCHEMA: Dict[str, pl.DataType] = {
+    "orderid": pl.Utf8,
+    "sj_id": pl.Utf8,
+    "seqno": pl.Utf8,
+    "symbol": pl.Utf8,
+    "direction": pl.Utf8,
+    "offset": pl.Utf8,
+    "type": pl.Utf8,
+    "price": pl.Float64,
+    "volume": pl.Float64,
+    "traded": pl.Float64,
+    "status": pl.Utf8,
+    "timestamp": pl.Float64,
+    "reference": pl.Utf8,
+}
+
+
+class OrderArchive:
+    """
+    已結束委託的欄式歸檔
+
+    由 gateway 熱資料 (orders/trades) 移出的委託先寫入欄位緩衝, 每 chunk_size 筆轉成
+    polars DataFrame, 不保留 Shioaji Trade 物件. 超過 max_rows 時捨棄最舊的資料,
+    使長時間執行的記憶體維持固定上限. 可依本地 orderid 查回 OrderData.
+    """
+
+    def __init__(self, gateway_name: str, chunk_size: int = 4096, max_rows: int = 200000) -> None:
+        self.gateway_name: str = gateway_name
+        self.chunk_size: int = chunk_size
+        self.max_rows: int = max_rows
+        self.buffer: Dict[str, list] = {name: [] for name in ARCHIVE_SCHEMA}
+        self.chunks: List[pl.DataFrame] = []
+        self.rows: int = 0  # chunks 內的筆數
+        self.archived: int = 0  # 累計歸檔筆數
+        self.dropped: int = 0  # 超過上限捨棄的筆數
+
+    def __len__(self) -> int:
+        return self.rows + len(self.buffer["orderid"])
+
+    def add(self, order: OrderData, sj_id: str = "", seqno: str = "") -> None:
+        buffer = self.buffer
+        buffer["orderid"].append(order.orderid)
+        buffer["sj_id"].append(sj_id)
+        buffer["seqno"].append(seqno)
+        buffer["symbol"].append(order.symbol)
+        buffer["direction"].append(order.direction.value if order.direction else "")
+        buffer["offset"].append(order.offset.value)
+        buffer["type"].append(order.type.value)
+        buffer["price"].append(float(order.price))
+        buffer["volume"].append(float(order.volume))
+        buffer["traded"].append(float(order.traded))
+        buffer["status"].append(order.status.value)
+        buffer["timestamp"].append(order.datetime.timestamp() if order.datetime else 0.0)
+        buffer["reference"].append(order.reference or "")
+        self.archived += 1
+        if len(buffer["orderid"]) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """緩衝轉成 DataFrame chunk, chunk 過多時合併, 超過上限時捨棄最舊資料"""
+        if not self.buffer["orderid"]:
+            return
+        self.chunks.append(pl.DataFrame(self.buffer, schema=ARCHIVE_SCHEMA))
+        self.rows += len(self.buffer["orderid"])
+        self.buffer = {name: [] for name in ARCHIVE_SCHEMA}
+        if len(self.chunks) > 16:
+            self.chunks = [pl.concat(self.chunks, rechunk=True)]
+        if self.rows > self.max_rows:
+            extra = self.rows - self.max_rows
+            self.chunks = [pl.concat(self.chunks).slice(extra)]
+            self.rows = self.max_rows
+            self.dropped += extra
+
+    def to_frame(self) -> pl.DataFrame:
+        self.flush()
+        if not self.chunks:
+            return pl.DataFrame(schema=ARCHIVE_SCHEMA)
+        return pl.concat(self.chunks)
+
+    def get_row(self, orderid: str) -> Optional[dict]:
+        ids = self.buffer["orderid"]
+        for i in range(len(ids) - 1, -1, -1):
+            if ids[i] == orderid:
+                return {name: values[i] for name, values in self.buffer.items()}
+        for chunk in reversed(self.chunks):
+            rows = chunk.filter(pl.col("orderid") == orderid)
+            if rows.height:
+                return rows.row(rows.height - 1, named=True)
+        return None
+
+    def get(self, orderid: str) -> Optional[OrderData]:
+        row = self.get_row(orderid)
+        if row is None:
+            return None
+        return OrderData(
+            symbol=row["symbol"],
+            exchange=Exchange.LOCAL,
+            orderid=orderid,
+            type=OrderType(row["type"]),
+            direction=Direction(row["direction"]) if row["direction"] else None,
+            offset=Offset(row["offset"]),
+            price=row["price"],
+            volume=row["volume"],
+            traded=row["traded"],
+            status=Status(row["status"]),
+            datetime=datetime.fromtimestamp(row["timestamp"], TW_TZ) if row["timestamp"] else None,
+            reference=row["reference"],
+            gateway_name=self.gateway_name,
+        )
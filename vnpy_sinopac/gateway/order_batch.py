@@ -0,0 +1,70 @@
+# -*- coding: UTF-8 -*-
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+
+class OrderBatch:
+    """一批下單/刪單的逐筆結果與總耗時"""
+
+    def __init__(self, label: str, size: int, start: float) -> None:
+        self.label: str = label
+        self.results: List[Optional[str]] = [None] * size  # None 為成功, 否則為錯誤訊息
+        self.start: float = start
+        self.elapsed: float = 0.0  # 由建立委託到最後一筆送出的秒數
+        self.remaining: int = size
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+    @property
+    def failed(self) -> int:
+        return sum(result is not None for result in self.results)
+
+    def finish(self, index: int, result: Optional[str]) -> bool:
+        """記錄一筆結果, 最後一筆完成時回傳 True"""
+        with self.lock:
+            self.results[index] = result
+            self.remaining -= 1
+            if self.remaining:
+                return False
+        self.elapsed = time.perf_counter() - self.start
+        return True
+
+
+class BatchSubmitter:
+    """
+    批次下單執行緒池
+
+    以固定大小的執行緒池並行呼叫下單/刪單, 同時在途的請求數不超過 workers.
+    每個 task 回傳 False 或拋出例外視為失敗.
+    """
+
+    def __init__(self, workers: int, on_done: Optional[Callable[[OrderBatch], None]] = None) -> None:
+        self.workers: int = workers
+        self.on_done = on_done
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="SinopacBatch")
+
+    def submit(self, label: str, tasks: List[Callable], start: Optional[float] = None) -> OrderBatch:
+        batch = OrderBatch(label, len(tasks), start or time.perf_counter())
+        if not tasks:
+            batch.done.set()
+            return batch
+        for index, task in enumerate(tasks):
+            self.executor.submit(self.run, batch, index, task)
+        return batch
+
+    def run(self, batch: OrderBatch, index: int, task: Callable) -> None:
+        try:
+            result = None if task() is not False else "送出失敗"
+        except Exception as exc:
+            result = str(exc)
+        if batch.finish(index, result):
+            try:
+                if self.on_done:
+                    self.on_done(batch)
+            finally:
+                batch.done.set()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
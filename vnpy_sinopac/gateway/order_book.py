@@ -0,0 +1,130 @@
+# -*- coding: UTF-8 -*-
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEPTH = 5
+
+BOOK_DTYPE = np.dtype(
+    [
+        ("bid_price", np.float64, (DEPTH,)),
+        ("ask_price", np.float64, (DEPTH,)),
+        ("bid_volume", np.int64, (DEPTH,)),
+        ("ask_volume", np.int64, (DEPTH,)),
+        ("datetime", "datetime64[us]"),
+    ]
+)
+
+
+def readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class OrderBookStore:
+    """
+    五檔報價陣列
+
+    每個訂閱商品佔 NumPy structured array 的一列, bidask callback 直接原地更新,
+    策略端可一次取得所有商品的價差、中價、委買委賣量比與最佳一檔矩陣.
+
+    讀取時不加鎖, 同一列可能讀到更新到一半的資料; 需要一致快照者請使用 snapshot().
+    """
+
+    def __init__(self, capacity: int = 256) -> None:
+        self.book: np.ndarray = np.zeros(capacity, dtype=BOOK_DTYPE)
+        self.symbols: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.bind_columns()
+
+    def bind_columns(self) -> None:
+        self.bid_price = self.book["bid_price"]
+        self.ask_price = self.book["ask_price"]
+        self.bid_volume = self.book["bid_volume"]
+        self.ask_volume = self.book["ask_volume"]
+        self.datetime = self.book["datetime"]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def add(self, symbol: str) -> int:
+        """新增商品並回傳列號, 已存在則直接回傳"""
+        row = self.rows.get(symbol, None)
+        if row is not None:
+            return row
+
+        row = len(self.symbols)
+        if row == len(self.book):
+            book = np.zeros(len(self.book) * 2, dtype=BOOK_DTYPE)
+            book[:row] = self.book
+            self.book = book
+            self.bind_columns()
+        self.symbols.append(symbol)
+        self.rows[symbol] = row
+        return row
+
+    def update(
+        self,
+        symbol: str,
+        dt: datetime,
+        bid_price: Sequence,
+        bid_volume: Sequence,
+        ask_price: Sequence,
+        ask_volume: Sequence,
+    ) -> None:
+        row = self.rows.get(symbol, None)
+        if row is None:
+            row = self.add(symbol)
+        self.bid_price[row] = bid_price
+        self.ask_price[row] = ask_price
+        self.bid_volume[row] = bid_volume
+        self.ask_volume[row] = ask_volume
+        self.datetime[row] = dt
+
+    def row(self, symbol: str) -> Optional[int]:
+        return self.rows.get(symbol, None)
+
+    def snapshot(self) -> np.ndarray:
+        """目前所有商品的五檔複本"""
+        return self.book[: len(self.symbols)].copy()
+
+    def best_bid(self) -> np.ndarray:
+        return readonly(self.bid_price[: len(self.symbols), 0])
+
+    def best_ask(self) -> np.ndarray:
+        return readonly(self.ask_price[: len(self.symbols), 0])
+
+    def spreads(self) -> np.ndarray:
+        """最佳一檔買賣價差"""
+        n = len(self.symbols)
+        return readonly(self.ask_price[:n, 0] - self.bid_price[:n, 0])
+
+    def mid_prices(self) -> np.ndarray:
+        """最佳一檔中價"""
+        n = len(self.symbols)
+        return readonly((self.ask_price[:n, 0] + self.bid_price[:n, 0]) / 2)
+
+    def imbalance(self, levels: int = 1) -> np.ndarray:
+        """前 levels 檔的 (委買量 - 委賣量) / (委買量 + 委賣量), 無掛單時為 0"""
+        n = len(self.symbols)
+        bid = self.bid_volume[:n, :levels].sum(axis=1)
+        ask = self.ask_volume[:n, :levels].sum(axis=1)
+        total = bid + ask
+        result = np.divide(
+            bid - ask,
+            total,
+            out=np.zeros(n, dtype=np.float64),
+            where=total != 0,
+        )
+        return readonly(result)
+
+    def top_of_book(self) -> np.ndarray:
+        """最佳一檔矩陣, 欄位依序為 bid_price, bid_volume, ask_price, ask_volume"""
+        n = len(self.symbols)
+        matrix = np.empty((n, 4), dtype=np.float64)
+        matrix[:, 0] = self.bid_price[:n, 0]
+        matrix[:, 1] = self.bid_volume[:n, 0]
+        matrix[:, 2] = self.ask_price[:n, 0]
+        matrix[:, 3] = self.ask_volume[:n, 0]
+        return readonly(matrix)
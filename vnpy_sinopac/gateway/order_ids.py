@@ -0,0 +1,57 @@
+# -*- coding: UTF-8 -*-
+import itertools
+from typing import Dict, Set
+
+
+class OrderIdMap:
+    """
+    本地委託編號與 Shioaji order.id / seqno 的雙向對照
+
+    send_order 送出前即產生本地編號 (prefix + 流水號), 下單回呼送達後再與 Shioaji
+    order.id、seqno 綁定. 非本 gateway 送出的委託 (如其他連線下單) 以 order.id 作為本地編號.
+    """
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix: str = prefix
+        self.counter = itertools.count(1)
+        self.local2sj: Dict[str, str] = {}
+        self.sj2local: Dict[str, str] = {}
+        self.seqno2local: Dict[str, str] = {}
+        self.pending: Set[str] = set()  # 已產生但尚未取得 order.id 的本地編號
+
+    def new_orderid(self) -> str:
+        orderid = f"{self.prefix}{next(self.counter):06d}"
+        self.pending.add(orderid)
+        return orderid
+
+    def bind(self, orderid: str, sj_id: str, seqno: str = "") -> None:
+        self.local2sj[orderid] = sj_id
+        self.sj2local[sj_id] = orderid
+        if seqno:
+            self.seqno2local[seqno] = orderid
+        self.pending.discard(orderid)
+
+    def discard(self, orderid: str) -> None:
+        """送出失敗的本地編號"""
+        self.pending.discard(orderid)
+
+    def is_pending(self, orderid: str) -> bool:
+        return orderid in self.pending
+
+    def get_local(self, sj_id: str, seqno: str = "") -> str:
+        orderid = self.sj2local.get(sj_id, None)
+        if orderid is None and seqno:
+            orderid = self.seqno2local.get(seqno, None)
+        return orderid or sj_id
+
+    def get_sj(self, orderid: str) -> str:
+        return self.local2sj.get(orderid, orderid)
+
+    def forget(self, orderid: str, seqno: str = "") -> None:
+        """委託歸檔後移除對照"""
+        sj_id = self.local2sj.pop(orderid, None)
+        if sj_id is not None:
+            self.sj2local.pop(sj_id, None)
+        if seqno:
+            self.seqno2local.pop(seqno, None)
+        self.pending.discard(orderid)
@@ -0,0 +1,103 @@
+# -*- coding: UTF-8 -*-
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 各階段相對 send_order 進入時間的延遲
+STAGES: Dict[str, str] = {
+    "place": "下單返回",  # api.place_order 返回
+    "callback": "下單回呼",  # place_order_callback
+    "ack": "委託回報",  # RelayOPType.New 回報
+    "fill": "首筆成交",  # 第一筆成交回報
+    "exchange_ack": "交易所委託",  # 回報 exchange_ts - send_order 時間
+    "exchange_fill": "交易所成交",  # 成交 ts - send_order 時間
+}
+
+
+class OrderLatency:
+    """
+    委託端到端延遲統計
+
+    send_order 時記錄起點 (perf_counter 與 wall clock), 之後各階段只做一次時間戳與
+    deque append; 百分位數在查詢時才計算. 交易所時間戳與本機 wall clock 比較, 含時鐘誤差.
+    委託在 place_order 返回且收到首筆成交後, 或結束 (刪單、拒絕) 時移除; 未收到結束回報
+    (如收盤後失效) 的委託超過 max_age 秒後於下一次 start 時清除.
+    """
+
+    def __init__(self, max_samples: int = 1000, max_age: float = 43200) -> None:
+        self.max_samples: int = max_samples
+        self.max_age: float = max_age
+        self.purged_at: float = time.perf_counter()
+        self.entries: Dict[str, list] = {}  # orderid -> [帳號類別, 起點, wall clock, 已返回, 已成交]
+        self.samples: Dict[Tuple[str, str], Deque[float]] = {}  # (帳號類別, 階段) -> 秒數
+        self.lock = threading.Lock()
+
+    def start(self, orderid: str, account: str, start: Optional[float] = None) -> None:
+        now = time.perf_counter()
+        start = start or now
+        self.entries[orderid] = [account, start, time.time() - (now - start), False, False]
+        if now - self.purged_at >= 60:
+            self.purge(now)
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """移除超過 max_age 秒的委託, 回傳移除筆數"""
+        now = time.perf_counter() if now is None else now
+        self.purged_at = now
+        expired = [orderid for orderid, entry in list(self.entries.items()) if now - entry[1] > self.max_age]
+        for orderid in expired:
+            self.entries.pop(orderid, None)
+        return len(expired)
+
+    def mark(self, orderid: str, stage: str, broker_ts: float = 0.0) -> None:
+        """記錄 stage, broker_ts 為交易所時間戳 (秒); 首筆成交只記錄一次"""
+        entry = self.entries.get(orderid, None)
+        if entry is None or (stage == "fill" and entry[4]):
+            return
+        now = time.perf_counter()
+        account, start, wall = entry[:3]
+        if stage == "place":
+            entry[3] = True
+        elif stage == "fill":
+            entry[4] = True
+        if entry[3] and entry[4]:
+            self.entries.pop(orderid, None)
+        with self.lock:
+            self.record(account, stage, now - start)
+            if broker_ts:
+                self.record(account, f"exchange_{stage}", broker_ts - wall)
+
+    def discard(self, orderid: str) -> None:
+        self.entries.pop(orderid, None)
+
+    def record(self, account: str, stage: str, value: float) -> None:
+        samples = self.samples.get((account, stage), None)
+        if samples is None:
+            samples = self.samples[(account, stage)] = deque(maxlen=self.max_samples)
+        samples.append(value)
+
+    def get_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """{帳號類別: {階段: {count, p50_ms, p99_ms, max_ms}}}, 取最近 max_samples 筆"""
+        with self.lock:
+            arrays = {key: np.array(samples) * 1000 for key, samples in self.samples.items()}
+        stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (account, stage), values in arrays.items():
+            stats.setdefault(account, {})[stage] = {
+                "count": len(values),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p99_ms": float(np.percentile(values, 99)),
+                "max_ms": float(values.max()),
+            }
+        return stats
+
+    def format_stats(self) -> List[str]:
+        lines = []
+        for account, stages in self.get_stats().items():
+            parts = [
+                f"{STAGES[stage]} {s['p50_ms']:.1f}/{s['p99_ms']:.1f}/{s['max_ms']:.1f}"
+                for stage, s in sorted(stages.items(), key=lambda item: list(STAGES).index(item[0]))
+            ]
+            lines.append(f"委託延遲 {account} (p50/p99/max 毫秒): " + ", ".join(parts))
+        return lines
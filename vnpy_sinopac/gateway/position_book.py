@@ -0,0 +1,69 @@
+# -*- coding: UTF-8 -*-
+import time
+from typing import Dict
+
+from vnpy.trader.constant import Direction, Exchange, Offset
+from vnpy.trader.object import PositionData
+from vnpy.trader.utility import round_to
+
+
+class PositionBook:
+    """
+    由成交回報增量維護的本地部位
+
+    每檔商品一個淨部位 (與 list_position_callback 相同, 以 symbol 為 key), 成交時 O(1) 更新:
+    同向加碼以成交價更新均價; 反向成交先平倉, 今日平倉 (CLOSETODAY) 先沖銷今日部位,
+    其餘先沖銷昨日部位 (yd_volume); 超過持倉的部分反向開倉.
+    frozen 沿用 list_position_callback 的定義 (今日部位).
+    """
+
+    def __init__(self, positions: Dict[str, PositionData], gateway_name: str) -> None:
+        self.positions: Dict[str, PositionData] = positions
+        self.gateway_name: str = gateway_name
+        self.last_deal: Dict[str, float] = {}  # 商品最後成交時間 perf_counter
+
+    def on_deal(
+        self,
+        symbol: str,
+        direction: Direction,
+        offset: Offset,
+        price: float,
+        volume: float,
+    ) -> PositionData:
+        pos = self.positions.get(symbol, None)
+        if pos is None:
+            pos = PositionData(
+                symbol=symbol,
+                exchange=Exchange.LOCAL,
+                direction=direction,
+                gateway_name=self.gateway_name,
+            )
+            self.positions[symbol] = pos
+
+        if not pos.volume or pos.direction == direction:
+            pos.price = round_to((pos.price * pos.volume + price * volume) / (pos.volume + volume), 0.0001)
+            pos.volume += volume
+            pos.direction = direction
+        else:
+            closed = min(volume, pos.volume)
+            if offset == Offset.CLOSETODAY:
+                today = pos.volume - pos.yd_volume
+                pos.yd_volume -= closed - min(closed, today)
+            else:
+                pos.yd_volume -= min(closed, pos.yd_volume)
+            pos.volume -= closed
+            if not pos.volume:
+                pos.price = 0
+            remain = volume - closed
+            if remain:
+                pos.direction = direction
+                pos.volume = remain
+                pos.price = price
+                pos.yd_volume = 0
+        pos.frozen = pos.volume - pos.yd_volume
+        self.last_deal[symbol] = time.perf_counter()
+        return pos
+
+    def dealt_since(self, symbol: str, since: float) -> bool:
+        """since (perf_counter) 之後是否有成交, 核對時用來略過查詢後才成交的商品"""
+        return self.last_deal.get(symbol, 0.0) >= since
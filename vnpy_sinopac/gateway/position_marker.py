@@ -0,0 +1,77 @@
+# -*- coding: UTF-8 -*-
+import time
+from typing import Callable, Dict, Optional, Set
+
+from vnpy.trader.constant import Direction
+from vnpy.trader.object import PositionData
+
+
+class PositionMarker:
+    """
+    Tick 驅動的部位即時損益 (mark-to-market)
+
+    positions 以 symbol 為 key, 行情更新時只重估該商品的部位:
+    pnl = (最新價 - 均價) * 部位 * 乘數 (期貨/選擇權為合約乘數, 股票為每張股數).
+    每檔商品在 interval 秒內最多推送一次, 其間的變動由 flush 補送最新狀態.
+    待送只記錄 symbol, flush 時才取 positions 中的部位, 部位核對替換物件後不會推送舊部位.
+    """
+
+    def __init__(
+        self,
+        positions: Dict[str, PositionData],
+        multiplier: Callable[[str], float],
+        on_position: Callable[[PositionData], None],
+        interval: float = 0.5,
+    ) -> None:
+        self.positions: Dict[str, PositionData] = positions
+        self.multiplier = multiplier
+        self.on_position = on_position
+        self.interval: float = interval
+
+        self.pending: Set[str] = set()  # 已重估但尚未推送的商品
+        self.last_sent: Dict[str, float] = {}  # 最後推送時間 monotonic
+        self.revalued: int = 0
+        self.emitted: int = 0
+
+    def revalue(self, position: PositionData, last_price: float) -> bool:
+        """重估 position.pnl, 有變動時回傳 True"""
+        if not position.volume or not last_price:
+            pnl = 0.0
+        else:
+            sign = 1 if position.direction == Direction.LONG else -1
+            pnl = (last_price - position.price) * position.volume * self.multiplier(position.symbol) * sign
+            pnl = round(pnl, 2)
+        if pnl == position.pnl:
+            return False
+        position.pnl = pnl
+        self.revalued += 1
+        return True
+
+    def update(self, symbol: str, last_price: float) -> None:
+        """由行情 callback 呼叫"""
+        position = self.positions.get(symbol, None)
+        if position is None or not self.revalue(position, last_price):
+            return
+        now = time.monotonic()
+        if now - self.last_sent.get(symbol, -self.interval) >= self.interval:
+            self.pending.discard(symbol)
+            self.send(symbol, position, now)
+        else:
+            self.pending.add(symbol)
+
+    def flush(self, now: Optional[float] = None) -> None:
+        """推送已到期的待送部位, 由計時器呼叫"""
+        if not self.pending:
+            return
+        now = time.monotonic() if now is None else now
+        for symbol in list(self.pending):
+            if now - self.last_sent.get(symbol, -self.interval) >= self.interval:
+                self.pending.discard(symbol)
+                position = self.positions.get(symbol, None)
+                if position is not None:
+                    self.send(symbol, position, now)
+
+    def send(self, symbol: str, position: PositionData, now: float) -> None:
+        self.last_sent[symbol] = now
+        self.emitted += 1
+        self.on_position(position)
@@ -0,0 +1,141 @@
+# -*- coding: UTF-8 -*-
+import threading
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+
+class OverflowPolicy(str, Enum):
+    DROP_OLDEST = "丟棄最舊"
+    DROP_NEWEST = "丟棄最新"
+    BLOCK = "阻塞等待"
+
+
+class QuoteDispatcher:
+    """
+    行情派送佇列
+
+    Shioaji 行情 callback 只把 (handler, tick) 放入預先配置的環形緩衝區,
+    由專用派送執行緒取出後執行 handler, 避免下游處理速度拖慢行情接收執行緒.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        batch: int = 256,
+    ) -> None:
+        self.size: int = size
+        self.policy: OverflowPolicy = OverflowPolicy(policy)
+        self.on_error = on_error
+        self.batch: int = batch
+
+        self.handlers: List[Optional[Callable]] = [None] * size
+        self.items: List[Any] = [None] * size
+        self.head: int = 0  # 下一個讀取位置
+        self.count: int = 0  # 佇列深度
+
+        self.high_water: int = 0
+        self.dropped: int = 0
+        self.processed: int = 0
+
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+
+        self.active: bool = False
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(
+            target=self.run, name="SinopacQuoteDispatcher", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        """停止派送執行緒, 佇列中剩餘的行情會先處理完"""
+        if not self.active:
+            return
+        with self.lock:
+            self.active = False
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def put(self, handler: Callable[[Any], None], item: Any) -> bool:
+        """由行情 callback 呼叫, 回傳是否成功放入佇列"""
+        with self.lock:
+            if self.count == self.size:
+                if self.policy is OverflowPolicy.DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                elif self.policy is OverflowPolicy.DROP_OLDEST:
+                    self.handlers[self.head] = None
+                    self.items[self.head] = None
+                    self.head = (self.head + 1) % self.size
+                    self.count -= 1
+                    self.dropped += 1
+                else:
+                    while self.count == self.size and self.active:
+                        self.not_full.wait()
+                    if self.count == self.size:
+                        self.dropped += 1
+                        return False
+
+            tail = (self.head + self.count) % self.size
+            self.handlers[tail] = handler
+            self.items[tail] = item
+            self.count += 1
+            if self.count > self.high_water:
+                self.high_water = self.count
+            if self.count == 1:
+                self.not_empty.notify()
+            return True
+
+    def take(self) -> List[tuple]:
+        """取出一批待處理行情, 佇列為空時等待"""
+        with self.lock:
+            while self.count == 0 and self.active:
+                self.not_empty.wait()
+            n = min(self.count, self.batch)
+            taken = []
+            for _ in range(n):
+                taken.append((self.handlers[self.head], self.items[self.head]))
+                self.handlers[self.head] = None
+                self.items[self.head] = None
+                self.head = (self.head + 1) % self.size
+            self.count -= n
+            if n and self.policy is OverflowPolicy.BLOCK:
+                self.not_full.notify_all()
+            return taken
+
+    def run(self) -> None:
+        while True:
+            taken = self.take()
+            if not taken:
+                if not self.active:
+                    break
+                continue
+            for handler, item in taken:
+                try:
+                    handler(item)
+                except Exception as exc:
+                    if self.on_error:
+                        self.on_error(exc)
+            with self.lock:
+                self.processed += len(taken)
+
+    def get_stats(self) -> Dict[str, int]:
+        """佇列深度、最高水位、丟棄與已處理筆數"""
+        with self.lock:
+            return {
+                "depth": self.count,
+                "high_water": self.high_water,
+                "dropped": self.dropped,
+                "processed": self.processed,
+            }
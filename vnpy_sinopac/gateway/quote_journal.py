@@ -0,0 +1,332 @@
+# -*- coding: UTF-8 -*-
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from enum import IntEnum
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import polars as pl
+
+from .utility import get_trading_day
+
+MAGIC = b"SJQJ0001"
+HEADER_SIZE = 64
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+CODE_SIZE = 16  # code 欄位 S16 的 bytes 數
+DEFAULT_CAPACITY = 100_000  # 每個檔案的筆數, 約 27 MB
+DEFAULT_QUEUE_SIZE = 200_000  # 等待寫入的行情上限
+
+
+class JournalKind(IntEnum):
+    TICK_STK = 1
+    TICK_FOP = 2
+    BIDASK_STK = 3
+    BIDASK_FOP = 4
+
+
+COLUMNS: List[Tuple[str, str]] = [
+    ("kind", "u1"),
+    ("simtrade", "u1"),
+    ("code", "S16"),
+    ("datetime", "i8"),  # 交易所時間 (台北時間, 無時區) ns
+    ("localtime", "i8"),  # 收到行情的 UTC 時間 ns
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("price_chg", "f8"),
+    ("volume", "i8"),
+    ("total_volume", "i8"),
+    ("total_amount", "f8"),
+    ("underlying_price", "f8"),
+]
+for _side in ("bid", "ask"):
+    COLUMNS.extend((f"{_side}_price_{i}", "f8") for i in range(1, 6))
+for _side in ("bid", "ask"):
+    COLUMNS.extend((f"{_side}_volume_{i}", "i8") for i in range(1, 6))
+
+POLARS_DTYPES: Dict[str, pl.DataType] = {
+    "u1": pl.UInt8,
+    "S16": pl.Utf8,
+    "i8": pl.Int64,
+    "f8": pl.Float64,
+}
+POLARS_SCHEMA: Dict[str, pl.DataType] = {
+    name: POLARS_DTYPES[dtype] for name, dtype in COLUMNS
+}
+POLARS_SCHEMA["datetime"] = pl.Datetime("ns")
+POLARS_SCHEMA["localtime"] = pl.Datetime("ns", "UTC")
+
+TICK_FIELDS = ["open", "high", "low", "close", "price_chg", "total_amount"]
+LEVEL_FIELDS = ["bid_price", "ask_price", "bid_volume", "ask_volume"]
+
+
+def column_offsets(capacity: int) -> Dict[str, int]:
+    """欄式排列: 每個欄位佔連續 capacity 筆, 起點對齊 8 bytes"""
+    offsets = {}
+    offset = HEADER_SIZE
+    for name, dtype in COLUMNS:
+        offsets[name] = offset
+        offset += np.dtype(dtype).itemsize * capacity
+        offset = (offset + 7) // 8 * 8
+    offsets[""] = offset
+    return offsets
+
+
+def to_ns(dt: datetime) -> int:
+    return (dt.replace(tzinfo=None) - EPOCH) // MICROSECOND * 1000
+
+
+class JournalSegment:
+    """單一固定容量的 memory-mapped 紀錄檔"""
+
+    def __init__(self, path: Path, capacity: int) -> None:
+        self.path: Path = path
+        if path.exists():
+            header = np.fromfile(path, dtype=np.uint64, count=3)
+            capacity = int(header[1])
+        else:
+            with open(path, "wb") as f:
+                f.truncate(column_offsets(capacity)[""])
+
+        self.capacity: int = capacity
+        self.mm = np.memmap(path, dtype=np.uint8, mode="r+")
+        self.header = np.frombuffer(self.mm, dtype=np.uint64, count=3)
+        if bytes(self.mm[:8]) != MAGIC:
+            self.mm[:8] = np.frombuffer(MAGIC, dtype=np.uint8)
+            self.header[1] = capacity
+            self.header[2] = 0
+
+        offsets = column_offsets(capacity)
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.frombuffer(self.mm, dtype=dtype, count=capacity, offset=offsets[name])
+            for name, dtype in COLUMNS
+        }
+
+    @property
+    def count(self) -> int:
+        return int(self.header[2])
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.count
+
+    def write(self, batch: Dict[str, list], start: int, n: int) -> None:
+        count = self.count
+        for name, values in batch.items():
+            self.columns[name][count:count + n] = values[start:start + n]
+        self.header[2] = count + n
+
+    def flush(self) -> None:
+        self.mm.flush()
+
+
+class QuoteJournal:
+    """
+    行情原始紀錄
+
+    行情 callback 只把原始 Shioaji 物件放入 deque, 由背景執行緒批次轉成欄式資料,
+    寫入依交易日分目錄、固定容量輪替的 memory-mapped 檔案, 每批寫完後一次 flush 到磁碟.
+    商品代碼超過 CODE_SIZE bytes 的行情無法完整保存, 不寫入並以 on_error 回報 (每個代碼一次).
+    寫入停滯 (磁碟緩慢) 時 deque 最多累積 queue_size 筆, 超過的新行情丟棄並計入 dropped.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        capacity: int = DEFAULT_CAPACITY,
+        flush_interval: float = 1.0,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        self.root: Path = Path(root)
+        self.capacity: int = capacity
+        self.flush_interval: float = flush_interval
+        self.on_error = on_error
+        self.queue_size: int = queue_size
+
+        self.queue: Deque[tuple] = deque()
+        self.high_water: int = 0
+        self.dropped: int = 0
+        self.segment: Optional[JournalSegment] = None
+        self.trading_day: Optional[date] = None
+        self.recorded: int = 0
+        self.rejected: int = 0
+        self.rejected_codes: Set[str] = set()
+
+        self.active: bool = False
+        self.thread: Optional[threading.Thread] = None
+        self.wakeup = threading.Event()
+
+    def record_tick(self, tick) -> None:
+        if len(self.queue) >= self.queue_size:
+            self.dropped += 1
+            return
+        self.queue.append((True, tick, time.time_ns()))
+
+    def record_bidask(self, tick) -> None:
+        if len(self.queue) >= self.queue_size:
+            self.dropped += 1
+            return
+        self.queue.append((False, tick, time.time_ns()))
+
+    def start(self) -> None:
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(
+            target=self.run, name="SinopacQuoteJournal", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        if not self.active:
+            return
+        self.active = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        self.segment = None
+
+    def run(self) -> None:
+        while self.active:
+            self.wakeup.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as exc:
+                if self.on_error:
+                    self.on_error(exc)
+
+    def flush(self) -> int:
+        """寫入目前累積的行情並 flush 到磁碟, 回傳寫入筆數"""
+        n = len(self.queue)
+        if not n:
+            return 0
+        if n > self.high_water:
+            self.high_water = n
+
+        batches: Dict[date, Dict[str, list]] = {}
+        popleft = self.queue.popleft
+        written = 0
+        for _ in range(n):
+            is_tick, tick, localtime = popleft()
+            code = tick.code.encode()
+            if len(code) > CODE_SIZE:
+                self.reject(tick.code)
+                continue
+            day = get_trading_day(tick.datetime)
+            batch = batches.get(day, None)
+            if batch is None:
+                batch = {name: [] for name, _ in COLUMNS}
+                batches[day] = batch
+            self.convert(batch, is_tick, tick, code, localtime)
+            written += 1
+
+        for day, batch in batches.items():
+            self.write(day, batch)
+        self.recorded += written
+        return written
+
+    def reject(self, code: str) -> None:
+        """代碼過長, numpy 的 S16 會直接截斷, 不寫入"""
+        self.rejected += 1
+        if code in self.rejected_codes:
+            return
+        self.rejected_codes.add(code)
+        if self.on_error:
+            self.on_error(ValueError(f"商品代碼 {code} 超過 {CODE_SIZE} bytes, 不寫入行情紀錄"))
+
+    def convert(self, batch: Dict[str, list], is_tick: bool, tick, code: bytes, localtime: int) -> None:
+        fop = hasattr(tick, "underlying_price")
+        if is_tick:
+            kind = JournalKind.TICK_FOP if fop else JournalKind.TICK_STK
+        else:
+            kind = JournalKind.BIDASK_FOP if fop else JournalKind.BIDASK_STK
+        batch["kind"].append(kind)
+        batch["simtrade"].append(int(tick.simtrade))
+        batch["code"].append(code)
+        batch["datetime"].append(to_ns(tick.datetime))
+        batch["localtime"].append(localtime)
+        batch["underlying_price"].append(float(tick.underlying_price) if fop else 0.0)
+
+        if is_tick:
+            for name in TICK_FIELDS:
+                batch[name].append(float(getattr(tick, name)))
+            batch["volume"].append(tick.volume)
+            batch["total_volume"].append(tick.total_volume)
+            for name in LEVEL_FIELDS:
+                for i in range(1, 6):
+                    batch[f"{name}_{i}"].append(0)
+        else:
+            for name in TICK_FIELDS:
+                batch[name].append(0.0)
+            batch["volume"].append(0)
+            batch["total_volume"].append(0)
+            for name in LEVEL_FIELDS:
+                for i, value in enumerate(getattr(tick, name), 1):
+                    batch[f"{name}_{i}"].append(value)
+
+    def write(self, day: date, batch: Dict[str, list]) -> None:
+        total = len(batch["kind"])
+        start = 0
+        while start < total:
+            segment = self.get_segment(day)
+            n = min(segment.free, total - start)
+            segment.write(batch, start, n)
+            start += n
+            segment.flush()
+
+    def get_segment(self, day: date) -> JournalSegment:
+        """取得可寫入的檔案, 換日或寫滿時輪替"""
+        if self.segment and self.trading_day == day and self.segment.free:
+            return self.segment
+
+        folder = self.root / day.strftime("%Y%m%d")
+        folder.mkdir(parents=True, exist_ok=True)
+        paths = sorted(folder.glob("quotes_*.bin"))
+        seq = len(paths)
+        if paths:
+            segment = JournalSegment(paths[-1], self.capacity)
+            if segment.free:
+                self.segment, self.trading_day = segment, day
+                return segment
+        path = folder / f"quotes_{seq:04d}.bin"
+        self.segment, self.trading_day = JournalSegment(path, self.capacity), day
+        return self.segment
+
+
+def read_journal(root: Path, trading_day: date) -> pl.DataFrame:
+    """
+    讀取某交易日的行情紀錄
+
+    數值欄位直接引用 memory-mapped 檔案 (zero-copy), 只有 code 欄位需解碼成字串.
+    """
+    frames = []
+    folder = Path(root) / trading_day.strftime("%Y%m%d")
+    for path in sorted(folder.glob("quotes_*.bin")):
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(mm[:8]) != MAGIC:
+            continue
+        header = np.frombuffer(mm, dtype=np.uint64, count=3)
+        capacity, count = int(header[1]), int(header[2])
+        if not count:
+            continue
+        offsets = column_offsets(capacity)
+        series = []
+        for name, dtype in COLUMNS:
+            values = np.frombuffer(mm, dtype=dtype, count=count, offset=offsets[name])
+            s = pl.Series(name, values)
+            if s.dtype != POLARS_SCHEMA[name]:
+                s = s.cast(POLARS_SCHEMA[name])
+            series.append(s)
+        frames.append(pl.DataFrame(series))
+
+    if not frames:
+        return pl.DataFrame(schema=POLARS_SCHEMA)
+    return pl.concat(frames, rechunk=False)
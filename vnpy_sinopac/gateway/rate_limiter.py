@@ -0,0 +1,154 @@
+# -*- coding: UTF-8 -*-
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+PRIORITY_CANCEL = 0
+PRIORITY_ORDER = 1
+PRIORITY_QUERY = 2
+
+
+class TokenBucket:
+    """每 period 秒最多 capacity 次, 以固定速率補充, 可累積至 capacity 次突發"""
+
+    def __init__(self, capacity: int, period: float) -> None:
+        self.capacity: float = float(capacity)
+        self.rate: float = capacity / period
+        self.tokens: float = float(capacity)
+        self.updated: float = time.monotonic()
+
+    def acquire(self, now: float) -> float:
+        """取得一個 token 時回傳 0, 否則回傳需等待的秒數"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RequestScheduler:
+    """
+    下單/查詢流量控制
+
+    每個 bucket (如下單與刪單合併計算的 order、查詢的 query) 各有一個優先佇列,
+    數字小者先送 (刪單優先於新單), 同優先以送入順序. 超出額度的請求在佇列中等待
+    token 補充後以最大允許速率送出, 而非直接送出被拒. 依請求類別統計排隊時間.
+    """
+
+    def __init__(
+        self,
+        buckets: Dict[str, TokenBucket],
+        on_error: Optional[Callable[[str], None]] = None,
+        max_samples: int = 10000,
+    ) -> None:
+        self.buckets: Dict[str, TokenBucket] = buckets
+        self.queues: Dict[str, List[Tuple[int, int, float, str, Callable, tuple]]] = {
+            name: [] for name in buckets
+        }
+        self.on_error = on_error
+        self.sequence = itertools.count()
+
+        self.waits: Dict[str, Deque[float]] = {}  # 各類別排隊秒數
+        self.max_samples: int = max_samples
+        self.sent: Dict[str, int] = {}
+        self.high_water: int = 0
+
+        self.active: bool = False
+        self.thread: Optional[threading.Thread] = None
+        self.condition = threading.Condition()
+
+    def start(self) -> None:
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(
+            target=self.run, name="SinopacRequestScheduler", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> int:
+        """停止並回傳尚未送出而捨棄的請求數"""
+        if not self.active:
+            return 0
+        with self.condition:
+            self.active = False
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        with self.condition:
+            dropped = sum(len(queue) for queue in self.queues.values())
+            for queue in self.queues.values():
+                queue.clear()
+        return dropped
+
+    def submit(self, bucket: str, priority: int, label: str, func: Callable, *args) -> None:
+        with self.condition:
+            queue = self.queues[bucket]
+            heapq.heappush(
+                queue, (priority, next(self.sequence), time.monotonic(), label, func, args)
+            )
+            self.high_water = max(self.high_water, sum(len(q) for q in self.queues.values()))
+            self.condition.notify()
+
+    def pending(self) -> int:
+        with self.condition:
+            return sum(len(queue) for queue in self.queues.values())
+
+    def next_request(self) -> Optional[Tuple[str, Callable, tuple]]:
+        """取出可送出的請求, 全部需等待時以 condition 等待到最近的 token"""
+        with self.condition:
+            while self.active:
+                now = time.monotonic()
+                timeout = None
+                for name, queue in self.queues.items():
+                    if not queue:
+                        continue
+                    wait = self.buckets[name].acquire(now)
+                    if wait == 0:
+                        _, _, enqueued, label, func, args = heapq.heappop(queue)
+                        self.record(label, now - enqueued)
+                        return label, func, args
+                    timeout = wait if timeout is None else min(timeout, wait)
+                self.condition.wait(timeout)
+        return None
+
+    def record(self, label: str, wait: float) -> None:
+        waits = self.waits.get(label, None)
+        if waits is None:
+            waits = self.waits[label] = deque(maxlen=self.max_samples)
+        waits.append(wait)
+        self.sent[label] = self.sent.get(label, 0) + 1
+
+    def run(self) -> None:
+        while True:
+            request = self.next_request()
+            if request is None:
+                return
+            label, func, args = request
+            try:
+                func(*args)
+            except Exception as exc:
+                if self.on_error:
+                    self.on_error(f"{label} 執行錯誤: {exc}")
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """各請求類別的送出筆數與排隊時間 (毫秒)"""
+        stats = {}
+        with self.condition:
+            samples = {label: np.array(waits) * 1000 for label, waits in self.waits.items()}
+            sent = dict(self.sent)
+        for label, waits in samples.items():
+            stats[label] = {
+                "sent": sent[label],
+                "wait_p50_ms": float(np.percentile(waits, 50)),
+                "wait_p99_ms": float(np.percentile(waits, 99)),
+                "wait_max_ms": float(waits.max()),
+            }
+        return stats
@@ -0,0 +1,174 @@
+# -*- coding: UTF-8 -*-
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from shioaji.order import Trade
+
+
+class PendingRelays:
+    """同一 seqno 尚待補齊的回報, 依到達順序保存"""
+
+    __slots__ = ("account", "relays", "parked_at", "attempts", "next_try")
+
+    def __init__(self, account: Any, parked_at: float, next_try: float) -> None:
+        self.account = account
+        self.relays: List[Tuple[Callable, Any, dict]] = []
+        self.parked_at: float = parked_at
+        self.attempts: int = 0
+        self.next_try: float = next_try
+
+
+class RelayResolver:
+    """
+    未知委託回報補齊
+
+    收到 self.trades 查無的委託/成交回報時, 不在回報執行緒同步查詢, 改依 seqno 暫存;
+    待下單回呼送達 (complete) 或背景執行緒以 fetch 查得 Trade 後, 依到達順序重新處理.
+    lock 需與回報 callback 共用, 以確保重新處理與後續回報不會交錯.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Any, str], Optional[Trade]],
+        on_resolved: Callable[[Trade], None],
+        lock: threading.RLock,
+        on_error: Optional[Callable[[str], None]] = None,
+        delay: float = 0.05,
+        retry_interval: float = 0.1,
+        timeout: float = 10.0,
+        max_samples: int = 10000,
+    ) -> None:
+        """
+        fetch(account, seqno) 回傳 Trade 或 None, on_resolved 登記查得的 Trade;
+        delay 為暫存後第一次查詢前等待下單回呼的秒數, 之後以 retry_interval 倍增重試,
+        超過 timeout 秒仍查無則捨棄.
+        """
+        self.fetch = fetch
+        self.on_resolved = on_resolved
+        self.lock = lock
+        self.on_error = on_error
+        self.delay: float = delay
+        self.retry_interval: float = retry_interval
+        self.timeout: float = timeout
+
+        self.pending: Dict[str, PendingRelays] = {}
+        self.latencies: Deque[float] = deque(maxlen=max_samples)  # 暫存到補齊的秒數
+        self.resolved: int = 0
+        self.fetched: int = 0  # 由背景查詢補齊的筆數
+        self.expired: int = 0
+
+        self.active: bool = False
+        self.thread: Optional[threading.Thread] = None
+        self.wakeup = threading.Event()
+
+    def start(self) -> None:
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(
+            target=self.run, name="SinopacRelayResolver", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        if not self.active:
+            return
+        self.active = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def park(self, seqno: str, account: Any, handler: Callable, relay: dict) -> None:
+        """由回報 callback 呼叫, 暫存後立即返回"""
+        with self.lock:
+            entry = self.pending.get(seqno, None)
+            if entry is None:
+                now = time.perf_counter()
+                entry = PendingRelays(account, now, now + self.delay)
+                self.pending[seqno] = entry
+                self.wakeup.set()
+            entry.relays.append((handler, account, relay))
+
+    def complete(self, trade: Trade) -> bool:
+        """登記 Trade 並依序處理暫存的回報, 有暫存回報時回傳 True"""
+        with self.lock:
+            self.on_resolved(trade)
+            entry = self.pending.pop(trade.order.seqno, None)
+            if entry is None:
+                return False
+            self.latencies.append(time.perf_counter() - entry.parked_at)
+            self.resolved += 1
+            for handler, account, relay in entry.relays:
+                try:
+                    handler(account, relay)
+                except Exception as exc:
+                    self.report(f"委託回報處理錯誤: {exc}")
+            return True
+
+    def report(self, msg: str) -> None:
+        if self.on_error:
+            self.on_error(msg)
+
+    def run(self) -> None:
+        timeout = self.retry_interval
+        while self.active:
+            self.wakeup.wait(timeout)
+            self.wakeup.clear()
+            timeout = self.resolve_due()
+
+    def resolve_due(self) -> float:
+        """查詢已到期的 seqno, 回傳距離下一個到期的秒數"""
+        now = time.perf_counter()
+        with self.lock:
+            due = [
+                (seqno, entry.account)
+                for seqno, entry in self.pending.items()
+                if entry.next_try <= now
+            ]
+        for seqno, account in due:
+            try:
+                trade = self.fetch(account, seqno)
+            except Exception as exc:
+                self.report(f"查詢委託 {seqno} 失敗: {exc}")
+                trade = None
+            if trade is not None and self.complete(trade):
+                self.fetched += 1
+                continue
+            with self.lock:
+                entry = self.pending.get(seqno, None)
+                if entry is None:  # 查詢期間已由下單回呼補齊
+                    continue
+                entry.attempts += 1
+                now = time.perf_counter()
+                if now - entry.parked_at >= self.timeout:
+                    del self.pending[seqno]
+                    self.expired += 1
+                    self.report(f"查無委託 {seqno}, 捨棄 {len(entry.relays)} 筆回報.")
+                else:
+                    entry.next_try = now + self.retry_interval * 2 ** min(entry.attempts - 1, 5)
+
+        with self.lock:
+            if not self.pending:
+                return self.retry_interval
+            next_try = min(entry.next_try for entry in self.pending.values())
+        return max(next_try - time.perf_counter(), 0.001)
+
+    def get_stats(self) -> Dict[str, float]:
+        """暫存中、已補齊、背景查詢補齊與捨棄筆數, 以及補齊延遲 (毫秒)"""
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            stats = {
+                "pending": len(self.pending),
+                "resolved": self.resolved,
+                "fetched": self.fetched,
+                "expired": self.expired,
+            }
+        if len(latencies):
+            stats["latency_p50_ms"] = float(np.percentile(latencies, 50))
+            stats["latency_p99_ms"] = float(np.percentile(latencies, 99))
+            stats["latency_max_ms"] = float(latencies.max())
+        return stats
@@ -0,0 +1,262 @@
+# -*- coding: UTF-8 -*-
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import polars as pl
+import shioaji.constant as sj_constant
+from shioaji.contracts import Future, Stock
+from vnpy.event import Event, EventEngine
+from vnpy.trader.event import EVENT_TICK
+
+from .quote_journal import JournalKind, read_journal
+from .sinopac_gateway import SinopacGateway
+
+
+class ReplayTickSTK:
+    __slots__ = (
+        "code",
+        "datetime",
+        "open",
+        "high",
+        "low",
+        "close",
+        "price_chg",
+        "volume",
+        "total_volume",
+        "total_amount",
+        "simtrade",
+    )
+
+
+class ReplayTickFOP(ReplayTickSTK):
+    __slots__ = ("underlying_price",)
+
+
+class ReplayBidAskSTK:
+    __slots__ = (
+        "code",
+        "datetime",
+        "bid_price",
+        "ask_price",
+        "bid_volume",
+        "ask_volume",
+        "simtrade",
+    )
+
+
+class ReplayBidAskFOP(ReplayBidAskSTK):
+    __slots__ = ("underlying_price",)
+
+
+TICK_FIELDS = [
+    "open",
+    "high",
+    "low",
+    "close",
+    "price_chg",
+    "volume",
+    "total_volume",
+    "total_amount",
+    "simtrade",
+]
+LEVEL_FIELDS = ["bid_price", "ask_price", "bid_volume", "ask_volume"]
+EVENT_REPLAY_IDLE = "eReplayIdle."
+
+
+class ReplayQuote:
+    """api.quote 的替身, 只記錄訂閱"""
+
+    def __init__(self) -> None:
+        self.subscribed: List[str] = []
+
+    def subscribe(self, contract, quote_type: str = "tick", version: str = "v1") -> None:
+        self.subscribed.append(contract.code)
+
+
+class ReplayApi:
+    """不需登入的 Shioaji 替身, 僅提供回放所需的 quote 與 snapshots"""
+
+    def __init__(self) -> None:
+        self.quote = ReplayQuote()
+
+    def snapshots(self, contracts: list) -> list:
+        return []
+
+    def logout(self) -> None:
+        pass
+
+
+class ReplayDriver:
+    """
+    行情回放
+
+    把 read_journal 讀回的行情依原始時間順序送進真正的
+    SinopacGateway.tick_v1_callback / bidask_v1_callback.
+    speed: 1 為實際速度, N 為 N 倍速, 0 為不等待全速回放.
+
+    延遲為送進 callback 到 EventEngine 的 EVENT_TICK handler 收到該商品 TickData 的時間,
+    以該商品最近一次送出的時間計算.
+    """
+
+    def __init__(
+        self,
+        data: pl.DataFrame,
+        gateway: Optional[SinopacGateway] = None,
+        speed: float = 0,
+    ) -> None:
+        self.data: pl.DataFrame = data.sort("datetime", maintain_order=True)
+        self.speed: float = speed
+        self.own_engine: bool = gateway is None
+        self.gateway: SinopacGateway = gateway or self.create_gateway(EventEngine())
+        self.prepare_contracts()
+
+        self.sent: Dict[str, int] = {}  # 商品最後送出時間 perf_counter_ns
+        self.latencies: List[int] = []
+
+    @classmethod
+    def from_journal(cls, root: Path, trading_day: date, **kwargs) -> "ReplayDriver":
+        return cls(read_journal(root, trading_day), **kwargs)
+
+    @staticmethod
+    def create_gateway(event_engine: EventEngine) -> SinopacGateway:
+        gateway = SinopacGateway(event_engine, "Sinopac")
+        gateway.api = ReplayApi()
+        return gateway
+
+    def prepare_contracts(self) -> None:
+        """為紀錄中出現、但 code2contract 沒有的商品建立替身合約"""
+        codes = self.data.select("code", "kind").unique("code", maintain_order=True)
+        for code, kind in codes.iter_rows():
+            if code in self.gateway.code2contract:
+                continue
+            if kind in (JournalKind.TICK_FOP, JournalKind.BIDASK_FOP):
+                contract = Future(code=code, symbol=code, name=code)
+            else:
+                contract = Stock(
+                    code=code, symbol=code, name=code, exchange=sj_constant.Exchange.TSE
+                )
+            self.gateway.code2contract[code] = contract
+
+    def build_events(self) -> List[tuple]:
+        """把 DataFrame 轉成 (datetime ns, 是否 tick, 行情物件) 清單"""
+        events = []
+        data = self.data
+        kinds = data["kind"].to_list()
+        codes = data["code"].to_list()
+        datetimes = data["datetime"].to_list()
+        timestamps = data["datetime"].cast(pl.Int64).to_list()
+        simtrades = data["simtrade"].to_list()
+        underlying = data["underlying_price"].to_list()
+        ticks = {name: data[name].to_list() for name in TICK_FIELDS}
+        levels = {
+            name: list(zip(*(data[f"{name}_{i}"].to_list() for i in range(1, 6))))
+            for name in LEVEL_FIELDS
+        }
+
+        for i, kind in enumerate(kinds):
+            is_tick = kind in (JournalKind.TICK_STK, JournalKind.TICK_FOP)
+            fop = kind in (JournalKind.TICK_FOP, JournalKind.BIDASK_FOP)
+            if is_tick:
+                quote = ReplayTickFOP() if fop else ReplayTickSTK()
+                for name in TICK_FIELDS:
+                    setattr(quote, name, ticks[name][i])
+            else:
+                quote = ReplayBidAskFOP() if fop else ReplayBidAskSTK()
+                for name in LEVEL_FIELDS:
+                    setattr(quote, name, list(levels[name][i]))
+                quote.simtrade = simtrades[i]
+            if fop:
+                quote.underlying_price = underlying[i]
+            quote.code = codes[i]
+            quote.datetime = datetimes[i]
+            events.append((timestamps[i], is_tick, quote))
+        return events
+
+    def process_tick_event(self, event: Event) -> None:
+        sent = self.sent.get(event.data.symbol, None)
+        if sent is not None:
+            self.latencies.append(time.perf_counter_ns() - sent)
+
+    def run(self) -> dict:
+        """執行回放, 回傳吞吐量與延遲統計"""
+        events = self.build_events()
+        gateway = self.gateway
+        event_engine = gateway.event_engine
+        event_engine.register(EVENT_TICK, self.process_tick_event)
+        if not getattr(event_engine, "_active", False):
+            event_engine.start()
+
+        tick_callback = gateway.tick_v1_callback
+        bidask_callback = gateway.bidask_v1_callback
+        sent = self.sent
+        speed = self.speed
+        first_ts = events[0][0] if events else 0
+        start = time.perf_counter_ns()
+        for ts, is_tick, quote in events:
+            if speed:
+                delay = (ts - first_ts) / speed - (time.perf_counter_ns() - start)
+                if delay > 0:
+                    time.sleep(delay / 1e9)
+            sent[quote.code] = time.perf_counter_ns()
+            if is_tick:
+                tick_callback(None, quote)
+            else:
+                bidask_callback(None, quote)
+        feed_elapsed = time.perf_counter_ns() - start
+
+        if not self.wait_idle():
+            gateway.write_log("行情回放: 等待事件處理完畢逾時")
+        elapsed = time.perf_counter_ns() - start
+        event_engine.unregister(EVENT_TICK, self.process_tick_event)
+        if self.own_engine:
+            event_engine.stop()
+        return self.report(len(events), feed_elapsed, elapsed)
+
+    def wait_idle(self, timeout: float = 30) -> bool:
+        """
+        等待派送佇列與事件引擎消化完畢, 回傳是否在 timeout 內完成
+
+        派送佇列與事件引擎都依序處理, 因此各放入一個哨兵, 哨兵執行時之前的行情與事件
+        handler 都已執行完. 合併中的行情在派送佇列消化後才強制送出, 之後才放入事件哨兵.
+        """
+        gateway = self.gateway
+        deadline = time.monotonic() + timeout
+        if gateway.dispatcher is not None:
+            done = threading.Event()
+            while not gateway.dispatcher.put(lambda _: done.set(), None):  # 丟棄最新策略且佇列已滿
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.001)
+            if not done.wait(max(deadline - time.monotonic(), 0)):
+                return False
+        if gateway.conflator:
+            gateway.conflator.flush(force=True)
+
+        event_engine = gateway.event_engine
+        done = threading.Event()
+
+        def process_idle_event(event: Event) -> None:
+            done.set()
+
+        event_engine.register(EVENT_REPLAY_IDLE, process_idle_event)
+        event_engine.put(Event(EVENT_REPLAY_IDLE))
+        idle = done.wait(max(deadline - time.monotonic(), 0))
+        event_engine.unregister(EVENT_REPLAY_IDLE, process_idle_event)
+        return idle
+
+    def report(self, count: int, feed_elapsed: int, elapsed: int) -> dict:
+        latencies = np.array(self.latencies or [0], dtype=np.float64) / 1000
+        return {
+            "events": count,
+            "published": len(self.latencies),
+            "elapsed": elapsed / 1e9,
+            "feed_rate": count / (feed_elapsed / 1e9) if feed_elapsed else 0.0,
+            "throughput": count / (elapsed / 1e9) if elapsed else 0.0,
+            "latency_p50_us": float(np.percentile(latencies, 50)),
+            "latency_p99_us": float(np.percentile(latencies, 99)),
+            "latency_max_us": float(latencies.max()),
+        }
@@ -0,0 +1,901 @@
+# -*- coding: UTF-8 -*-
+import bisect
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import shioaji.constant as sj_constant
+import xxhash
+from shioaji.account import AccountType, FutureAccount, StockAccount
+from shioaji.contracts import Contract, Future, Option, Stock
+from shioaji.data import Snapshot
+from shioaji.order import Deal, Order, OrderStatus, Trade
+from shioaji.position import AccountBalance, FetchStatus, FuturePosition, Margin, StockPosition
+
+TW_OFFSET_NS = 8 * 60 * 60 * 10**9  # Shioaji 時間戳為台北時間當作 UTC
+MARKET_PRICE_TYPES = {
+    sj_constant.FuturesPriceType.MKT,
+    sj_constant.FuturesPriceType.MKP,
+    sj_constant.StockPriceType.MKT,
+}
+
+
+class SimCategory(list):
+    """同一類別的商品, 對應 Shioaji MultiContract"""
+
+    def __init__(self, name: str, contracts: List[Contract]) -> None:
+        super().__init__(contracts)
+        self.name: str = name
+
+
+class SimProducts:
+    """Contracts.Futures / Options / Stocks 的替身, 可迭代類別或以類別名稱、代碼取值"""
+
+    def __init__(self, categories: List[SimCategory]) -> None:
+        self.categories: Dict[str, SimCategory] = {c.name: c for c in categories}
+        self._code2contract: Dict[str, Contract] = {
+            contract.code: contract for category in categories for contract in category
+        }
+
+    def __iter__(self) -> Iterator[SimCategory]:
+        return iter(self.categories.values())
+
+    def __getitem__(self, key: str):
+        category = self.categories.get(key, None)
+        return category if category is not None else self._code2contract.get(key, None)
+
+    def __getattr__(self, key: str):
+        categories = self.__dict__.get("categories", {})
+        if key in categories:
+            return categories[key]
+        raise AttributeError(key)
+
+    def get(self, key: str, default=None):
+        result = self[key]
+        return default if result is None else result
+
+
+class SimContracts:
+    def __init__(
+        self,
+        futures: List[SimCategory],
+        options: List[SimCategory],
+        stocks: List[SimCategory],
+    ) -> None:
+        self.Futures = SimProducts(futures)
+        self.Options = SimProducts(options)
+        self.Stocks = SimProducts(stocks)
+        self.Indexs = SimProducts([])
+
+    def get(self, code: str) -> Optional[Contract]:
+        for products in (self.Futures, self.Options, self.Stocks):
+            contract = products._code2contract.get(code, None)
+            if contract:
+                return contract
+        return None
+
+
+FUTURE_MONTH_CODES = "ABCDEFGHIJKL"
+PUT_MONTH_CODES = "MNOPQRSTUVWX"
+
+
+def default_catalog(
+    today: Optional[date] = None,
+    months: int = 3,
+    strikes: int = 10,
+    stocks: int = 5,
+) -> SimContracts:
+    """建立測試用商品檔: TXF/MXF 期貨、TXO 選擇權與上市股票"""
+    today = today or date.today()
+    update_date = today.strftime("%Y/%m/%d")
+
+    futures = []
+    option_contracts = []
+    for root, name, reference, multiplier in (
+        ("TXF", "臺股期貨", 22000.0, 200),
+        ("MXF", "小型臺指", 22000.0, 50),
+    ):
+        contracts = []
+        for i in range(months):
+            year = today.year + (today.month - 1 + i) // 12
+            month = (today.month - 1 + i) % 12 + 1
+            contracts.append(
+                Future(
+                    code=f"{root}{FUTURE_MONTH_CODES[month - 1]}{year % 10}",
+                    symbol=f"{root}{year}{month:02d}",
+                    name=name,
+                    category=root,
+                    delivery_month=f"{year}{month:02d}",
+                    delivery_date=f"{year}/{month:02d}/15",
+                    underlying_kind="I",
+                    unit=1,
+                    multiplier=multiplier,
+                    limit_up=round(reference * 1.1),
+                    limit_down=round(reference * 0.9),
+                    reference=reference,
+                    update_date=update_date,
+                )
+            )
+        futures.append(SimCategory(root, contracts))
+
+    year, month = today.year, today.month
+    for i in range(strikes):
+        strike = 21500 + i * 100
+        for right, codes in ((sj_constant.OptionRight.Call, FUTURE_MONTH_CODES), (sj_constant.OptionRight.Put, PUT_MONTH_CODES)):
+            option_contracts.append(
+                Option(
+                    code=f"TXO{strike}{codes[month - 1]}{year % 10}",
+                    symbol=f"TXO{year}{month:02d}{strike}{right.value}",
+                    name=f"臺指選擇權{month:02d}月 {strike}{right.value}",
+                    category="TXO",
+                    delivery_month=f"{year}{month:02d}",
+                    delivery_date=f"{year}/{month:02d}/15",
+                    strike_price=strike,
+                    option_right=right,
+                    underlying_kind="I",
+                    underlying_code=futures[0][0].code,
+                    unit=1,
+                    multiplier=50,
+                    limit_up=2000.0,
+                    limit_down=0.1,
+                    reference=100.0,
+                    update_date=update_date,
+                )
+            )
+    options = [SimCategory("TXO", option_contracts)]
+
+    stock_contracts = [
+        Stock(
+            code=f"{2330 + i}",
+            symbol=f"TSE{2330 + i}",
+            name=f"股票{2330 + i}",
+            category="24",
+            exchange=sj_constant.Exchange.TSE,
+            unit=1000,
+            limit_up=110.0,
+            limit_down=90.0,
+            reference=100.0,
+            update_date=update_date,
+            day_trade=sj_constant.DayTrade.Yes,
+        )
+        for i in range(stocks)
+    ]
+    return SimContracts(futures, options, [SimCategory("TSE", stock_contracts)])
+
+
+class SimOrder:
+    """撮合簿中的委託"""
+
+    __slots__ = ("trade", "code", "is_buy", "price", "leaves", "seq", "active")
+
+    def __init__(self, trade: Optional[Trade], code: str, is_buy: bool, price: float, quantity: int, seq: int) -> None:
+        self.trade: Optional[Trade] = trade  # None 為外部掛單 (add_liquidity)
+        self.code: str = code
+        self.is_buy: bool = is_buy
+        self.price: float = price
+        self.leaves: int = quantity
+        self.seq: int = seq
+        self.active: bool = True
+
+
+class BookSide:
+    """單邊委託簿, 價格優先、時間優先"""
+
+    def __init__(self, is_bid: bool) -> None:
+        self.is_bid: bool = is_bid
+        self.keys: List[float] = []  # 由優至劣排序 (買方存負價)
+        self.levels: Dict[float, Deque[SimOrder]] = {}
+
+    def key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    def add(self, order: SimOrder) -> None:
+        key = self.key(order.price)
+        level = self.levels.get(key, None)
+        if level is None:
+            level = deque()
+            self.levels[key] = level
+            bisect.insort(self.keys, key)
+        level.append(order)
+
+    def best(self) -> Optional[SimOrder]:
+        """最佳價位的第一筆有效委託, 順便清除已失效委託"""
+        while self.keys:
+            key = self.keys[0]
+            level = self.levels[key]
+            while level and not level[0].active:
+                level.popleft()
+            if level:
+                return level[0]
+            del self.levels[key]
+            self.keys.pop(0)
+        return None
+
+    def depth(self, levels: int = 5) -> List[Tuple[float, int]]:
+        result = []
+        for key in self.keys:
+            volume = sum(o.leaves for o in self.levels[key] if o.active)
+            if volume:
+                result.append((abs(key), volume))
+                if len(result) == levels:
+                    break
+        return result
+
+    def available(self, limit: Optional[float]) -> int:
+        """可成交數量, limit 為 None 時不限價"""
+        total = 0
+        for key in self.keys:
+            price = abs(key)
+            if limit is not None and (price > limit if not self.is_bid else price < limit):
+                break
+            total += sum(o.leaves for o in self.levels[key] if o.active)
+        return total
+
+
+class MatchingEngine:
+    """
+    確定性撮合引擎
+
+    依價格優先、時間優先撮合, 成交價為被動方掛單價.
+    ROD 限價單未成交部分掛入委託簿; IOC 與市價單剩餘取消; FOK 不能全部成交即取消.
+    """
+
+    def __init__(self) -> None:
+        self.books: Dict[str, Tuple[BookSide, BookSide]] = {}
+        self.seq: int = 0
+
+    def get_book(self, code: str) -> Tuple[BookSide, BookSide]:
+        book = self.books.get(code, None)
+        if book is None:
+            book = (BookSide(True), BookSide(False))
+            self.books[code] = book
+        return book
+
+    def submit(
+        self,
+        trade: Optional[Trade],
+        code: str,
+        is_buy: bool,
+        price: Optional[float],
+        quantity: int,
+        order_type: sj_constant.OrderType = sj_constant.OrderType.ROD,
+    ) -> Tuple[SimOrder, List[Tuple[SimOrder, float, int]]]:
+        """送出委託, price 為 None 代表市價; 回傳 (委託, [(被動方, 成交價, 成交量)])"""
+        self.seq += 1
+        order = SimOrder(trade, code, is_buy, price if price is not None else 0.0, quantity, self.seq)
+        bids, asks = self.get_book(code)
+        own, opposite = (bids, asks) if is_buy else (asks, bids)
+
+        if order_type == sj_constant.OrderType.FOK and opposite.available(price) < quantity:
+            order.active = False
+            return order, []
+
+        fills = []
+        while order.leaves:
+            maker = opposite.best()
+            if maker is None:
+                break
+            if price is not None and (maker.price > price if is_buy else maker.price < price):
+                break
+            qty = min(order.leaves, maker.leaves)
+            order.leaves -= qty
+            maker.leaves -= qty
+            if not maker.leaves:
+                maker.active = False
+            fills.append((maker, maker.price, qty))
+
+        if order.leaves and price is not None and order_type == sj_constant.OrderType.ROD:
+            own.add(order)
+        else:
+            order.active = False
+        return order, fills
+
+    def cancel(self, order: SimOrder) -> int:
+        """取消委託, 回傳取消數量"""
+        if not order.active:
+            return 0
+        order.active = False
+        return order.leaves
+
+    def depth(self, code: str, levels: int = 5) -> Tuple[List[Tuple[float, int]], List[Tuple[float, int]]]:
+        bids, asks = self.get_book(code)
+        return bids.depth(levels), asks.depth(levels)
+
+
+class SimQuote:
+    """api.quote 的替身"""
+
+    def __init__(self) -> None:
+        self.callbacks: Dict[str, Callable] = {}
+        self.subscribed: Dict[Tuple[str, str], Contract] = {}
+
+    def set_on_tick_fop_v1_callback(self, cb: Callable) -> None:
+        self.callbacks["tick_fop"] = cb
+
+    def set_on_tick_stk_v1_callback(self, cb: Callable) -> None:
+        self.callbacks["tick_stk"] = cb
+
+    def set_on_bidask_fop_v1_callback(self, cb: Callable) -> None:
+        self.callbacks["bidask_fop"] = cb
+
+    def set_on_bidask_stk_v1_callback(self, cb: Callable) -> None:
+        self.callbacks["bidask_stk"] = cb
+
+    def subscribe(self, contract: Contract, quote_type: str = "tick", version: str = "v1") -> None:
+        self.subscribed[(contract.code, str(quote_type))] = contract
+
+    def unsubscribe(self, contract: Contract, quote_type: str = "tick", version: str = "v1") -> None:
+        self.subscribed.pop((contract.code, str(quote_type)), None)
+
+
+class SimTick:
+    """TickFOPv1 / TickSTKv1 的替身"""
+
+    def __init__(self, **kwargs) -> None:
+        self.__dict__.update(kwargs)
+
+    def __getitem__(self, key: str):
+        return self.__dict__[key]
+
+
+class SimSolace:
+    """api._solace 的替身, 提供 get_trade_by_seqno 使用的介面"""
+
+    def __init__(self) -> None:
+        self._trades: Dict[str, Trade] = {}
+
+    def update_status(self, account=None, seqno: str = "", **kwargs) -> None:
+        pass
+
+
+class SimShioaji:
+    """
+    本機 Shioaji 替身
+
+    實作 SinopacGateway 使用到的 Shioaji 介面: 登入與商品檔 callback、帳號、
+    fetch_contracts、下單/刪單與委託成交回報、list_positions、account_balance、margin、list_trades、update_status、snapshots、kbars.
+    委託由 MatchingEngine 撮合, 不需網路即可測試下單流程與量測吞吐量.
+
+    asynchronous 為 True 時委託由背景執行緒處理, 並可用 latency (秒) 模擬往返延遲.
+    """
+
+    def __init__(
+        self,
+        simulation: bool = True,
+        contracts: Optional[SimContracts] = None,
+        asynchronous: bool = False,
+        latency: float = 0.0,
+        capital: float = 1_000_000.0,
+    ) -> None:
+        self.simulation: bool = simulation
+        self.Contracts: SimContracts = contracts or default_catalog()
+        self.asynchronous: bool = asynchronous
+        self.latency: float = latency
+        self.capital: float = capital  # 股票帳戶初始餘額與期貨帳戶初始權益
+
+        self.quote = SimQuote()
+        self._solace = SimSolace()
+        self.engine = MatchingEngine()
+        self.order_callback: Optional[Callable] = None
+
+        self.stock_account: Optional[StockAccount] = None
+        self.futopt_account: Optional[FutureAccount] = None
+        self.accounts: list = []
+
+        self.trades: Dict[str, Trade] = {}  # order id -> Trade
+        self.sim_orders: Dict[str, SimOrder] = {}
+        self.positions: Dict[Tuple[AccountType, str], List[float]] = {}  # [淨部位, 均價]
+        self.last_prices: Dict[str, float] = {}
+        self.volumes: Dict[str, int] = {}
+        self.order_count: int = 0
+        self.deal_count: int = 0
+        self.lock = threading.RLock()
+
+        self.tasks: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self.worker: Optional[threading.Thread] = None
+
+    # 登入與帳號
+    def login(
+        self,
+        api_key: str = "",
+        secret_key: str = "",
+        fetch_contract: bool = True,
+        contracts_cb: Optional[Callable] = None,
+        subscribe_trade: bool = True,
+        **kwargs,
+    ) -> list:
+        self.stock_account = StockAccount(
+            person_id="A123456789", broker_id="9A95", account_id="0000001", username="模擬帳號", signed=True
+        )
+        self.futopt_account = FutureAccount(
+            person_id="A123456789", broker_id="F002000", account_id="1000001", username="模擬帳號", signed=True
+        )
+        self.accounts = [self.stock_account, self.futopt_account]
+        if fetch_contract:
+            self.fetch_contracts(contracts_cb=contracts_cb)
+        if self.asynchronous:
+            self.worker = threading.Thread(target=self.run_worker, name="SimShioaji", daemon=True)
+            self.worker.start()
+        return self.accounts
+
+    def fetch_contracts(
+        self, contract_download: bool = False, contracts_timeout: int = 0, contracts_cb: Optional[Callable] = None
+    ) -> None:
+        """商品檔已在記憶體中, 依 Shioaji 的順序對每個類別呼叫 contracts_cb"""
+        if contracts_cb is None:
+            return
+        for security_type in (
+            sj_constant.SecurityType.Index,
+            sj_constant.SecurityType.Stock,
+            sj_constant.SecurityType.Future,
+            sj_constant.SecurityType.Option,
+        ):
+            contracts_cb(security_type)
+
+    def logout(self) -> bool:
+        if self.worker:
+            self.tasks.put(None)
+            self.worker.join()
+            self.worker = None
+        return True
+
+    def list_accounts(self) -> list:
+        return list(self.accounts)
+
+    def set_default_account(self, account) -> None:
+        if isinstance(account, StockAccount):
+            self.stock_account = account
+        elif isinstance(account, FutureAccount):
+            self.futopt_account = account
+
+    def activate_ca(self, ca_path: str = "", ca_passwd: str = "", person_id: str = "", **kwargs) -> bool:
+        return True
+
+    def set_order_callback(self, cb: Callable) -> None:
+        self.order_callback = cb
+
+    # 下單
+    Order = Order
+
+    def is_stock(self, contract: Contract) -> bool:
+        return contract.security_type == sj_constant.SecurityType.Stock
+
+    def place_order(self, contract: Contract, order: Order, timeout: int = 5000, cb: Optional[Callable] = None) -> Trade:
+        with self.lock:
+            self.order_count += 1
+            n = self.order_count
+        order.id = f"{n:08x}"
+        order.seqno = f"{n:06d}"
+        order.ordno = f"S{n:04X}"
+        order.account = self.stock_account if self.is_stock(contract) else self.futopt_account
+        status = OrderStatus(
+            id=order.id,
+            status=sj_constant.Status.PendingSubmit,
+            order_datetime=datetime.now(),
+            order_quantity=order.quantity,
+            deals=[],
+        )
+        trade = Trade(contract, order, status)
+        with self.lock:
+            self.trades[order.id] = trade
+            self._solace._trades[xxhash.xxh32_hexdigest(order.seqno.encode())] = trade
+
+        if self.asynchronous:
+            self.tasks.put((self.process_order, trade, cb))
+        else:
+            self.process_order(trade, cb)
+        return trade
+
+    def cancel_order(self, trade: Trade, timeout: int = 5000, cb: Optional[Callable] = None) -> Trade:
+        if self.asynchronous:
+            self.tasks.put((self.process_cancel, trade, cb))
+        else:
+            self.process_cancel(trade, cb)
+        return trade
+
+    def run_worker(self) -> None:
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            if self.latency:
+                time.sleep(self.latency)
+            func, trade, cb = task
+            func(trade, cb)
+
+    def process_order(self, trade: Trade, cb: Optional[Callable]) -> None:
+        order, contract, status = trade.order, trade.contract, trade.status
+        market = order.price_type in MARKET_PRICE_TYPES
+        reason = self.validate(trade, market)
+        if reason:
+            status.status = sj_constant.Status.Failed
+            status.msg = reason
+            if cb:
+                cb(trade)
+            self.relay_order(trade, "New", "88", reason)
+            return
+
+        with self.lock:
+            status.status = sj_constant.Status.Submitted
+            price = None if market else float(order.price)
+            sim_order, fills = self.engine.submit(
+                trade,
+                contract.code,
+                order.action == sj_constant.Action.Buy,
+                price,
+                order.quantity,
+                order.order_type,
+            )
+            self.sim_orders[order.id] = sim_order
+        if cb:
+            cb(trade)
+        self.relay_order(trade, "New", "00", "")
+
+        for maker, price, qty in fills:
+            if maker.trade is not None:
+                self.fill(maker.trade, price, qty)
+            self.fill(trade, price, qty)
+            self.publish_trade(contract, price, qty)
+
+        if not sim_order.active and sim_order.leaves:
+            # IOC/FOK/市價單剩餘數量取消
+            self.cancel_leaves(trade, sim_order.leaves)
+
+    def validate(self, trade: Trade, market: bool) -> str:
+        order, contract = trade.order, trade.contract
+        if order.account is None:
+            return "帳號不存在"
+        if not market and order.price <= 0:
+            return "價格錯誤"
+        if not market and contract.limit_up and not (
+            contract.limit_down <= order.price <= contract.limit_up
+        ):
+            return "價格超過漲跌停"
+        return ""
+
+    def process_cancel(self, trade: Trade, cb: Optional[Callable]) -> None:
+        with self.lock:
+            sim_order = self.sim_orders.get(trade.order.id, None)
+            leaves = self.engine.cancel(sim_order) if sim_order else 0
+        if leaves:
+            self.cancel_leaves(trade, leaves)
+        else:
+            self.relay_order(trade, "Cancel", "88", "委託已無法取消")
+        if cb:
+            cb(trade)
+
+    def cancel_leaves(self, trade: Trade, leaves: int) -> None:
+        status = trade.status
+        status.cancel_quantity += leaves
+        status.status = sj_constant.Status.Cancelled
+        self.relay_order(trade, "Cancel", "00", "", cancel_quantity=leaves)
+
+    def fill(self, trade: Trade, price: float, qty: int) -> None:
+        order, contract, status = trade.order, trade.contract, trade.status
+        with self.lock:
+            self.deal_count += 1
+            seq = f"d{self.deal_count:07d}"
+            ts = time.time()
+            status.deals.append(Deal(seq=seq, price=price, quantity=qty, ts=ts))
+            status.deal_quantity += qty
+            status.status = (
+                sj_constant.Status.Filled
+                if status.deal_quantity + status.cancel_quantity >= order.quantity
+                else sj_constant.Status.PartFilled
+            )
+            self.update_position(trade, price, qty)
+        self.relay_deal(trade, seq, price, qty, ts)
+
+    def update_position(self, trade: Trade, price: float, qty: int) -> None:
+        account_type = trade.order.account.account_type
+        key = (account_type, trade.contract.code)
+        signed = qty if trade.order.action == sj_constant.Action.Buy else -qty
+        net, avg = self.positions.get(key, [0, 0.0])
+        if net == 0 or (net > 0) == (signed > 0):
+            avg = (avg * abs(net) + price * qty) / (abs(net) + qty)
+        elif abs(signed) > abs(net):
+            avg = price
+        net += signed
+        self.positions[key] = [net, avg if net else 0.0]
+
+    # 回報
+    def relay_order(self, trade: Trade, op_type: str, op_code: str, op_msg: str, cancel_quantity: int = 0) -> None:
+        if not self.order_callback:
+            return
+        order, contract = trade.order, trade.contract
+        stock = self.is_stock(contract)
+        relay_order = {
+            "id": order.id,
+            "seqno": order.seqno,
+            "ordno": order.ordno,
+            "action": order.action.value,
+            "price": order.price,
+            "quantity": order.quantity,
+            "order_type": order.order_type.value,
+            "price_type": order.price_type.value,
+        }
+        if stock:
+            relay_order["order_cond"] = order.order_cond.value
+            relay_order["order_lot"] = order.order_lot.value
+            relay_order["daytrade_short"] = order.daytrade_short
+        else:
+            relay_order["oc_type"] = order.octype.value
+            relay_order["market_type"] = "Day"
+        relay = {
+            "operation": {"op_type": op_type, "op_code": op_code, "op_msg": op_msg},
+            "order": relay_order,
+            "status": {
+                "id": order.id,
+                "exchange_ts": time.time(),
+                "modified_price": 0,
+                "cancel_quantity": cancel_quantity,
+                "order_quantity": order.quantity,
+                "web_id": "Z",
+            },
+            "contract": {
+                "security_type": contract.security_type.value,
+                "exchange": contract.exchange.value,
+                "code": contract.code,
+            },
+        }
+        topic = sj_constant.OrderState.StockOrder if stock else sj_constant.OrderState.FuturesOrder
+        self.order_callback(topic, relay)
+
+    def relay_deal(self, trade: Trade, seq: str, price: float, qty: int, ts: float) -> None:
+        if not self.order_callback:
+            return
+        order, contract = trade.order, trade.contract
+        stock = self.is_stock(contract)
+        relay = {
+            "trade_id": order.id,
+            "seqno": order.seqno,
+            "ordno": order.ordno,
+            "exchange_seq": seq,
+            "broker_id": order.account.broker_id,
+            "account_id": order.account.account_id,
+            "action": order.action.value,
+            "code": contract.code,
+            "price": price,
+            "quantity": qty,
+            "ts": ts,
+        }
+        if stock:
+            relay["order_cond"] = order.order_cond.value
+            relay["order_lot"] = order.order_lot.value
+        else:
+            relay["security_type"] = contract.security_type.value
+            relay["delivery_month"] = contract.delivery_month
+            relay["strike_price"] = contract.strike_price
+            relay["option_right"] = contract.option_right.value or "Future"
+            relay["market_type"] = "Day"
+        topic = sj_constant.OrderState.StockDeal if stock else sj_constant.OrderState.FuturesDeal
+        self.order_callback(topic, relay)
+
+    # 查詢
+    def update_status(self, account=None, timeout: int = 5000, cb: Optional[Callable] = None, **kwargs) -> None:
+        if cb:
+            cb(self.list_trades())
+
+    def list_trades(self) -> List[Trade]:
+        with self.lock:
+            return list(self.trades.values())
+
+    def list_positions(self, account=None, unit=None, timeout: int = 5000, cb: Optional[Callable] = None):
+        account = account or self.stock_account
+        positions = []
+        with self.lock:
+            items = list(self.positions.items())
+        for i, ((account_type, code), (net, avg)) in enumerate(items):
+            if not net or account_type != account.account_type:
+                continue
+            contract = self.Contracts.get(code)
+            last_price = self.last_prices.get(code, contract.reference if contract else avg)
+            quantity = abs(net)
+            direction = sj_constant.Action.Buy if net > 0 else sj_constant.Action.Sell
+            sign = 1 if net > 0 else -1
+            if account_type == AccountType.Stock:
+                pnl = (last_price - avg) * quantity * 1000 * sign
+                positions.append(
+                    StockPosition(
+                        id=i, code=code, direction=direction, quantity=quantity, price=avg,
+                        last_price=last_price, pnl=pnl, yd_quantity=0,
+                        margin_purchase_amount=0, collateral=0, short_sale_margin=0, interest=0,
+                    )
+                )
+            else:
+                multiplier = contract.multiplier if contract and contract.multiplier else 200
+                pnl = (last_price - avg) * quantity * multiplier * sign
+                positions.append(
+                    FuturePosition(
+                        id=i, code=code, direction=direction, quantity=quantity, price=avg,
+                        last_price=last_price, pnl=pnl,
+                    )
+                )
+        if cb:
+            cb(positions)
+        return positions
+
+    def position_values(self, account_type: AccountType, multiplier: int) -> Tuple[float, float, float]:
+        """(成本, 市值, 未實現損益); 合約有 multiplier 時以合約為準"""
+        cost = value = pnl = 0.0
+        with self.lock:
+            items = list(self.positions.items())
+        for (kind, code), (net, avg) in items:
+            if not net or kind != account_type:
+                continue
+            contract = self.Contracts.get(code)
+            last_price = self.last_prices.get(code, contract.reference if contract else avg)
+            size = contract.multiplier if contract and contract.multiplier else multiplier
+            cost += abs(net) * avg * size
+            value += abs(net) * last_price * size
+            pnl += (last_price - avg) * net * size
+        return cost, value, pnl
+
+    def account_balance(self, timeout: int = 5000, cb: Optional[Callable] = None) -> AccountBalance:
+        """股票帳戶餘額: 初始餘額扣除持股成本"""
+        cost, _, _ = self.position_values(AccountType.Stock, 1000)
+        balance = AccountBalance(
+            status=FetchStatus.Fetched,
+            acc_balance=self.capital - cost,
+            date=datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"),
+            errmsg="",
+        )
+        if cb:
+            cb(balance)
+        return balance
+
+    def margin(self, account=None, timeout: int = 5000, cb: Optional[Callable] = None) -> Margin:
+        """期貨保證金: 原始保證金以市值一成計算"""
+        _, value, pnl = self.position_values(AccountType.Future, 200)
+        equity = self.capital + pnl
+        initial = round(value * 0.1)
+        margin = Margin(
+            status=FetchStatus.Fetched,
+            yesterday_balance=self.capital,
+            today_balance=self.capital,
+            deposit_withdrawal=0,
+            fee=0,
+            tax=0,
+            initial_margin=initial,
+            maintenance_margin=round(initial * 0.75),
+            margin_call=0,
+            risk_indicator=equity / initial * 100 if initial else 999.0,
+            royalty_revenue_expenditure=0,
+            equity=equity,
+            equity_amount=equity,
+            option_openbuy_market_value=0,
+            option_opensell_market_value=0,
+            option_open_position=0,
+            option_settle_profitloss=0,
+            future_open_position=pnl,
+            today_future_open_position=pnl,
+            future_settle_profitloss=0,
+            available_margin=equity - initial,
+            plus_margin=0,
+            plus_margin_indicator=0,
+            security_collateral_amount=0,
+            order_margin_premium=0,
+            collateral_amount=0,
+        )
+        if cb:
+            cb(margin)
+        return margin
+
+    def snapshots(self, contracts: List[Contract], timeout: int = 30000) -> List[Snapshot]:
+        result = []
+        for contract in contracts:
+            price = self.last_prices.get(contract.code, contract.reference)
+            (bids, asks) = self.engine.depth(contract.code, 1)
+            bid_price, bid_volume = bids[0] if bids else (0.0, 0)
+            ask_price, ask_volume = asks[0] if asks else (0.0, 0)
+            volume = self.volumes.get(contract.code, 0)
+            result.append(
+                Snapshot(
+                    ts=time.time_ns() + TW_OFFSET_NS,
+                    code=contract.code,
+                    exchange=contract.exchange.value,
+                    open=price, high=price, low=price, close=price,
+                    tick_type=sj_constant.TickType.No,
+                    change_price=price - contract.reference,
+                    change_rate=0.0,
+                    change_type=sj_constant.ChangeType.Unchanged,
+                    average_price=price,
+                    volume=0, total_volume=volume, amount=0, total_amount=0,
+                    yesterday_volume=0.0,
+                    buy_price=bid_price, buy_volume=bid_volume,
+                    sell_price=ask_price, sell_volume=ask_volume,
+                    volume_ratio=0.0,
+                )
+            )
+        return result
+
+    def kbars(self, contract: Contract, start: str = "", end: str = "", timeout: int = 30000) -> dict:
+        """
+        產生確定性的一分 K (08:46 ~ 13:45), ts 為台北時間當作 UTC 的奈秒
+        每日由參考價開始, 同一天的資料與查詢區間無關
+        """
+        start_day = datetime.strptime(start, "%Y-%m-%d") if start else datetime.now()
+        end_day = datetime.strptime(end, "%Y-%m-%d") if end else start_day
+        bars = {name: [] for name in ("ts", "Open", "High", "Low", "Close", "Volume", "Amount")}
+        day = start_day
+        while day <= end_day:
+            if day.weekday() < 5:
+                price = contract.reference or 100.0
+                seed = zlib.crc32(f"{contract.code}{day:%Y%m%d}".encode())
+                dt = day.replace(hour=8, minute=46)
+                for _ in range(300):
+                    seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+                    move = (seed % 5 - 2) * 0.5
+                    open_price, price = price, max(price + move, 0.5)
+                    bars["ts"].append(int((dt - datetime(1970, 1, 1)).total_seconds()) * 10**9)
+                    bars["Open"].append(open_price)
+                    bars["High"].append(max(open_price, price) + 0.5)
+                    bars["Low"].append(min(open_price, price) - 0.5)
+                    bars["Close"].append(price)
+                    bars["Volume"].append(seed % 100 + 1)
+                    bars["Amount"].append(price * (seed % 100 + 1))
+                    dt += timedelta(minutes=1)
+            day += timedelta(days=1)
+        return bars
+
+    # 行情
+    def add_liquidity(self, code: str, action: sj_constant.Action, price: float, quantity: int) -> None:
+        """加入外部掛單, 供撮合與報價使用"""
+        with self.lock:
+            self.engine.submit(None, code, action == sj_constant.Action.Buy, price, quantity)
+        self.publish_bidask(code)
+
+    def publish_trade(self, contract: Contract, price: float, qty: int) -> None:
+        code = contract.code
+        with self.lock:
+            self.last_prices[code] = price
+            self.volumes[code] = self.volumes.get(code, 0) + qty
+            total_volume = self.volumes[code]
+        stock = self.is_stock(contract)
+        cb = self.quote.callbacks.get("tick_stk" if stock else "tick_fop", None)
+        if cb and (code, "tick") in self.quote.subscribed:
+            tick = SimTick(
+                code=code,
+                datetime=datetime.now(),
+                open=price, high=price, low=price, close=price,
+                avg_price=price, amount=price * qty, total_amount=price * total_volume,
+                volume=qty, total_volume=total_volume,
+                tick_type=0, chg_type=3,
+                price_chg=price - contract.reference, pct_chg=0.0,
+                simtrade=0,
+            )
+            if not stock:
+                tick.underlying_price = 0.0
+            cb(sj_constant.Exchange.TSE if stock else sj_constant.Exchange.TAIFEX, tick)
+        self.publish_bidask(code)
+
+    def publish_bidask(self, code: str) -> None:
+        contract = self.Contracts.get(code)
+        if contract is None or (code, "bidask") not in self.quote.subscribed:
+            return
+        stock = self.is_stock(contract)
+        cb = self.quote.callbacks.get("bidask_stk" if stock else "bidask_fop", None)
+        if not cb:
+            return
+        with self.lock:
+            bids, asks = self.engine.depth(code)
+        bids += [(0.0, 0)] * (5 - len(bids))
+        asks += [(0.0, 0)] * (5 - len(asks))
+        tick = SimTick(
+            code=code,
+            datetime=datetime.now(),
+            bid_price=[p for p, _ in bids],
+            bid_volume=[v for _, v in bids],
+            ask_price=[p for p, _ in asks],
+            ask_volume=[v for _, v in asks],
+            diff_bid_vol=[0] * 5,
+            diff_ask_vol=[0] * 5,
+            simtrade=0,
+        )
+        if not stock:
+            tick.underlying_price = 0.0
+        cb(sj_constant.Exchange.TSE if stock else sj_constant.Exchange.TAIFEX, tick)
@@ -1,19 +1,20 @@
 # -*- coding: UTF-8 -*-
 # author: ypochien
+import threading
 import time
 from copy import copy
-from datetime import datetime
+from functools import partial
+from datetime import date, datetime
 from enum import Enum
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 
 import polars as pl
-import pytz
 import shioaji.constant as sj_constant
 from shioaji.contracts import Contract
 import xxhash
 from shioaji import Shioaji, contracts
 from shioaji.account import StockAccount, FutureAccount,AccountType
-from shioaji.position import FuturePosition,StockPosition
+from shioaji.position import FetchStatus, FuturePosition,StockPosition
 from shioaji.order import Status as SinopacStatus
 from shioaji.order import Trade, Deal
 from vnpy.trader.constant import (
@@ -24,8 +25,11 @@ from vnpy.trader.constant import (
     Offset,
     OrderType,
 )
+from vnpy.event import Event
+from vnpy.trader.event import EVENT_TIMER
 from vnpy.trader.gateway import BaseGateway
 from vnpy.trader.object import (
+    AccountData,
     ContractData,
     OrderRequest,
     CancelRequest,
@@ -39,9 +43,52 @@ from vnpy.trader.object import (
     OrderData,
     TradeData,
 )
-from vnpy.trader.utility import round_to
-
-TW_TZ = pytz.timezone("Asia/Taipei")
+from vnpy.trader.utility import get_folder_path, round_to
+
+from .bar_builder import FUTURES_SESSIONS, STOCK_SESSIONS, BarBuilder
+from .contract_cache import (
+    CONNECTION_KEYS,
+    CONTRACT_SIZES,
+    DEFAULT_PRICETICK,
+    ContractCache,
+    ContractCatalog,
+    build_contract_data,
+)
+from .contract_filter import ContractFilter, ContractMap
+from .contract_index import INDEX_FIELDS, ContractIndex
+from .kbar import normalize_kbars, to_bars
+from .kbar_cache import KbarCache
+from .order_archive import OrderArchive
+from .order_batch import BatchSubmitter, OrderBatch
+from .order_book import OrderBookStore
+from .order_ids import OrderIdMap
+from .order_latency import OrderLatency
+from .position_book import PositionBook
+from .position_marker import PositionMarker
+from .quote_journal import QuoteJournal
+from .quote_dispatcher import OverflowPolicy, QuoteDispatcher
+from .rate_limiter import (
+    PRIORITY_CANCEL,
+    PRIORITY_ORDER,
+    PRIORITY_QUERY,
+    RequestScheduler,
+    TokenBucket,
+)
+from .relay_resolver import RelayResolver
+from .tick_conflator import TickConflator
+from .tick_pool import TickPool
+from .utility import TW_TZ, get_trading_day
+
+EVENT_BAR = "eBar."
+STOCK_LOT_SHARES = 1000  # 股票一張的股數
+
+# 商品類別 -> (api.Contracts 屬性, 轉換 ContractData 的方法)
+CONTRACT_PRODUCTS = {
+    sj_constant.SecurityType.Future: ("Futures", "convert_future"),
+    sj_constant.SecurityType.Option: ("Options", "convert_option"),
+    sj_constant.SecurityType.Stock: ("Stocks", "convert_stock"),
+}
+CONTRACT_TYPES = set(CONTRACT_PRODUCTS)
 
 EXCHANGE_VT2SINOPAC = {Exchange.LOCAL: "LOCAL"}
 EXCHANGE_SINOPAC2VT = {v: k for k, v in EXCHANGE_VT2SINOPAC.items()}
@@ -124,6 +171,51 @@ class RelayOpcode(str, Enum):
     Failure = "88"
 
 
+class QuoteMeta:
+    """行情 callback 使用的商品資訊, 於 query_contract 時建立"""
+
+    __slots__ = ("name", "simtrade_name", "limit_up", "limit_down", "pricetick", "multiplier")
+
+    def __init__(
+        self,
+        name: str,
+        limit_up: float,
+        limit_down: float,
+        pricetick: float,
+        multiplier: float = 1,
+    ) -> None:
+        self.name: str = name
+        self.simtrade_name: str = f"{name}(試搓)"
+        self.limit_up: float = limit_up
+        self.limit_down: float = limit_down
+        self.pricetick: float = pricetick
+        self.multiplier: float = multiplier  # 每單位部位的損益乘數
+
+    @classmethod
+    def from_contract(
+        cls, contract: Contract, pricetick: float = DEFAULT_PRICETICK, size: float = 0
+    ) -> "QuoteMeta":
+        """
+        股票部位以張計, 乘數為每張股數; 期貨/選擇權以合約的 multiplier 為準 (小台 50、台指 200),
+        multiplier 為 0 時才用 size (ContractData.size)
+        """
+        if contract.security_type == sj_constant.SecurityType.Stock:
+            multiplier = STOCK_LOT_SHARES
+        elif contract.multiplier:
+            multiplier = contract.multiplier
+        else:
+            multiplier = size or CONTRACT_SIZES.get(
+                contract.security_type, CONTRACT_SIZES[sj_constant.SecurityType.Future]
+            )
+        return cls(
+            f"{contract.name}{contract.delivery_month}",
+            contract.limit_up,
+            contract.limit_down,
+            pricetick,
+            multiplier,
+        )
+
+
 class SinopacGateway(BaseGateway):
     """
     Sinopac Securities - Shioaji for VeighNa Gateway
@@ -131,13 +223,46 @@ class SinopacGateway(BaseGateway):
 
     default_name: str = "Sinopac"
     default_setting: Dict[str, str] = {
-        "連接": ["模擬環境","正式環境"],
+        "連接": ["模擬環境","正式環境","本機模擬"],
         "API_KEY": "",
         "SECRET_KEY": "",
         "憑證檔案路徑": "",
         "憑證密碼": "",
         "預設現貨帳號": "0",
         "預設期貨帳號": "0",
+        "行情合併": ["關閉", "開啟"],
+        "行情合併間隔(毫秒)": "100",
+        "行情派送佇列": ["關閉", "開啟"],
+        "行情佇列大小": "65536",
+        "佇列滿載策略": [policy.value for policy in OverflowPolicy],
+        "Tick推送模式": ["複製", "循環池"],
+        "循環池大小": "32",
+        "五檔陣列": ["關閉", "開啟"],
+        "行情紀錄": ["關閉", "開啟"],
+        "行情紀錄路徑": "",
+        "行情紀錄檔筆數": "100000",
+        "行情紀錄佇列上限": "200000",
+        "K線合成": ["關閉", "開啟"],
+        "商品檔快取": ["關閉", "開啟"],
+        "商品檔快取路徑": "",
+        "K線快取": ["關閉", "開啟"],
+        "K線快取路徑": "",
+        "發布商品類型": "",
+        "發布商品分類": "",
+        "發布標的": "",
+        "發布到期月數": "",
+        "流量控制": ["關閉", "開啟"],
+        "下單流量(次/10秒)": "250",
+        "查詢流量(次/5秒)": "25",
+        "批次下單執行緒": "8",
+        "委託延遲統計(秒)": "60",
+        "委託歸檔": ["關閉", "開啟"],
+        "委託歸檔延遲(秒)": "60",
+        "歸檔保留筆數": "200000",
+        "部位核對間隔(秒)": "300",
+        "即時損益": ["關閉", "開啟"],
+        "損益推送間隔(毫秒)": "500",
+        "帳務查詢間隔(秒)": "0",
     }
 
     exchanges = list(EXCHANGE_SINOPAC2VT.values())
@@ -147,100 +272,293 @@ class SinopacGateway(BaseGateway):
         super().__init__(event_engine, gateway_name)
         self.api: Optional[Shioaji] = None
 
-        self.code2contract: Dict[str, Contract] = {}  # str map sj contract
+        self.code2contract: Dict[str, Contract] = ContractMap(self.resolve_contract)  # str map sj contract
+        self.code2meta: Dict[str, QuoteMeta] = {}  # for tick callback
         self.subscribed = set()  # for subscribe set
         self.ticks: Dict[str, TickData] = {}  # for snapshot
         self.orders: Dict[str, OrderData] = {}  # for vnpy
-        self.trades: Dict[str, Trade] = {}  # for sj
+        self.trades: Dict[str, Trade] = {}  # for sj, key 為 Shioaji order.id
+        self.order_ids = OrderIdMap(datetime.now().strftime("%m%d%H%M%S"))  # 本地編號 <-> order.id
+        self.pending_cancels: Dict[str, CancelRequest] = {}  # 下單回呼前收到的刪單
         self.positions: Dict[str, PositionData] = {}  # for on_position
         self.position_update_time = datetime.now()  # 最後更新損益時間
+        self.relay_lock = threading.RLock()  # 委託回報與暫存回報補齊共用
+        self.resolver = RelayResolver(
+            self.get_trade_by_seqno,
+            self.register_trade,
+            self.relay_lock,
+            on_error=self.write_log,
+        )  # 未知委託回報依 seqno 暫存補齊
+
+        self.tick_lock = threading.Lock()  # 保護 self.ticks 內的 TickData
+        self.snapshot_tick: Callable[[TickData], TickData] = copy  # 推送用 TickData
+        self.tick_pool: Optional[TickPool] = None  # TickData 循環池
+        self.conflator: Optional[TickConflator] = None  # 行情合併
+        self.dispatcher: Optional[QuoteDispatcher] = None  # 行情派送佇列
+        self.order_book: Optional[OrderBookStore] = None  # 五檔陣列
+        self.journal: Optional[QuoteJournal] = None  # 行情紀錄
+        self.bar_builder: Optional[BarBuilder] = None  # 一分 K 合成
+        self.contract_cache: Optional[ContractCache] = None  # 商品檔快取
+        self.kbar_cache: Optional[KbarCache] = None  # 一分 K 快取
+        self.contract_types: set = set()  # 已下載完成的商品類別
+        self.contract_start: float = 0.0  # 開始登入的時間 perf_counter
+        self.contract_filter: Optional[ContractFilter] = None  # 商品發布篩選
+        self.contract_catalog: Optional[ContractCatalog] = None  # 熱啟動的快取商品檔, 合約延遲建立
+        self.filtered_count: int = 0  # 未發布的商品數
+        self.contract_index = ContractIndex(self.code2contract)  # 商品次要索引
+        self.scheduler: Optional[RequestScheduler] = None  # 下單/查詢流量控制
+        self.batch_submitter: Optional[BatchSubmitter] = None  # 批次下單執行緒池
+        self.batch: Optional[OrderBatch] = None  # 最近一次批次下單/刪單
+        self.latency = OrderLatency()  # 委託端到端延遲
+        self.latency_interval: int = 0  # 委託延遲統計記錄間隔 (秒), 0 為不記錄
+        self.latency_count: int = 0
+        self.order_archive: Optional[OrderArchive] = None  # 已結束委託歸檔
+        self.archive_delay: float = 60.0  # 委託結束後保留在 orders/trades 的秒數
+        self.archive_count: int = 0
+        self.terminal_since: Dict[str, float] = {}  # 委託結束的時間 monotonic
+        self.position_book = PositionBook(self.positions, gateway_name)  # 成交增量部位
+        self.position_query_time: float = 0.0  # 最後送出部位查詢的時間 perf_counter
+        self.reconcile_interval: int = 0  # 部位核對間隔 (秒), 0 為不核對
+        self.reconcile_count: int = 0
+        self.marker: Optional[PositionMarker] = None  # Tick 驅動的部位損益
+        self.position_fingerprints: Dict[tuple, tuple] = {}  # (帳號類別, 商品, 方向) -> 最後推送的部位
+        self.position_stats: Dict[str, int] = {"refreshes": 0, "emitted": 0, "suppressed": 0}
+        self.accounts: Dict[str, AccountData] = {}  # 最後一次查詢的帳務, key 為 accountid
+        self.account_inflight: Dict[str, float] = {}  # 查詢名稱 -> 送出時間 monotonic
+        self.account_interval: int = 0  # 帳務查詢間隔 (秒), 0 為不定時查詢
+        self.account_count: int = 0
+
+    def is_event_idle(self) -> bool:
+        """事件引擎佇列是否為空"""
+        queue = getattr(self.event_engine, "_queue", None)
+        return queue is None or queue.empty()
+
+    def publish_tick(self, one_tick: TickData) -> None:
+        """推送 TickData, 呼叫端需持有 tick_lock"""
+        if self.conflator:
+            self.conflator.push(one_tick)
+        else:
+            self.on_tick(self.snapshot_tick(one_tick))
 
     def tick_v1_callback(self, _, tick) -> None:
-        one_tick = self.ticks.get(tick.code, None)
-        contract = self.code2contract.get(tick.code, None)
-        if one_tick is None:
-            one_tick = TickData(
-                symbol=tick.code,
-                exchange=Exchange.LOCAL,
-                name=f"{contract['name']}{contract['delivery_month']}",
-                datetime=tick.datetime,
-                gateway_name=self.gateway_name,
-            )
-            self.ticks[tick.code] = one_tick
-        if tick.simtrade == 1:
-            one_tick.name = f"{contract['name']}{contract['delivery_month']}(試搓)"
+        if self.journal:
+            self.journal.record_tick(tick)
+        if self.dispatcher:
+            self.dispatcher.put(self.process_tick_v1, tick)
         else:
-            one_tick.name = f"{contract['name']}{contract['delivery_month']}"
+            self.process_tick_v1(tick)
+
+    def process_tick_v1(self, tick) -> None:
+        with self.tick_lock:
+            self.update_tick_v1(tick)
+            if self.bar_builder is not None:
+                self.bar_builder.update_tick(tick)
+            if self.marker is not None:
+                self.marker.update(tick.code, float(tick.close))
+
+    def on_bar(self, bar: BarData) -> None:
+        """
+        Bar event push.
+        Bar event of a specific vt_symbol is also pushed.
+        """
+        self.on_event(EVENT_BAR, bar)
+        self.on_event(EVENT_BAR + bar.vt_symbol, bar)
+
+    def process_timer_event(self, event: Event) -> None:
+        with self.tick_lock:
+            self.bar_builder.flush()
+
+    def process_pnl_timer(self, event: Event) -> None:
+        with self.tick_lock:
+            self.marker.flush()
+
+    def get_multiplier(self, symbol: str) -> float:
+        try:
+            return self.get_quote_meta(symbol).multiplier
+        except KeyError:
+            return 1
 
+    def process_latency_timer(self, event: Event) -> None:
+        self.latency_count += 1
+        if self.latency_count < self.latency_interval:
+            return
+        self.latency_count = 0
+        for line in self.latency.format_stats():
+            self.write_log(line)
+
+    def process_archive_timer(self, event: Event) -> None:
+        self.archive_count += 1
+        if self.archive_count >= 10:
+            self.archive_count = 0
+            self.archive_orders()
+
+    def archive_orders(self, now: Optional[float] = None) -> int:
+        """把結束超過 archive_delay 秒的委託由 orders/trades 移入歸檔, 回傳移出筆數"""
+        if self.order_archive is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        with self.relay_lock:
+            for orderid, order in list(self.orders.items()):
+                if order.is_active():
+                    self.terminal_since.pop(orderid, None)
+                    continue
+                since = self.terminal_since.setdefault(orderid, now)
+                if now - since < self.archive_delay:
+                    continue
+                del self.orders[orderid]
+                del self.terminal_since[orderid]
+                sj_id = self.order_ids.get_sj(orderid)
+                sj_trade = self.trades.pop(sj_id, None)
+                seqno = sj_trade.order.seqno if sj_trade is not None else ""
+                self.order_ids.forget(orderid, seqno)
+                self.latency.discard(orderid)
+                self.pending_cancels.pop(orderid, None)
+                self.order_archive.add(order, sj_id, seqno)
+                evicted += 1
+        return evicted
+
+    def get_order(self, orderid: str) -> Optional[OrderData]:
+        """依本地編號查詢委託, 包含已歸檔的委託"""
+        order = self.orders.get(orderid, None)
+        if order is None and self.order_archive is not None:
+            order = self.order_archive.get(orderid)
+        return order
+
+    def process_reconcile_timer(self, event: Event) -> None:
+        self.reconcile_count += 1
+        if self.reconcile_count >= self.reconcile_interval:
+            self.reconcile_count = 0
+            try:
+                self.query_position()
+            except Exception as exc:  # 例外不可傳出事件引擎執行緒
+                self.write_log(f"部位核對查詢失敗: {exc}")
+
+    def process_account_timer(self, event: Event) -> None:
+        self.account_count += 1
+        if self.account_count >= self.account_interval:
+            self.account_count = 0
+            try:
+                self.query_account()
+            except Exception as exc:  # 例外不可傳出事件引擎執行緒
+                self.account_inflight.clear()
+                self.write_log(f"帳務查詢失敗: {exc}")
+
+    def get_order_latency(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """各帳號類別 (股票/期貨) 各階段最近的委託延遲 p50/p99/max (毫秒)"""
+        return self.latency.get_stats()
+
+    def get_quote_meta(self, code: str) -> "QuoteMeta":
+        meta = self.code2meta.get(code, None)
+        if meta is None:
+            contract = self.code2contract[code]  # 延遲建立的商品同時建立 meta
+            meta = self.code2meta.get(code, None) or QuoteMeta.from_contract(contract)
+            self.code2meta[code] = meta
+        return meta
+
+    def new_tick(self, code: str, dt: datetime, meta: "QuoteMeta") -> TickData:
+        one_tick = TickData(
+            symbol=code,
+            exchange=Exchange.LOCAL,
+            name=meta.name,
+            datetime=dt,
+            limit_up=meta.limit_up,
+            limit_down=meta.limit_down,
+            gateway_name=self.gateway_name,
+        )
+        self.ticks[code] = one_tick
+        return one_tick
+
+    def update_tick_v1(self, tick) -> None:
+        code = tick.code
+        meta = self.code2meta.get(code, None)  # query_contract 已建立, 只有未發布的商品走 get_quote_meta
+        if meta is None:
+            meta = self.get_quote_meta(code)
+        one_tick = self.ticks.get(code, None)
+        if one_tick is None:
+            one_tick = self.new_tick(code, tick.datetime, meta)
+        one_tick.name = meta.simtrade_name if tick.simtrade == 1 else meta.name
+
+        last_price = float(tick.close)
         one_tick.datetime = tick.datetime
         one_tick.volume = tick.volume
-        one_tick.last_price = float(tick.close)
-        one_tick.limit_up = contract.limit_up
-        one_tick.open_interest = 0
-        one_tick.limit_down = contract.limit_down
+        one_tick.last_price = last_price
         one_tick.open_price = float(tick.open)
         one_tick.high_price = float(tick.high)
         one_tick.low_price = float(tick.low)
         one_tick.pre_close = float(tick.close - tick.price_chg)
         one_tick.localtime = datetime.now()
-        self.on_tick(copy(one_tick))
+        self.publish_tick(one_tick)
 
     def bidask_v1_callback(self, _, tick):
-        one_tick = self.ticks.get(tick.code, None)
-        contract = self.code2contract[tick.code]
+        if self.journal:
+            self.journal.record_bidask(tick)
+        if self.dispatcher:
+            self.dispatcher.put(self.process_bidask_v1, tick)
+        else:
+            self.process_bidask_v1(tick)
+
+    def process_bidask_v1(self, tick):
+        with self.tick_lock:
+            self.update_bidask_v1(tick)
+
+    def update_bidask_v1(self, tick):
+        code = tick.code
+        one_tick = self.ticks.get(code, None)
         if one_tick is None:
-            one_tick = TickData(
-                symbol=tick.code,
-                exchange=Exchange.LOCAL,
-                name=f"{contract['name']}{contract['delivery_month']}",
-                datetime=tick.datetime,
-                gateway_name=self.gateway_name,
+            one_tick = self.new_tick(code, tick.datetime, self.get_quote_meta(code))
+        bid_price, ask_price = tick.bid_price, tick.ask_price
+        bid_volume, ask_volume = tick.bid_volume, tick.ask_volume
+        one_tick.bid_price_1 = bid_price[0]
+        one_tick.bid_price_2 = bid_price[1]
+        one_tick.bid_price_3 = bid_price[2]
+        one_tick.bid_price_4 = bid_price[3]
+        one_tick.bid_price_5 = bid_price[4]
+        one_tick.ask_price_1 = ask_price[0]
+        one_tick.ask_price_2 = ask_price[1]
+        one_tick.ask_price_3 = ask_price[2]
+        one_tick.ask_price_4 = ask_price[3]
+        one_tick.ask_price_5 = ask_price[4]
+        one_tick.bid_volume_1 = bid_volume[0]
+        one_tick.bid_volume_2 = bid_volume[1]
+        one_tick.bid_volume_3 = bid_volume[2]
+        one_tick.bid_volume_4 = bid_volume[3]
+        one_tick.bid_volume_5 = bid_volume[4]
+        one_tick.ask_volume_1 = ask_volume[0]
+        one_tick.ask_volume_2 = ask_volume[1]
+        one_tick.ask_volume_3 = ask_volume[2]
+        one_tick.ask_volume_4 = ask_volume[3]
+        one_tick.ask_volume_5 = ask_volume[4]
+        if self.order_book is not None:
+            self.order_book.update(
+                code, tick.datetime, bid_price, bid_volume, ask_price, ask_volume
             )
-            self.ticks[tick.code] = one_tick
-        one_tick.bid_price_1 = tick["bid_price"][0]
-        one_tick.bid_price_2 = tick["bid_price"][1]
-        one_tick.bid_price_3 = tick["bid_price"][2]
-        one_tick.bid_price_4 = tick["bid_price"][3]
-        one_tick.bid_price_5 = tick["bid_price"][4]
-        one_tick.ask_price_1 = tick["ask_price"][0]
-        one_tick.ask_price_2 = tick["ask_price"][1]
-        one_tick.ask_price_3 = tick["ask_price"][2]
-        one_tick.ask_price_4 = tick["ask_price"][3]
-        one_tick.ask_price_5 = tick["ask_price"][4]
-        one_tick.bid_volume_1 = tick["bid_volume"][0]
-        one_tick.bid_volume_2 = tick["bid_volume"][1]
-        one_tick.bid_volume_3 = tick["bid_volume"][2]
-        one_tick.bid_volume_4 = tick["bid_volume"][3]
-        one_tick.bid_volume_5 = tick["bid_volume"][4]
-        one_tick.ask_volume_1 = tick["ask_volume"][0]
-        one_tick.ask_volume_2 = tick["ask_volume"][1]
-        one_tick.ask_volume_3 = tick["ask_volume"][2]
-        one_tick.ask_volume_4 = tick["ask_volume"][3]
-        one_tick.ask_volume_5 = tick["ask_volume"][4]
-        self.on_tick(copy(one_tick))
+        self.publish_tick(one_tick)
 
     def relay_callback(self, topic, relay_data):
         # self.write_log(
         #     f"relay_cb {topic} -{relay_data['order']['id']} {relay_data['operation']}"
         # )
-        if topic == sj_constant.OrderState.FuturesOrder:
-            self.impl_order(self.api.futopt_account,relay_data)
-        elif topic == sj_constant.OrderState.StockOrder:
-            self.impl_order(self.api.stock_account,relay_data)
-        elif topic == sj_constant.OrderState.FuturesDeal:
-            self.impl_deal(self.api.futopt_account, relay_data)
-        elif topic == sj_constant.OrderState.StockDeal:
-            self.impl_deal(self.api.stock_account, relay_data)
+        with self.relay_lock:
+            if topic == sj_constant.OrderState.FuturesOrder:
+                self.impl_order(self.api.futopt_account,relay_data)
+            elif topic == sj_constant.OrderState.StockOrder:
+                self.impl_order(self.api.stock_account,relay_data)
+            elif topic == sj_constant.OrderState.FuturesDeal:
+                self.impl_deal(self.api.futopt_account, relay_data)
+            elif topic == sj_constant.OrderState.StockDeal:
+                self.impl_deal(self.api.stock_account, relay_data)
 
     def impl_order(self, account, relay_data):
-        orderid = relay_data["order"]["id"]
+        sj_id = relay_data["order"]["id"]
+        orderid = self.order_ids.get_local(sj_id, relay_data["order"]["seqno"])
         order_data: OrderData = self.orders.get(orderid, None)
-        sj_trade: Trade = self.trades.get(orderid, None)
+        sj_trade: Trade = self.trades.get(sj_id, None)
 
         if sj_trade is None:
-            seq_no = relay_data["order"]["seqno"]
-            sj_trade = self.get_trade_by_seqno(account, seq_no)
-            self.trades[orderid] = sj_trade
+            # 尚未取得 Trade, 暫存待下單回呼或背景查詢補齊後重新處理
+            self.resolver.park(relay_data["order"]["seqno"], account, self.impl_order, relay_data)
+            return
         if order_data is None:
             order_data = OrderData(
                 symbol=sj_trade["contract"]["code"],
@@ -257,7 +575,12 @@ class SinopacGateway(BaseGateway):
             )
             order_data.offset = (
                 OFFSET_STK_SINOPAC2VT[
-                    (relay_data["order"]["order_cond"], sj_constant.StockFirstSell.No)
+                    (
+                        relay_data["order"]["order_cond"],
+                        sj_constant.DayTrade.Yes
+                        if relay_data["order"].get("daytrade_short", False)
+                        else sj_constant.DayTrade.No,
+                    )
                 ]
                 if account.account_type == AccountType.Stock
                 else OFFSET_FUT_SINOPAC2VT[relay_data["order"]["oc_type"]]
@@ -273,6 +596,7 @@ class SinopacGateway(BaseGateway):
         if op.get("op_code") == "00":
             if op.get("op_type") == RelayOPType.New:
                 order_data.status = Status.NOTTRADED
+                self.latency.mark(orderid, "ack", relay_data["status"].get("exchange_ts", 0))
             elif op.get("op_type") == RelayOPType.Cancel:
                 order_data.status = Status.CANCELLED
             elif op.get("op_type") == RelayOPType.UpdateQty:
@@ -285,27 +609,27 @@ class SinopacGateway(BaseGateway):
             order_data.reference = op.get("op_msg", "")
             if op.get("op_type") == RelayOPType.New:
                 order_data.status = Status.REJECTED
+        if not order_data.is_active():
+            self.latency.discard(orderid)
         self.orders[orderid] = order_data
         self.on_order(order_data)
 
-    def get_trade_by_seqno(self, account, seq_no):
-        try:
-            self.api._solace.update_status(account=account, seqno=seq_no)
-            sj_trade = self.api._solace._trades[xxhash.xxh32_hexdigest(seq_no)]
-        except:
-            time.sleep(0.1)
-            self.api._solace.update_status(account=account, seqno=seq_no)
-            sj_trade = self.api._solace._trades[xxhash.xxh32_hexdigest(seq_no)]
-        return sj_trade
+    def get_trade_by_seqno(self, account, seq_no) -> Optional[Trade]:
+        """由 RelayResolver 背景執行緒呼叫, 查無時回傳 None 由其重試"""
+        self.api._solace.update_status(account=account, seqno=seq_no)
+        return self.api._solace._trades.get(xxhash.xxh32_hexdigest(seq_no.encode()), None)
+
+    def register_trade(self, trade: Trade) -> None:
+        if self.trades.get(trade.order.id, None) is None:
+            self.trades[trade.order.id] = trade
 
     def impl_deal(self, account, relay_data):
         """trade_id='11d6f902' seqno='123696' ordno='qn08zA1F' exchange_seq='f4005559' broker_id='F002000' account_id='1627187' action=<Action.Buy: 'Buy'> code='MXF' price=17800.0 quantity=4 subaccount='' security_type=<SecurityType.Future: 'FUT'> delivery_month='202203' strike_price=0.0 option_right=<CallPut.Future: 'Future'> market_type='Day' combo=False ts=1646194001"""
-        orderid = relay_data["trade_id"]
-        sj_trade: Trade = self.trades.get(orderid, None)
+        sj_trade: Trade = self.trades.get(relay_data["trade_id"], None)
+        orderid = self.order_ids.get_local(relay_data["trade_id"], relay_data["seqno"])
         if sj_trade is None:
-            seq_no = relay_data["order"]["seqno"]
-            sj_trade = self.get_trade_by_seqno(account, seq_no)
-            self.trades[orderid] = sj_trade
+            self.resolver.park(relay_data["seqno"], account, self.impl_deal, relay_data)
+            return
 
         trade: TradeData = TradeData(
             symbol=sj_trade.contract.code,
@@ -319,6 +643,7 @@ class SinopacGateway(BaseGateway):
             datetime=datetime.fromtimestamp(relay_data["ts"]),
             gateway_name=self.gateway_name,
         )
+        self.latency.mark(orderid, "fill", relay_data["ts"])
         self.on_trade(trade)
 
         vn_order: OrderData = self.orders.get(orderid, None)
@@ -331,86 +656,376 @@ class SinopacGateway(BaseGateway):
         else:
             self.write_log(f"[{orderid}] order not found ")
 
-        if (datetime.now() - self.position_update_time).seconds > 5:
-            self.query_position()
+        # 由成交直接更新部位, 不再向券商查詢; 持有 tick_lock 避免 marker 讀到更新一半的部位
+        with self.tick_lock:
+            position = self.position_book.on_deal(
+                sj_trade.contract.code,
+                trade.direction,
+                vn_order.offset if vn_order else Offset.NONE,
+                trade.price,
+                trade.volume,
+            )
+            if self.marker is not None:
+                tick = self.ticks.get(position.symbol, None)
+                if tick is not None:
+                    self.marker.revalue(position, tick.last_price)
+        self.on_position(position)
 
     def query_contract(self, securities_type=None):
-        self.write_log(f"商品檔 {securities_type} 下載完畢.")
-        for category in self.api.Contracts.Futures:
+        """
+        contracts_cb: 每個商品類別下載完成時呼叫一次, 只處理該類別;
+        securities_type 為 None 時處理全部類別
+        """
+        if securities_type is None:
+            for security_type in CONTRACT_PRODUCTS:
+                self.ingest_contracts(security_type)
+        else:
+            security_type = sj_constant.SecurityType(securities_type)
+            self.write_log(f"商品檔 {security_type.value} 下載完畢.")
+            self.contract_types.add(security_type)
+            if security_type in CONTRACT_PRODUCTS:
+                self.ingest_contracts(security_type)
+
+        if CONTRACT_TYPES <= self.contract_types:
+            self.contract_types.clear()
+            elapsed = time.perf_counter() - self.contract_start
+            self.write_log(
+                f"商品檔就緒 (下載): 發布 {len(self.code2contract)} 檔, "
+                f"略過 {self.filtered_count} 檔, 耗時 {elapsed:.2f} 秒."
+            )
+            if self.contract_cache:
+                self.save_contract_cache()
+
+    def ingest_contracts(self, security_type) -> None:
+        """轉換單一類別的商品, 批次更新對照表後依序推送"""
+        start = time.perf_counter()
+        convert = getattr(self, CONTRACT_PRODUCTS[security_type][1])
+        products = getattr(self.api.Contracts, CONTRACT_PRODUCTS[security_type][0])
+        contract_filter = self.contract_filter
+        datas = []
+        sj_contracts = {}
+        metas = {}
+        skipped = 0
+        for category in products:
             for contract in category:
-                data = ContractData(
-                    symbol=contract.code,
-                    exchange=Exchange.LOCAL,
-                    name=contract.name + contract.delivery_month,
-                    product=Product.FUTURES,
-                    size=200,
-                    pricetick=contract.unit,
-                    net_position=True,
-                    min_volume=1,
-                    history_data=True,
-                    gateway_name=self.gateway_name,
-                )
-                self.on_contract(data)
-                self.code2contract[contract.code] = contract
+                if contract_filter and not contract_filter.match(contract):
+                    skipped += 1
+                    continue
+                data = convert(contract)
+                datas.append(data)
+                sj_contracts[contract.code] = contract
+                metas[contract.code] = QuoteMeta.from_contract(contract, data.pricetick, data.size)
+        self.code2contract.update(sj_contracts)
+        self.code2contract.clear_missing()  # 先前查無的代碼可能在此類別中
+        self.code2meta.update(metas)
+        self.contract_index.add_many(sj_contracts.values())
+        converted = time.perf_counter()
+
+        for data in datas:
+            self.on_contract(data)
+        end = time.perf_counter()
+        self.filtered_count += skipped
+        self.write_log(
+            f"商品檔 {security_type.value}: {len(datas)} 檔, 略過 {skipped} 檔, "
+            f"轉換 {(converted - start) * 1000:.0f} 毫秒, 推送 {(end - converted) * 1000:.0f} 毫秒."
+        )
 
-        for category in self.api.Contracts.Options:
-            for contract in category:
-                data = ContractData(
-                    symbol=contract.code,
-                    exchange=Exchange.LOCAL,
-                    name=contract.name.replace(" ", ""),
-                    product=Product.OPTION,
-                    size=50,
-                    net_position=True,
-                    pricetick=0.01,
-                    min_volume=1,
-                    gateway_name=self.gateway_name,
-                    option_strike=contract.strike_price,
-                    option_underlying=contract.underlying_code,
-                    option_type=OptionType.CALL
-                    if contract.option_right == "C"
-                    else OptionType.PUT,
-                    history_data=True,
-                    option_expiry=datetime.strptime(contract.delivery_date, "%Y/%m/%d"),
-                )
-                self.on_contract(data)
-                self.code2contract[contract.code] = contract
+    def convert_future(self, contract) -> ContractData:
+        return ContractData(
+            symbol=contract.code,
+            exchange=Exchange.LOCAL,
+            name=contract.name + contract.delivery_month,
+            product=Product.FUTURES,
+            size=CONTRACT_SIZES[sj_constant.SecurityType.Future],
+            pricetick=contract.unit,
+            net_position=True,
+            min_volume=1,
+            history_data=True,
+            gateway_name=self.gateway_name,
+        )
 
-        for category in self.api.Contracts.Stocks:
-            for contract in category:
-                data = ContractData(
-                    symbol=contract.code,
-                    exchange=Exchange.LOCAL,
-                    name=contract.name,
-                    product=Product.EQUITY,
-                    size=1,
-                    net_position=False,
-                    pricetick=0.01,
-                    min_volume=1,
-                    history_data=True,
-                    gateway_name=self.gateway_name,
-                )
-                self.on_contract(data)
-                self.code2contract[contract.code] = contract
+    def convert_option(self, contract) -> ContractData:
+        return ContractData(
+            symbol=contract.code,
+            exchange=Exchange.LOCAL,
+            name=contract.name.replace(" ", ""),
+            product=Product.OPTION,
+            size=CONTRACT_SIZES[sj_constant.SecurityType.Option],
+            net_position=True,
+            pricetick=DEFAULT_PRICETICK,
+            min_volume=1,
+            gateway_name=self.gateway_name,
+            option_strike=contract.strike_price,
+            option_underlying=contract.underlying_code,
+            option_type=OptionType.CALL
+            if contract.option_right == "C"
+            else OptionType.PUT,
+            history_data=True,
+            option_expiry=datetime.strptime(contract.delivery_date, "%Y/%m/%d"),
+        )
+
+    def convert_stock(self, contract) -> ContractData:
+        return ContractData(
+            symbol=contract.code,
+            exchange=Exchange.LOCAL,
+            name=contract.name,
+            product=Product.EQUITY,
+            size=CONTRACT_SIZES[sj_constant.SecurityType.Stock],
+            net_position=False,
+            pricetick=DEFAULT_PRICETICK,
+            min_volume=1,
+            history_data=True,
+            gateway_name=self.gateway_name,
+        )
+
+    def get_contract_day(self):
+        return get_trading_day(datetime.now(TW_TZ).replace(tzinfo=None))
+
+    def save_contract_cache(self) -> None:
+        try:
+            count = self.contract_cache.save(
+                self.get_contract_day(), self.iter_api_contracts()
+            )
+        except Exception as exc:
+            self.write_log(f"商品檔快取寫入失敗: {exc}")
+            return
+        self.write_log(f"商品檔快取已寫入 {count} 檔.")
+
+    def iter_api_contracts(self):
+        """api.Contracts 中的全部商品 (含未發布者)"""
+        for attr, _ in CONTRACT_PRODUCTS.values():
+            for category in getattr(self.api.Contracts, attr):
+                yield from category
+
+    def load_contract_cache(self) -> None:
+        """由快取重建商品檔, 取代下載; Shioaji 合約於 code2contract 查詢時才建立"""
+        df = self.contract_cache.load(self.get_contract_day())
+        published = df.filter(self.contract_filter.expr()) if self.contract_filter else df
+        self.contract_catalog = ContractCatalog(df, published)
+        self.filtered_count = len(df) - len(published)
+        self.code2contract.clear_missing()
+        self.contract_index.add_rows(published.select(INDEX_FIELDS).iter_rows())
+        for data in build_contract_data(published, self.gateway_name):
+            self.on_contract(data)
+        elapsed = time.perf_counter() - self.contract_start
+        self.write_log(
+            f"商品檔就緒 (快取): 發布 {len(published)} 檔, "
+            f"略過 {self.filtered_count} 檔, 耗時 {elapsed:.2f} 秒."
+        )
+
+    def download_contracts(self, reason: Exception) -> None:
+        """快取無法讀取: 刪除快取檔並改為下載, 下載完成後 query_contract 會重新寫入快取"""
+        self.write_log(f"商品檔快取讀取失敗, 改為下載: {reason}")
+        self.contract_catalog = None
+        self.filtered_count = 0
+        try:
+            self.contract_cache.remove(self.get_contract_day())
+        except Exception as exc:
+            self.write_log(f"商品檔快取刪除失敗: {exc}")
+        self.contract_start = time.perf_counter()
+        try:
+            self.api.fetch_contracts(contracts_cb=self.query_contract)
+        except Exception as exc:
+            self.write_log(f"商品檔下載失敗: {exc}")
+
+    def resolve_contract(self, code: str) -> Optional[Contract]:
+        """
+        code2contract 查無時呼叫: 由 api.Contracts 或快取商品檔建立合約;
+        被篩選未發布的商品另外加入索引並推送 ContractData
+        """
+        if not isinstance(code, str):
+            return None
+        contract = None
+        api_contracts = getattr(self.api, "Contracts", None)
+        if api_contracts is not None:
+            for attr, _ in CONTRACT_PRODUCTS.values():
+                # 直接查 _code2contract, 避免 Shioaji 在商品檔未下載時阻塞等待
+                products = getattr(api_contracts, attr, None)
+                contract = getattr(products, "_code2contract", {}).get(code, None)
+                if contract is not None:
+                    break
+        catalog = self.contract_catalog
+        if contract is None and catalog is not None:
+            contract = catalog.build(code)
+        if contract is None:
+            return None
+
+        security_type = sj_constant.SecurityType(contract.security_type)
+        data = getattr(self, CONTRACT_PRODUCTS[security_type][1])(contract)
+        self.code2contract[code] = contract
+        self.code2meta[code] = QuoteMeta.from_contract(contract, data.pricetick, data.size)
+        if catalog is not None and code in catalog.published:
+            return contract  # 熱啟動已推送並建立索引
+        self.contract_index.add(contract)
+        self.on_contract(data)
+        self.write_log(f"商品 {code} 未發布, 已延遲建立.")
+        return contract
+
+    def get_contracts_by_underlying(self, underlying: str) -> List[Contract]:
+        """標的 (underlying_code) 相同的期貨/選擇權"""
+        return self.contract_index.get_by_underlying(underlying)
+
+    def get_contracts_by_expiry(self, delivery_month: str, category: str = "") -> List[Contract]:
+        """交割月份相同的期貨/選擇權, 可再限定分類"""
+        return self.contract_index.get_by_expiry(delivery_month, category)
+
+    def get_contracts_by_category(self, category: str) -> List[Contract]:
+        """分類 (TXF、MXF、TXO...) 相同的期貨/選擇權"""
+        return self.contract_index.get_by_category(category)
+
+    def get_stocks_by_industry(self, industry: str) -> List[Contract]:
+        """產業代碼相同的股票"""
+        return self.contract_index.get_by_industry(industry)
+
+    def get_expiries(self, category: str) -> List[str]:
+        """分類的所有交割月份, 由近到遠"""
+        return self.contract_index.get_expiries(category)
+
+    def get_option_chain(
+        self,
+        category: str,
+        delivery_month: str,
+        low: Optional[float] = None,
+        high: Optional[float] = None,
+    ) -> List[Contract]:
+        """選擇權序列: 履約價在 [low, high] 間的買權與賣權, 依履約價排序"""
+        return self.contract_index.get_option_chain(category, delivery_month, low, high)
 
     def connect(self, setting: dict) -> None:
         """連接 Shioaji"""
-        simulation = False if "正式環境" ==  setting.get("連接","模擬環境") else True
-        self.api = Shioaji(simulation=simulation)
+        mode = setting.get("連接", "模擬環境")
+        if mode == "本機模擬":
+            from .simulator import SimShioaji  # 只在本機模擬時載入撮合引擎
+
+            self.api = SimShioaji()
+        else:
+            self.api = Shioaji(simulation=mode != "正式環境")
         self.api.set_order_callback(self.relay_callback)
+        self.resolver.start()
         self.api.quote.set_on_tick_fop_v1_callback(self.tick_v1_callback)
         self.api.quote.set_on_tick_stk_v1_callback(self.tick_v1_callback)
         self.api.quote.set_on_bidask_fop_v1_callback(self.bidask_v1_callback)
         self.api.quote.set_on_bidask_stk_v1_callback(self.bidask_v1_callback)
 
+        if setting.get("Tick推送模式", "複製") == "循環池":
+            self.tick_pool = TickPool(int(setting.get("循環池大小", 32)))
+            self.snapshot_tick = self.tick_pool.acquire
+            self.event_engine.register_general(self.tick_pool.process_event)
+            self.write_log(f"Tick 循環池已啟用, 每檔商品最多 {self.tick_pool.size} 個槽位.")
+
+        if setting.get("行情紀錄", "關閉") == "開啟":
+            root = setting.get("行情紀錄路徑", "") or get_folder_path("sinopac_journal")
+            self.journal = QuoteJournal(
+                root,
+                capacity=int(setting.get("行情紀錄檔筆數", 100000)),
+                on_error=lambda exc: self.write_log(f"行情紀錄錯誤: {exc}"),
+                queue_size=int(setting.get("行情紀錄佇列上限", 200000)),
+            )
+            self.journal.start()
+            self.write_log(f"行情紀錄已啟用, 路徑 {root}")
+
+        if setting.get("五檔陣列", "關閉") == "開啟":
+            self.order_book = OrderBookStore()
+            self.write_log("五檔陣列已啟用.")
+
+        if setting.get("K線合成", "關閉") == "開啟":
+            self.bar_builder = BarBuilder(self.on_bar, self.gateway_name)
+            self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+            self.write_log("一分 K 合成已啟用.")
+
+        if setting.get("行情合併", "關閉") == "開啟":
+            interval = int(setting.get("行情合併間隔(毫秒)", 100)) / 1000
+            self.conflator = TickConflator(
+                interval,
+                self.on_tick,
+                self.is_event_idle,
+                self.tick_lock,
+                self.snapshot_tick,
+            )
+            self.conflator.start()
+            self.write_log(f"行情合併已啟用, 間隔 {interval * 1000:.0f} 毫秒.")
+
+        if setting.get("行情派送佇列", "關閉") == "開啟":
+            size = int(setting.get("行情佇列大小", 65536))
+            policy = setting.get("佇列滿載策略", OverflowPolicy.DROP_OLDEST.value)
+            self.dispatcher = QuoteDispatcher(
+                size,
+                OverflowPolicy(policy),
+                on_error=lambda exc: self.write_log(f"行情處理錯誤: {exc}"),
+            )
+            self.dispatcher.start()
+            self.write_log(f"行情派送佇列已啟用, 大小 {size}, 滿載策略 {policy}.")
+
+        if setting.get("流量控制", "關閉") == "開啟":
+            order_limit = int(setting.get("下單流量(次/10秒)", 250))
+            query_limit = int(setting.get("查詢流量(次/5秒)", 25))
+            self.scheduler = RequestScheduler(
+                {"order": TokenBucket(order_limit, 10), "query": TokenBucket(query_limit, 5)},
+                on_error=self.write_log,
+            )
+            self.scheduler.start()
+            self.write_log(f"流量控制已啟用, 下單 {order_limit} 次/10秒, 查詢 {query_limit} 次/5秒.")
+
+        self.latency_interval = int(setting.get("委託延遲統計(秒)", 60) or 0)
+        if self.latency_interval > 0:
+            self.event_engine.register(EVENT_TIMER, self.process_latency_timer)
+
+        if setting.get("委託歸檔", "關閉") == "開啟":
+            self.archive_delay = float(setting.get("委託歸檔延遲(秒)", 60))
+            self.order_archive = OrderArchive(
+                self.gateway_name, max_rows=int(setting.get("歸檔保留筆數", 200000))
+            )
+            self.event_engine.register(EVENT_TIMER, self.process_archive_timer)
+            self.write_log(f"委託歸檔已啟用, 結束 {self.archive_delay:.0f} 秒後移出.")
+
+        if setting.get("即時損益", "關閉") == "開啟":
+            interval = int(setting.get("損益推送間隔(毫秒)", 500)) / 1000
+            self.marker = PositionMarker(self.positions, self.get_multiplier, self.on_position, interval)
+            self.event_engine.register(EVENT_TIMER, self.process_pnl_timer)
+            self.write_log(f"即時損益已啟用, 推送間隔 {interval * 1000:.0f} 毫秒.")
+
+        self.reconcile_interval = int(setting.get("部位核對間隔(秒)", 300) or 0)
+        if self.reconcile_interval > 0:
+            self.event_engine.register(EVENT_TIMER, self.process_reconcile_timer)
+
+        self.account_interval = int(setting.get("帳務查詢間隔(秒)", 0) or 0)
+        if self.account_interval > 0:
+            self.event_engine.register(EVENT_TIMER, self.process_account_timer)
+
+        self.batch_submitter = BatchSubmitter(
+            int(setting.get("批次下單執行緒", 8)), on_done=self.on_batch_done
+        )
+
+        self.contract_filter = ContractFilter.from_setting(setting)
+        cached = False
+        if setting.get("商品檔快取", "關閉") == "開啟":
+            root = setting.get("商品檔快取路徑", "") or get_folder_path("sinopac_contracts")
+            self.contract_cache = ContractCache(root, CONNECTION_KEYS[mode])
+            cached = self.contract_cache.exists(self.get_contract_day())
+        if setting.get("K線快取", "關閉") == "開啟":
+            root = setting.get("K線快取路徑", "") or get_folder_path("sinopac_kbars")
+            self.kbar_cache = KbarCache(root, CONNECTION_KEYS[mode])
+            self.write_log(f"K線快取已啟用, 路徑 {root}")
+
         api_key: str = setting["API_KEY"]
         secret_key: str = setting["SECRET_KEY"]
+        self.contract_start = time.perf_counter()
         try:
-            self.api.login(api_key, secret_key, contracts_cb=self.query_contract,)
+            self.api.login(
+                api_key,
+                secret_key,
+                fetch_contract=not cached,
+                contracts_cb=self.query_contract,
+            )
         except Exception as exc:
             self.write_log(f"登入失败. [{exc}]")
             return
         self.write_log(f"登入成功.")
+        if cached:
+            try:
+                self.load_contract_cache()
+            except Exception as exc:
+                self.download_contracts(exc)
         person_id = None
         for acc in self.api.list_accounts():
             if person_id is None:
@@ -449,10 +1064,11 @@ class SinopacGateway(BaseGateway):
                 vt_offset = OFFSET_STK_SINOPAC2VT[
                     (sjtrade.order.order_cond, day_trade)
                 ]
+            orderid = self.order_ids.get_local(sjtrade.order.id, sjtrade.order.seqno)
             vn_order_data: OrderData = OrderData(
                 symbol=sjtrade.contract.code,
                 exchange=Exchange.LOCAL,
-                orderid=sjtrade.order.id,
+                orderid=orderid,
                 direction=DIRECTION_SHIOAJI2VT[sjtrade.order.action],
                 price=round_to(sjtrade.order.price, 0.00001),
                 volume=round_to(sjtrade.order.quantity, 1),
@@ -464,7 +1080,7 @@ class SinopacGateway(BaseGateway):
                 reference=sjtrade.status.msg,
                 gateway_name=self.gateway_name,
             )
-            self.orders[sjtrade.order.id] = vn_order_data
+            self.orders[orderid] = vn_order_data
             self.trades[sjtrade.order.id] = sjtrade
             return vn_order_data
 
@@ -479,6 +1095,7 @@ class SinopacGateway(BaseGateway):
 
     def register_all_event(self):
         self.query_position()
+        self.query_account()
         self.update_trades(reload=True)
 
     def select_default_account(self, select_stock_number, select_futures_number):
@@ -508,8 +1125,13 @@ class SinopacGateway(BaseGateway):
                 f"***預設 期貨下單帳號 - [{select_futures_number}] {acc.broker_id}-{acc.account_id} {acc.username}"
             )
 
-    def list_position_callback(self, positions):
-        # Stock account
+    def list_position_callback(self, positions, stock: Optional[bool] = None):
+        """
+        券商部位與本地 (成交增量) 部位核對, 不一致時記錄並以券商為準;
+        查詢送出後才有成交的商品略過更正. stock 指定查詢的帳號類別, 用來歸零券商已無的部位,
+        並只推送該帳號類別中有變動或已平倉的部位.
+        """
+        broker: Dict[str, PositionData] = {}
         for sj_pos in positions:
             if sj_pos.last_price == 0:
                 self.write_log(f"忽略 {sj_pos.code} 已下市，無法交易.")
@@ -522,7 +1144,7 @@ class SinopacGateway(BaseGateway):
             volume = sj_pos.quantity
             total_qty = sj_pos.quantity
             yd_qty = 0            
-            if isinstance(positions,StockPosition):
+            if isinstance(sj_pos, StockPosition):
                 yd_qty = sj_pos.yd_quantity
             pos = PositionData(
                 symbol=sj_pos.code,
@@ -535,10 +1157,90 @@ class SinopacGateway(BaseGateway):
                 yd_volume=yd_qty,
                 gateway_name=self.gateway_name,
             )
-            self.positions[sj_pos.code] = pos
-
-        for position in self.positions.values():
-            self.on_position(position)            
+            broker[sj_pos.code] = pos
+
+        # 與成交回報 (impl_deal) 互斥, 避免核對與更新到一半的部位交錯
+        with self.relay_lock:
+            with self.tick_lock:  # marker.update 於行情執行緒讀取同一部位
+                self.reconcile_positions(broker, stock)
+            if stock is None and positions:
+                stock = isinstance(positions[0], StockPosition)
+            if stock is not None:
+                self.emit_position_diff(stock)
+
+    def reconcile_positions(self, broker: Dict[str, PositionData], stock: Optional[bool]) -> None:
+        """呼叫端需持有 relay_lock"""
+        drift = []
+        for code, pos in broker.items():
+            local = self.positions.get(code, None)
+            if local is not None and self.position_differs(local, pos):
+                if self.position_book.dealt_since(code, self.position_query_time):
+                    continue
+                drift.append(f"{code} 本地 {local.direction.value}{local.volume:g} 券商 {pos.direction.value}{pos.volume:g}")
+            self.positions[code] = pos
+        if stock is not None:
+            for code, local in self.positions.items():
+                if (
+                    code in broker
+                    or not local.volume
+                    or self.is_stock_symbol(code) != stock
+                    or self.position_book.dealt_since(code, self.position_query_time)
+                ):
+                    continue
+                drift.append(f"{code} 本地 {local.direction.value}{local.volume:g} 券商 0")
+                local.volume = local.yd_volume = local.frozen = 0
+                local.price = local.pnl = 0
+        if drift:
+            self.write_log(f"部位核對: {len(drift)} 檔與券商不一致, 已更正: " + "; ".join(drift))
+
+    def is_stock_symbol(self, symbol: str) -> bool:
+        return isinstance(self.code2contract.get(symbol, None), contracts.Stock)
+
+    def emit_position_diff(self, stock: bool) -> None:
+        """只推送指紋 (數量、昨倉、均價、損益) 有變動的部位, 已平倉或換方向者推送一次零部位"""
+        account = "股票" if stock else "期貨"
+        fingerprints = self.position_fingerprints
+        current = {
+            (account, code, pos.direction): pos
+            for code, pos in self.positions.items()
+            if pos.volume and self.is_stock_symbol(code) == stock
+        }
+        emitted = suppressed = 0
+        for key, pos in current.items():
+            fingerprint = (pos.volume, pos.yd_volume, pos.price, pos.pnl)
+            if fingerprints.get(key, None) == fingerprint:
+                suppressed += 1
+                continue
+            fingerprints[key] = fingerprint
+            self.on_position(pos)
+            emitted += 1
+        for key in [key for key in fingerprints if key[0] == account and key not in current]:
+            del fingerprints[key]
+            _, code, direction = key
+            self.on_position(
+                PositionData(
+                    symbol=code,
+                    exchange=Exchange.LOCAL,
+                    direction=direction,
+                    gateway_name=self.gateway_name,
+                )
+            )
+            emitted += 1
+
+        stats = self.position_stats
+        stats["refreshes"] += 1
+        stats["emitted"] += emitted
+        stats["suppressed"] += suppressed
+        if suppressed:
+            self.write_log(f"部位更新 ({account}): 推送 {emitted} 筆, 略過 {suppressed} 筆未變動.")
+
+    @staticmethod
+    def position_differs(local: PositionData, broker: PositionData) -> bool:
+        return (
+            local.direction != broker.direction
+            or local.volume != broker.volume
+            or local.yd_volume != broker.yd_volume
+        )
 
     def get_contract_snapshot(self, contract):
         self.tick_snapshot(contract, Exchange.LOCAL)
@@ -546,42 +1248,43 @@ class SinopacGateway(BaseGateway):
     def tick_snapshot(self, contract, exchange):
         snapshots = self.api.snapshots([contract])
         code = contract.code
-        tick = self.ticks.get(code, None)
-        if tick is None:
-            timestamp = snapshots[0].ts / 10**9 - 8 * 60 * 60
-            dt = datetime.fromtimestamp(timestamp)
-
-            tick = TickData(
-                symbol=code,
-                exchange=exchange,
-                name=f"{contract['name']}",
-                datetime=dt,
-                gateway_name=self.gateway_name,
-            )
-        tick.volume = snapshots[0].total_volume
-        tick.last_price = snapshots[0].close
-        tick.limit_up = contract.limit_up
-        tick.open_interest = 0
-        tick.limit_down = contract.limit_down
-        tick.open_price = snapshots[0].open
-        tick.high_price = snapshots[0].high
-        tick.low_price = snapshots[0].low
-        tick.pre_close = contract.reference
-        tick.bid_price_1 = snapshots[0].buy_price
-        tick.bid_volume_1 = snapshots[0].buy_volume
-        tick.ask_price_1 = snapshots[0].sell_price
-        tick.ask_volume_1 = snapshots[0].sell_volume
-
-        self.ticks[code] = tick
-        self.on_tick(copy(tick))
-
-    def cancel_order(self, req: CancelRequest) -> None:
-        """委托撤单"""
+        with self.tick_lock:
+            tick = self.ticks.get(code, None)
+            if tick is None:
+                timestamp = snapshots[0].ts / 10**9 - 8 * 60 * 60
+                dt = datetime.fromtimestamp(timestamp)
+
+                tick = TickData(
+                    symbol=code,
+                    exchange=exchange,
+                    name=f"{contract['name']}",
+                    datetime=dt,
+                    gateway_name=self.gateway_name,
+                )
+            tick.volume = snapshots[0].total_volume
+            tick.last_price = snapshots[0].close
+            tick.limit_up = contract.limit_up
+            tick.open_interest = 0
+            tick.limit_down = contract.limit_down
+            tick.open_price = snapshots[0].open
+            tick.high_price = snapshots[0].high
+            tick.low_price = snapshots[0].low
+            tick.pre_close = contract.reference
+            tick.bid_price_1 = snapshots[0].buy_price
+            tick.bid_volume_1 = snapshots[0].buy_volume
+            tick.ask_price_1 = snapshots[0].sell_price
+            tick.ask_volume_1 = snapshots[0].sell_volume
+
+            self.ticks[code] = tick
+            self.publish_tick(tick)
+
+    def cancel_order(self, req: CancelRequest) -> bool:
+        """委托撤单, 已送出或等待委託確認時回傳 True; 查無委託或委託已結束時回傳 False"""
 
         def cancel_cb(_: Trade):
             self.write_log(f"Cancel {req.orderid}")
 
-        sj_trade: Trade = self.trades.get(req.orderid, None)
+        sj_trade: Trade = self.trades.get(self.order_ids.get_sj(req.orderid), None)
         if sj_trade:
             if sj_trade.status.status.value in [
                 sj_constant.Status.Submitted,
@@ -589,58 +1292,228 @@ class SinopacGateway(BaseGateway):
                 sj_constant.Status.PartFilled,
                 sj_constant.Status.PreSubmitted,
             ]:
-                self.api.cancel_order(self.trades[req.orderid], timeout=0, cb=cancel_cb)
-            else:
-                self.write_log(
-                    f"{req.symbol} [{req.orderid}] is {sj_trade.status.status.value} can't cancel."
+                self.schedule(
+                    "order",
+                    PRIORITY_CANCEL,
+                    "cancel_order",
+                    partial(self.api.cancel_order, sj_trade, timeout=0, cb=cancel_cb),
                 )
+                return True
+            self.write_log(
+                f"{req.symbol} [{req.orderid}] is {sj_trade.status.status.value} can't cancel."
+            )
+            return False
+        if req.orderid in self.orders and self.orders[req.orderid].status == Status.SUBMITTING:
+            # 下單回呼尚未送達, 待取得 Trade 後送出刪單
+            self.pending_cancels[req.orderid] = req
+            self.write_log(f"Cancel {req.symbol} [{req.orderid}] 等待委託確認.")
+            return True
+        order = self.get_order(req.orderid)
+        if order is not None:
+            self.write_log(f"{req.symbol} [{req.orderid}] is {order.status.value} can't cancel.")
         else:
             self.write_log(f"Cancel {req.symbol} {req.orderid} not found.")
+        return False
 
     def close(self) -> None:
         """Shioaji Session Logout"""
+        if self.journal:
+            self.journal.stop()
+            self.write_log(
+                f"行情紀錄: 共寫入 {self.journal.recorded} 筆, 代碼過長未寫入 {self.journal.rejected} 筆, "
+                f"最高水位 {self.journal.high_water}, 佇列滿載丟棄 {self.journal.dropped} 筆."
+            )
+            self.journal = None
+        if self.dispatcher:
+            self.dispatcher.stop()
+            stats = self.dispatcher.get_stats()
+            self.write_log(
+                f"行情派送佇列: 已處理 {stats['processed']} 筆, 最高水位 {stats['high_water']}, 丟棄 {stats['dropped']} 筆."
+            )
+            self.dispatcher = None
+        if self.conflator:
+            self.conflator.stop()
+            coalesced = self.conflator.get_coalesced()
+            self.write_log(
+                f"行情合併: {len(coalesced)} 檔商品共合併 {sum(coalesced.values())} 筆更新."
+            )
+            self.conflator = None
+        if self.tick_pool is not None:
+            self.event_engine.unregister_general(self.tick_pool.process_event)
+            self.write_log(
+                f"Tick 循環池: 共 {self.tick_pool.get_slot_count()} 個槽位, 槽位用盡改用 copy {self.tick_pool.copied} 次."
+            )
+            self.snapshot_tick = copy
+            self.tick_pool = None
+        if self.bar_builder is not None:
+            self.event_engine.unregister(EVENT_TIMER, self.process_timer_event)
+            self.write_log(f"一分 K 合成: 共推送 {self.bar_builder.emitted} 根.")
+            self.bar_builder = None
+        if self.scheduler is not None:
+            dropped = self.scheduler.stop()
+            for label, stats in self.scheduler.get_stats().items():
+                self.write_log(
+                    f"流量控制 {label}: 送出 {stats['sent']} 筆, 排隊 p50 {stats['wait_p50_ms']:.1f} "
+                    f"p99 {stats['wait_p99_ms']:.1f} max {stats['wait_max_ms']:.1f} 毫秒."
+                )
+            if dropped:
+                self.write_log(f"流量控制: 關閉時捨棄 {dropped} 筆未送出請求.")
+            self.scheduler = None
+        if self.batch_submitter is not None:
+            self.batch_submitter.shutdown()
+            self.batch_submitter = None
+        if self.latency_interval > 0:
+            self.event_engine.unregister(EVENT_TIMER, self.process_latency_timer)
+            self.latency_interval = 0
+        if self.order_archive is not None:
+            self.event_engine.unregister(EVENT_TIMER, self.process_archive_timer)
+            self.write_log(
+                f"委託歸檔: 共 {self.order_archive.archived} 筆, 保留 {len(self.order_archive)} 筆."
+            )
+        if self.reconcile_interval > 0:
+            self.event_engine.unregister(EVENT_TIMER, self.process_reconcile_timer)
+            self.reconcile_interval = 0
+        if self.account_interval > 0:
+            self.event_engine.unregister(EVENT_TIMER, self.process_account_timer)
+            self.account_interval = 0
+        if self.marker is not None:
+            self.event_engine.unregister(EVENT_TIMER, self.process_pnl_timer)
+            self.write_log(
+                f"即時損益: 重估 {self.marker.revalued} 次, 推送 {self.marker.emitted} 次."
+            )
+            self.marker = None
+        for line in self.latency.format_stats():
+            self.write_log(line)
+        if self.kbar_cache is not None:
+            stats = self.kbar_cache.get_stats()
+            self.write_log(
+                f"K線快取: 查詢 {stats['requests']} 次, 完全命中 {stats['hits']} 次, "
+                f"快取 {stats['cached_days']} 日, 下載 {stats['fetches']} 段共 {stats['fetched_days']} 日."
+            )
+        self.resolver.stop()
+        stats = self.resolver.get_stats()
+        if stats["resolved"] or stats["expired"]:
+            self.write_log(
+                f"委託回報補齊: {stats['resolved']} 筆 (背景查詢 {stats['fetched']} 筆), "
+                f"捨棄 {stats['expired']} 筆, 延遲 p50 {stats.get('latency_p50_ms', 0):.1f} "
+                f"p99 {stats.get('latency_p99_ms', 0):.1f} max {stats.get('latency_max_ms', 0):.1f} 毫秒."
+            )
         self.api.logout()
 
     def query_account(self) -> None:
-        """Query Account"""
-        # self.req_id += 1
-        pass
+        """非同步查詢股票帳戶餘額與期貨保證金, 經流量控制的查詢額度送出; 前一次查詢未回呼時略過"""
+        if self.api.stock_account is not None and self.begin_account_query("account_balance"):
+            self.schedule(
+                "query",
+                PRIORITY_QUERY,
+                "account_balance",
+                partial(self.api.account_balance, timeout=0, cb=self.account_balance_callback),
+            )
+        if self.api.futopt_account is not None and self.begin_account_query("margin"):
+            self.schedule(
+                "query",
+                PRIORITY_QUERY,
+                "margin",
+                partial(self.api.margin, account=self.api.futopt_account, timeout=0, cb=self.margin_callback),
+            )
 
-    def query_position(self) -> None:
-        """Query hold positions"""
-        for position in self.positions.values():
-            position.volume = 0
-            position.frozen = 0
-            position.price = 0
-            position.pnl = 0
+    def begin_account_query(self, name: str) -> bool:
+        """在途超過 60 秒視為遺失, 允許重送"""
+        now = time.monotonic()
+        if now - self.account_inflight.get(name, -60.0) < 60:
+            return False
+        self.account_inflight[name] = now
+        return True
+
+    def account_balance_callback(self, balance) -> None:
+        """AccountBalance(status, acc_balance, date, errmsg)"""
+        self.account_inflight.pop("account_balance", None)
+        if balance.errmsg or balance.status != FetchStatus.Fetched:
+            self.write_log(f"查詢帳戶餘額失敗: {balance.errmsg or balance.status}")
+            return
+        account = self.api.stock_account
+        self.update_account(
+            AccountData(
+                accountid=f"{account.broker_id}-{account.account_id}",
+                balance=balance.acc_balance,
+                frozen=0,
+                gateway_name=self.gateway_name,
+            )
+        )
+
+    def margin_callback(self, margin) -> None:
+        """Margin, 餘額為權益數, 凍結為權益數扣除可動用保證金"""
+        self.account_inflight.pop("margin", None)
+        if margin.status != FetchStatus.Fetched:
+            self.write_log(f"查詢保證金失敗: {margin.status}")
+            return
+        account = self.api.futopt_account
+        self.update_account(
+            AccountData(
+                accountid=f"{account.broker_id}-{account.account_id}",
+                balance=margin.equity,
+                frozen=round(margin.equity - margin.available_margin, 2),
+                gateway_name=self.gateway_name,
+            )
+        )
+
+    def update_account(self, account: AccountData) -> None:
+        """與快取比較, 有變動才推送"""
+        last = self.accounts.get(account.accountid, None)
+        if last is not None and last.balance == account.balance and last.frozen == account.frozen:
+            return
+        self.accounts[account.accountid] = account
+        self.on_account(account)
+
+    def get_account(self, accountid: str) -> Optional[AccountData]:
+        """最後一次查詢的帳務 (accountid 為 broker_id-account_id), 不發出查詢"""
+        return self.accounts.get(accountid, None)
 
+    def query_position(self) -> None:
+        """Query hold positions, 回呼時與本地部位核對 (不先清空, 避免部位閃爍為零)"""
+        self.position_query_time = time.perf_counter()
         # Stock account
 
         # [FuturePosition(id=0, code='TXFA3', direction=<Action.Buy: 'Buy'>, quantity=3, price=14544.0, last_price=14543.0, pnl=-600.0)]
         # Future account
         if self.api.stock_account is not None:
             self.write_log(f"Query position stock account {self.api.stock_account}")
-            self.api.list_positions(account=self.api.stock_account,timeout=0, cb=self.list_position_callback)
+            self.schedule(
+                "query",
+                PRIORITY_QUERY,
+                "list_positions",
+                partial(self.api.list_positions, account=self.api.stock_account, timeout=0, cb=partial(self.list_position_callback, stock=True)),
+            )
         
         if self.api.futopt_account is not None:
             self.write_log(f"Query position future account {self.api.futopt_account}")
-            self.api.list_positions(account=self.api.futopt_account,timeout=0, cb=self.list_position_callback)
+            self.schedule(
+                "query",
+                PRIORITY_QUERY,
+                "list_positions",
+                partial(self.api.list_positions, account=self.api.futopt_account, timeout=0, cb=partial(self.list_position_callback, stock=False)),
+            )
 
         self.position_update_time = datetime.now()
 
-    def place_order_callback(self, trade: Trade):
-        
+    def place_order_callback(self, trade: Trade, orderid: str = ""):
+        """orderid 為 send_order 產生的本地編號"""
         sj_contract: Contract = trade["contract"]
-        order_data: OrderData = self.orders.get(trade.order.id, None)
+        if orderid:
+            self.latency.mark(orderid, "callback")
+            self.order_ids.bind(orderid, trade.order.id, trade.order.seqno)
+        else:
+            orderid = self.order_ids.get_local(trade.order.id, trade.order.seqno)
 
-        if self.trades.get(trade.order.id, None) is None:
-            self.trades[trade.order.id] = trade
+        # 登記 Trade 並處理先於下單回呼到達的回報
+        self.resolver.complete(trade)
+        order_data: OrderData = self.orders.get(orderid, None)
         if order_data is None:
             order_data: OrderData = OrderData(
                 symbol=sj_contract["code"],
                 exchange=Exchange.LOCAL,
                 type=PRICETYPE_SINOPAC2VT[trade.order.price_type],
-                orderid=trade.order.id,
+                orderid=orderid,
                 direction=DIRECTION_SHIOAJI2VT[trade.order.action],
                 volume=trade.order.quantity,
                 gateway_name=self.gateway_name,
@@ -651,9 +1524,13 @@ class SinopacGateway(BaseGateway):
             order_data.status = STATUS_SINOPAC2VT[trade.status.status]
             order_data.datetime = trade.status.order_datetime
             order_data.reference = trade.status.msg
-            self.orders[trade.order.id] = order_data
+            self.orders[orderid] = order_data
         self.on_order(order_data)
 
+        req = self.pending_cancels.pop(orderid, None)
+        if req is not None:
+            self.cancel_order(req)
+
     def send_order(self, req: OrderRequest) -> str:
         """委托下单"""
         """
@@ -670,6 +1547,62 @@ class SinopacGateway(BaseGateway):
 
         :return str vt_orderid for created OrderData
         """
+        start = time.perf_counter()
+        item = self.build_order(req)
+        if item is None:
+            return ""
+        order = self.create_order(req, item[0], start)
+        self.schedule(
+            "order",
+            PRIORITY_ORDER,
+            "place_order",
+            partial(self.submit_order, *item, order),
+        )
+        return order.vt_orderid
+
+    def send_orders(self, reqs: List[OrderRequest]) -> List[str]:
+        """
+        批次下單: 先檢查並建立全部 Shioaji Order 與 SUBMITTING 委託, 再交由執行緒池並行送出
+        (流量控制開啟時交由 scheduler). 回傳與 reqs 對應的 vt_orderid, 檢查失敗者為空字串;
+        逐筆送出結果與總耗時見 self.batch.
+        """
+        start = time.perf_counter()
+        items = [self.build_order(req) for req in reqs]
+        vt_orderids: List[str] = []
+        tasks: List[Callable] = []
+        for req, item in zip(reqs, items):
+            if item is None:
+                vt_orderids.append("")
+                continue
+            order = self.create_order(req, item[0], start)
+            vt_orderids.append(order.vt_orderid)
+            tasks.append(partial(self.submit_order, *item, order))
+
+        if self.scheduler is not None or self.batch_submitter is None:
+            for task in tasks:
+                self.schedule("order", PRIORITY_ORDER, "place_order", task)
+        else:
+            self.batch = self.batch_submitter.submit("下單", tasks, start)
+        return vt_orderids
+
+    def cancel_orders(self, reqs: List[CancelRequest]) -> None:
+        """批次刪單, 由執行緒池並行送出 (流量控制開啟時交由 scheduler)"""
+        if self.scheduler is not None or self.batch_submitter is None:
+            for req in reqs:
+                self.cancel_order(req)
+        else:
+            self.batch = self.batch_submitter.submit(
+                "刪單", [partial(self.cancel_order, req) for req in reqs]
+            )
+
+    def on_batch_done(self, batch: OrderBatch) -> None:
+        self.write_log(
+            f"批次{batch.label}: {len(batch.results)} 筆, 失敗 {batch.failed} 筆, "
+            f"耗時 {batch.elapsed * 1000:.1f} 毫秒."
+        )
+
+    def build_order(self, req: OrderRequest) -> Optional[tuple]:
+        """檢查委託並建立 Shioaji Order, 回傳 (contract, sj_order), 不支援時回傳 None"""
         contract = self.code2contract.get(req.symbol, None)
         sj_order = None
         if any(isinstance(contract, i) for i in [contracts.Future, contracts.Option]):
@@ -679,7 +1612,7 @@ class SinopacGateway(BaseGateway):
             )
             if not all([price_type, order_type]):
                 self.write_log(f"{req.symbol} 不支援 { req.type.value } 下單")
-                return ""
+                return None
             sj_order = self.api.Order(
                 req.price,
                 req.volume,
@@ -696,11 +1629,11 @@ class SinopacGateway(BaseGateway):
             )
             if not all([price_type, order_type]):
                 self.write_log(f"{req.symbol} 不支援 { req.type.value } 下單")
-                return ""
-            order_cond, first_sell = OFFSET_STK_VT2SINOPAC[req.offset]
-            if not all([order_cond, first_sell]):
+                return None
+            order_cond, day_trade = OFFSET_STK_VT2SINOPAC[req.offset]
+            if not all([order_cond, day_trade]):
                 self.write_log(f"{req.symbol} 不支援 { req.offset.value } 下單")
-                return ""
+                return None
             sj_order = self.api.Order(
                 price=req.price,
                 quantity=int(req.volume),
@@ -708,11 +1641,54 @@ class SinopacGateway(BaseGateway):
                 price_type=price_type,
                 order_type=order_type,
                 order_cond=order_cond,
-                first_sell=first_sell,
+                daytrade_short=day_trade == sj_constant.DayTrade.Yes,
             )
 
-        self.api.place_order(contract, sj_order, 0, self.place_order_callback)
-        return ""
+        if sj_order is None:
+            self.write_log(f"{req.symbol} 查無商品, 無法下單")
+            return None
+        return contract, sj_order
+
+    def create_order(self, req: OrderRequest, contract: Contract, start: float) -> OrderData:
+        """先產生本地編號並推送 SUBMITTING, 不必等待下單往返即可追蹤與刪單"""
+        orderid = self.order_ids.new_orderid()
+        self.latency.start(orderid, "股票" if isinstance(contract, contracts.Stock) else "期貨", start)
+        order: OrderData = req.create_order_data(orderid, self.gateway_name)
+        order.datetime = datetime.now(TW_TZ)
+        self.orders[orderid] = order
+        self.on_order(order)
+        return order
+
+    def submit_order(self, contract: Contract, sj_order, order: OrderData) -> bool:
+        """呼叫 api.place_order, 送出失敗時推送 REJECTED 並回傳 False"""
+        orderid = order.orderid
+        try:
+            trade = self.api.place_order(
+                contract,
+                sj_order,
+                0,
+                lambda trade: self.place_order_callback(trade, orderid),
+            )
+        except Exception as exc:
+            self.order_ids.discard(orderid)
+            self.latency.discard(orderid)
+            self.pending_cancels.pop(orderid, None)
+            order.status = Status.REJECTED
+            order.reference = str(exc)
+            self.on_order(order)
+            self.write_log(f"{order.symbol} [{orderid}] 下單失敗: {exc}")
+            return False
+        self.latency.mark(orderid, "place")
+        if trade is not None and trade.order.id and self.order_ids.is_pending(orderid):
+            self.order_ids.bind(orderid, trade.order.id, trade.order.seqno)
+        return True
+
+    def schedule(self, bucket: str, priority: int, label: str, func: Callable) -> None:
+        """流量控制開啟時排入 scheduler, 否則直接呼叫"""
+        if self.scheduler is None:
+            func()
+        else:
+            self.scheduler.submit(bucket, priority, label, func)
 
     def subscribe(self, req: SubscribeRequest) -> None:
         """订阅行情"""
@@ -724,6 +1700,15 @@ class SinopacGateway(BaseGateway):
             self.get_contract_snapshot(contract)
             self.api.quote.subscribe(contract, quote_type="tick", version="v1")
             self.api.quote.subscribe(contract, quote_type="bidask", version="v1")
+            if self.order_book is not None:
+                self.order_book.add(req.symbol)
+            if self.bar_builder is not None:
+                self.bar_builder.add(
+                    req.symbol,
+                    STOCK_SESSIONS
+                    if isinstance(contract, contracts.Stock)
+                    else FUTURES_SESSIONS,
+                )
             self.write_log(f"訂閱 {contract.code} {contract.name}")
             self.subscribed.add(req.symbol)
         else:
@@ -741,98 +1726,21 @@ class SinopacGateway(BaseGateway):
         data: List[BarData] = []
 
         if interval == Interval.MINUTE:
-            minute_bars = self.api.kbars(sj_contract, start, end)
-            df = pl.DataFrame({**minute_bars})
-            
-            # 檢查是否有資料
-            if df is None or len(df) == 0:
+            def fetch(start: str, end: str) -> pl.DataFrame:
+                return normalize_kbars(self.api.kbars(sj_contract, start, end))
+
+            try:
+                if self.kbar_cache is not None:
+                    df = self.kbar_cache.load(symbol, req.start.date(), req.end.date(), fetch)
+                else:
+                    df = fetch(start, end)
+            except ValueError as exc:
+                self.write_log(str(exc))
                 return data
-            
-            # 檢查 ts 欄位型別並轉換
-            if "ts" in df.columns:
-                ts_dtype = df["ts"].dtype
-                
-                # 先檢查資料內容
-                if len(df) > 0:
-                    ts_sample = df["ts"][0]
-                    
-                    if ts_dtype == pl.Int64 or ts_dtype == pl.Float64:
-                        # 根據數值大小判斷時間戳單位
-                        # Unix 時間戳: 秒級約 10 位數，毫秒級約 13 位數，微秒級約 16 位數，奈秒級約 19 位數
-                        if ts_sample > 10**18:  # 奈秒
-                            df = df.with_columns(
-                                (pl.col("ts") // 10**6).cast(pl.Datetime("ms"))
-                            )
-                        elif ts_sample > 10**15:  # 微秒
-                            df = df.with_columns(
-                                (pl.col("ts") // 10**3).cast(pl.Datetime("ms"))
-                            )
-                        elif ts_sample > 10**12:  # 毫秒
-                            df = df.with_columns(
-                                pl.col("ts").cast(pl.Datetime("ms"))
-                            )
-                        else:  # 秒
-                            df = df.with_columns(
-                                (pl.col("ts") * 1000).cast(pl.Datetime("ms"))
-                            )
-                    elif ts_dtype == pl.Utf8 or ts_dtype == pl.String:
-                        # 如果是字串，解析為 datetime
-                        # 嘗試多種日期格式
-                        try:
-                            df = df.with_columns(pl.col("ts").str.strptime(pl.Datetime))
-                        except:
-                            try:
-                                df = df.with_columns(pl.col("ts").str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S"))
-                            except:
-                                self.write_log(f"無法解析時間格式: {ts_sample}")
-                                return data
-                    elif ts_dtype in [pl.Datetime, pl.Datetime("ms"), pl.Datetime("us"), pl.Datetime("ns")]:
-                        # 已經是 datetime 型別，不需要轉換
-                        pass
-                    else:
-                        self.write_log(f"不支援的時間戳型別: {ts_dtype}")
-                        return data
-            
-            # 迭代處理資料
-            for row in df.iter_rows(named=True):
-                try:
-                    dt = row["ts"]
-                    if hasattr(dt, 'to_pydatetime'):
-                        dt = dt.to_pydatetime()
-                    elif isinstance(dt, (int, float)):
-                        # 如果還是數字，表示轉換失敗，嘗試手動轉換
-                        if dt > 10**12:  # 毫秒
-                            dt = datetime.fromtimestamp(dt / 1000)
-                        else:  # 秒
-                            dt = datetime.fromtimestamp(dt)
-                    
-                    # 確保 dt 是 datetime 物件
-                    if not isinstance(dt, datetime):
-                        self.write_log(f"無法轉換時間: {row['ts']}")
-                        continue
-                    
-                    # 加上時區資訊
-                    if dt.tzinfo is None:
-                        dt = TW_TZ.localize(dt)
-                    else:
-                        dt = dt.astimezone(TW_TZ)
-
-                    bar = BarData(
-                        symbol=symbol,
-                        exchange=exchange,
-                        interval=interval,
-                        datetime=dt,
-                        open_price=round_to(row["Open"], 0.000001),
-                        high_price=round_to(row["High"], 0.000001),
-                        low_price=round_to(row["Low"], 0.000001),
-                        close_price=round_to(row["Close"], 0.000001),
-                        volume=row["Volume"],
-                        turnover=row["Amount"],
-                        open_interest=0,
-                        gateway_name=self.gateway_name,
-                    )
-                    data.append(bar)
-                except Exception as e:
-                    self.write_log(f"處理K線資料時發生錯誤: {e}, row: {row}")
-                    continue
+            data = to_bars(df, symbol, exchange, interval, self.gateway_name)
         return data
+
+    def invalidate_history(self, symbol: str = "", start: Optional[date] = None, end: Optional[date] = None) -> None:
+        """清除一分 K 快取, 參數同 KbarCache.invalidate"""
+        if self.kbar_cache is not None:
+            self.kbar_cache.invalidate(symbol, start, end)
@@ -0,0 +1,106 @@
+# -*- coding: UTF-8 -*-
+import threading
+import time
+from copy import copy
+from typing import Callable, Dict, Optional
+
+from vnpy.trader.object import TickData
+
+
+class TickConflator:
+    """
+    行情合併 (conflation)
+
+    每個商品只保留最新的 TickData 狀態, 在合併間隔內最多推送一次;
+    若事件引擎閒置 (佇列為空) 則立即推送. 被合併掉的中間更新次數依商品統計.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        on_tick: Callable[[TickData], None],
+        is_idle: Callable[[], bool],
+        lock: threading.Lock,
+        snapshot: Callable[[TickData], TickData] = copy,
+    ) -> None:
+        """
+        interval 單位為秒, lock 需與修改 TickData 的行情 callback 共用,
+        snapshot 用於產生推送出去的 TickData (預設 copy)
+        """
+        self.interval: float = interval
+        self.on_tick = on_tick
+        self.snapshot = snapshot
+        self.is_idle = is_idle
+        self.lock = lock
+
+        self.pending: Dict[str, TickData] = {}  # 等待推送的最新狀態
+        self.last_sent: Dict[str, float] = {}  # 最後推送時間 (monotonic)
+        self.coalesced: Dict[str, int] = {}  # 被合併的更新次數
+
+        self.active: bool = False
+        self.thread: Optional[threading.Thread] = None
+        self.wakeup = threading.Event()
+
+    def start(self) -> None:
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(
+            target=self.run, name="SinopacTickConflator", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        if not self.active:
+            return
+        self.active = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.flush(force=True)
+
+    def push(self, tick: TickData) -> None:
+        """由行情 callback 呼叫, 呼叫端需持有 lock"""
+        symbol = tick.symbol
+        now = time.monotonic()
+        if (
+            now - self.last_sent.get(symbol, -self.interval) >= self.interval
+            or self.is_idle()
+        ):
+            if self.pending.pop(symbol, None) is not None:
+                self.coalesced[symbol] = self.coalesced.get(symbol, 0) + 1
+            self.last_sent[symbol] = now
+            self.on_tick(self.snapshot(tick))
+        elif symbol in self.pending:
+            self.coalesced[symbol] = self.coalesced.get(symbol, 0) + 1
+        else:
+            self.pending[symbol] = tick
+
+    def flush(self, force: bool = False) -> float:
+        """推送已到期的商品, 回傳距離下一個到期的秒數"""
+        with self.lock:
+            if not self.pending:
+                return self.interval
+            now = time.monotonic()
+            next_due = self.interval
+            for symbol, tick in list(self.pending.items()):
+                remaining = self.last_sent[symbol] + self.interval - now
+                if force or remaining <= 0 or self.is_idle():
+                    del self.pending[symbol]
+                    self.last_sent[symbol] = now
+                    self.on_tick(self.snapshot(tick))
+                else:
+                    next_due = min(next_due, remaining)
+            return next_due
+
+    def run(self) -> None:
+        timeout = self.interval
+        while self.active:
+            self.wakeup.wait(timeout)
+            timeout = self.flush()
+
+    def get_coalesced(self) -> Dict[str, int]:
+        """各商品被合併的更新次數"""
+        with self.lock:
+            return dict(self.coalesced)
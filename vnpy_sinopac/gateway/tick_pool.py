@@ -0,0 +1,76 @@
+# -*- coding: UTF-8 -*-
+from collections import deque
+from copy import copy
+from typing import Deque, Dict
+
+from vnpy.event import Event
+from vnpy.trader.object import TickData
+
+
+class TickPool:
+    """
+    TickData 循環池
+
+    每個商品保有一組 TickData 槽位, 推送時把最新狀態寫入一個空閒槽位後送出,
+    不再為每筆行情建立新物件.
+
+    槽位送出後記錄尚未處理的事件數 (on_tick 推送 EVENT_TICK 與 EVENT_TICK + vt_symbol 兩個事件),
+    由事件引擎的 general handler (process_event) 在每個事件的 handler 都執行完後遞減, 歸零時
+    槽位才回到空閒清單. 沒有空閒槽位時 (事件佇列積壓) 新增槽位, 直到每檔商品 size 個;
+    超過時才改為 copy. 因此積壓期間同樣重用已處理完的槽位, 不覆寫仍在佇列中的 TickData.
+
+    使用規則: 處理完 on_tick 之後仍要保存 TickData (例如存入歷史清單) 的使用端必須自行 copy.
+    """
+
+    def __init__(self, size: int = 32, events: int = 2) -> None:
+        if size < 1:
+            raise ValueError("循環池大小至少為 1")
+        self.size: int = size  # 每檔商品最多槽位數
+        self.events: int = events  # 每次推送產生的事件數
+        self.free: Dict[str, Deque[TickData]] = {}  # 商品 -> 空閒槽位
+        self.allocated: Dict[str, int] = {}  # 商品 -> 已配置槽位數
+        self.pending: Dict[int, int] = {}  # id(槽位) -> 尚未處理的事件數
+        self.owners: Dict[int, Deque[TickData]] = {}  # id(槽位) -> 所屬空閒清單
+        self.copied: int = 0  # 槽位用盡時改用 copy 的次數
+
+    def acquire(self, tick: TickData) -> TickData:
+        """寫入空閒槽位並回傳, 呼叫端需持有 tick 的 lock"""
+        symbol = tick.symbol
+        free = self.free.get(symbol, None)
+        if free is None:
+            free = deque()
+            self.free[symbol] = free
+            self.allocated[symbol] = 0
+
+        if free:
+            slot = free.pop()
+            slot.__dict__.update(tick.__dict__)
+        elif self.allocated[symbol] < self.size:
+            slot = copy(tick)
+            self.allocated[symbol] += 1
+            self.owners[id(slot)] = free
+        else:
+            self.copied += 1
+            return copy(tick)
+
+        self.pending[id(slot)] = self.events
+        return slot
+
+    def release(self, tick: TickData) -> None:
+        """一個包含 tick 的事件已處理完, 於事件引擎執行緒呼叫"""
+        key = id(tick)
+        count = self.pending.get(key, 0)
+        if not count:
+            return
+        if count == 1:
+            del self.pending[key]
+            self.owners[key].append(tick)
+        else:
+            self.pending[key] = count - 1
+
+    def process_event(self, event: Event) -> None:
+        """註冊為事件引擎的 general handler, 在該事件的其他 handler 之後執行"""
+        self.release(event.data)
+
+    def get_slot_count(self) -> int:
+        return sum(self.allocated.values())
@@ -0,0 +1,22 @@
+# -*- coding: UTF-8 -*-
+from datetime import date, datetime, timedelta
+
+import pytz
+
+TW_TZ = pytz.timezone("Asia/Taipei")
+
+NIGHT_SESSION_START = 15  # 期貨夜盤 15:00 開始, 屬於下一個交易日
+
+
+def get_trading_day(dt: datetime) -> date:
+    """
+    取得 dt 所屬的交易日
+
+    15:00 之後 (夜盤) 歸屬下一個交易日, 週末順延至週一; 未考慮國定假日.
+    """
+    day = dt.date()
+    if dt.hour >= NIGHT_SESSION_START:
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day